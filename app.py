@@ -1,9 +1,29 @@
 # Streamlit GUI for Diet Optimizer
+#
+# Cold start and reruns: the solver stack (cvxpy and the model modules) is
+# imported inside the functions that solve, so the page renders before
+# cvxpy is loaded. Nutrient matrices (whole datasets and filtered food
+# sets) and compiled models live in st.cache_resource keyed by content
+# fingerprint, so they are built once per process and shared by every
+# session; a rerun only looks them up. The bundled dataset is published to
+# the matrix store (matrix_store.py) and the app works on the memory-mapped
+# matrix directly, with no pandas copy, so every app process on the host
+# shares one copy of its arrays; publishing a refreshed file switches
+# running apps to it within a second. Uploads become a matrix once per file.
+import hashlib
+import os
+
 import streamlit as st
-import cvxpy as cp
 import numpy as np
 import pandas as pd
-import os
+
+from bounds import DEFAULT_TIME_LIMIT, SOLUTION_STATUSES
+from dataset import check_upload
+from metrics import METRICS_ENV, Metrics
+from matrix_store import SharedMatrix, attach, publish_dataset
+from nutrients import NutrientMatrix
+from profiling import SlowCallProfiler
+from solution_cache import SolutionCache, frame_fingerprint, solution_key
 
 # Page configuration
 st.set_page_config(
@@ -19,179 +39,273 @@ with vid_col:
     st.markdown("Watch a quick overview of the project:")
     st.video("https://youtu.be/rkeTNgGIy38")
 
-# Dataset helpers
-def clean_dataset(df: pd.DataFrame) -> pd.DataFrame:
-    """Basic cleaning shared by bundled and uploaded datasets."""
-    df = df.dropna(subset=["Market Price (USD per gram)", "Caloric Value", "Protein"])
-    df = df[df["Market Price (USD per gram)"] > 0].reset_index(drop=True)
-    if "Category" in df.columns:
-        df["Category"] = df["Category"].fillna("Unspecified")
-    return df
-
-
-def validate_dataset(df: pd.DataFrame):
-    """Check for required columns and return missing ones."""
-    required_cols = [
-        "food",
-        "Market Price (USD per gram)",
-        "Caloric Value",
-        "Protein",
-        "Carbohydrates",
-        "Fat",
-    ]
-    missing = [c for c in required_cols if c not in df.columns]
-    return missing
-
-
-@st.cache_data
+# Dataset helpers (cached objects are shared by all sessions: never modify them)
+@st.cache_resource
+def bundled_store():
+    """Handle on the bundled dataset in the matrix store (published on first use)."""
+    name, _ = publish_dataset("food_data_with_prices_with_category.csv")
+    return SharedMatrix(name)
+
+@st.cache_resource(max_entries=2)
+def load_version(name, version):
+    """Memory-mapped matrix of one published version and its dataset fingerprint."""
+    matrix = attach(name, version=version)
+    matrix.category_index  # built here once rather than on the first MILP solve
+    return matrix, matrix.fingerprint
+
 def load_data():
-    """Load the bundled dataset from disk."""
-    data_dir = "Datasets"
-    filename = "food_data_with_prices_with_category.csv"
-    data_path = os.path.join(data_dir, filename)
-    
-    if data_path.endswith(".csv"):
-        try:
-            df = pd.read_csv(data_path)
-        except FileNotFoundError:
-            data_path = os.path.join(data_dir, "food_data_with_prices.xlsx")
-            df = pd.read_excel(data_path)
-    else:
-        df = pd.read_excel(data_path)
-    
-    return clean_dataset(df)
+    """Bundled matrix and its fingerprint, at the currently published version."""
+    store = bundled_store()
+    store.matrix  # re-reads the version pointer at most once per check interval
+    return load_version(store.name, store.version)
+
+@st.cache_resource(max_entries=4)
+def read_upload(file_id, _uploaded_file):
+    """(NutrientMatrix or None, fingerprint, per-column report) of an uploaded CSV, checked once per file."""
+    checked = check_upload(_uploaded_file)
+    if checked.df is None:
+        return None, None, checked.report
+    matrix = NutrientMatrix.from_dataframe(checked.df)
+    matrix.fingerprint = frame_fingerprint(checked.df)
+    matrix.category_index  # built once per file
+    return matrix, matrix.fingerprint, checked.report
+
+@st.cache_resource(max_entries=16)
+def active_foods(fingerprint, categories, _matrix):
+    """Matrix of the foods in the selected categories (None: all) and its fingerprint."""
+    # Every category selected (the default) is the attached matrix itself, not a copy
+    if categories is None or set(categories) >= set(category_labels(_matrix)):
+        return _matrix, fingerprint
+    index = _matrix.category_index
+    keep = [code for code, label in enumerate(index.labels) if str(label) in categories]
+    active = _matrix.take(np.flatnonzero(np.isin(index.codes, keep)))
+    active.categories = pd.Categorical(active.categories).remove_unused_categories()
+    active.fingerprint = hashlib.sha256("\x1f".join([fingerprint, *sorted(categories)]).encode()).hexdigest()
+    active.category_index  # built once per food set
+    return active, active.fingerprint
+
+def category_labels(matrix):
+    """Sorted categories that have foods in matrix."""
+    index = matrix.category_index
+    return sorted({str(index.labels[code]) for code in np.unique(index.codes)})
+
+def preview_table(matrix, n=10):
+    """First n foods of matrix as a dataset table (values per 100 g)."""
+    return matrix.take(np.arange(min(n, matrix.n_foods))).to_dataframe()
+
+@st.cache_resource(max_entries=32)
+def shared_model(kind, food_set, use_categories, options=(), _matrix=None):
+    """
+    Compiled model of one kind for a food set.
+
+    Every model solves under its own lock, so sessions sharing it never see
+    each other's bounds; the optimize path warm-starts each session from its
+    own previous solve (diet_model.WarmStartSession).
+    """
+    if kind == "portfolio":
+        from solvers import SolverPortfolio
+        time_limit, race = options
+        return SolverPortfolio(_matrix, use_categories, time_limit=time_limit, race=race)
+    if kind == "highs":
+        from highs_backend import HighsDietModel
+        (time_limit,) = options
+        return HighsDietModel(_matrix, use_categories, time_limit=time_limit)
+    if kind == "diet":
+        from diet_model import DietModel
+        return DietModel(_matrix, use_categories)
+    if kind == "frontier":
+        from diet_model import DietModel
+        from frontier import FrontierModel
+        return FrontierModel(DietModel(_matrix, use_categories))
+    if kind == "elastic":
+        from diagnose import ElasticDietModel
+        return ElasticDietModel(_matrix, use_categories)
+    if kind == "weekly":
+        from weekly import DEFAULT_MEALS, WeeklyPlanModel
+        (use_meals,) = options
+        return WeeklyPlanModel(_matrix, 7, DEFAULT_MEALS if use_meals else None, use_categories)
+    raise ValueError(f"Unknown model kind: {kind}")
+
+# Summary label -> dataset column for the nutritional totals
+TOTAL_LABELS = {
+    'Calories': "Caloric Value",
+    'Protein': "Protein",
+    'Carbs': "Carbohydrates",
+    'Fat': "Fat",
+    'Fiber': "Dietary Fiber",
+    'Sugar': "Sugars",
+    'Sodium': "Sodium",
+    'Cholesterol': "Cholesterol",
+    'Saturated Fat': "Saturated Fats"
+}
+
+# Bound labels for the sensitivity table and the cost sweep panel (params key -> label)
+BOUND_LABELS = {
+    'prot_min': "Min Protein (g)",
+    'cal_min': "Min Calories",
+    'cal_max': "Max Calories",
+    'carb_min': "Min Carbs (g)",
+    'carb_max': "Max Carbs (g)",
+    'fat_min': "Min Fat (g)",
+    'fat_max': "Max Fat (g)",
+    'fib_min': "Min Fiber (g)",
+    'sug_max': "Max Sugar (g)",
+    'na_max': "Max Sodium (mg)",
+    'chol_max': "Max Cholesterol (mg)",
+    'sat_max': "Max Saturated Fat (g)",
+    'ca_min': "Min Calcium (mg)",
+    'iron_min': "Min Iron (mg)",
+    'mag_min': "Min Magnesium (mg)",
+    'phos_min': "Min Phosphorus (mg)",
+    'k_min': "Min Potassium (mg)",
+    'max_per_food': "Max grams per food",
+    'min_categories': "Min categories",
+}
+
+@st.cache_resource
+def get_solution_cache():
+    """Solution cache shared by all sessions."""
+    return SolutionCache(maxsize=256)
 
-# Helper function
-def get_nutrient_per_g(df, column_name, conversion_factor=100.0):
-    """Extract nutrient data and convert to per-gram basis."""
-    if column_name not in df.columns:
-        return np.zeros(len(df))
-    return df[column_name].fillna(0).to_numpy() / conversion_factor
+@st.cache_resource
+def get_profiler():
+    """Slow-solve profiler shared by all sessions (off unless DIET_PROFILE is set)."""
+    return SlowCallProfiler.from_env()
 
 # Optimization function
-def optimize_diet(df, params):
-    """Run diet optimization with given parameters."""
-    n = len(df)
-    food_names = df["food"].astype(str).tolist()
-    category_labels = df["Category"].astype(str).tolist() if "Category" in df.columns else None
-    
-    # Build nutrient arrays
-    c = get_nutrient_per_g(df, "Market Price (USD per gram)", conversion_factor=1.0)
-    cal_per_g = get_nutrient_per_g(df, "Caloric Value")
-    prot_per_g = get_nutrient_per_g(df, "Protein")
-    carb_per_g = get_nutrient_per_g(df, "Carbohydrates")
-    fat_per_g = get_nutrient_per_g(df, "Fat")
-    sat_per_g = get_nutrient_per_g(df, "Saturated Fats")
-    fib_per_g = get_nutrient_per_g(df, "Dietary Fiber")
-    sugar_per_g = get_nutrient_per_g(df, "Sugars")
-    Na_per_g = get_nutrient_per_g(df, "Sodium")
-    chol_per_g = get_nutrient_per_g(df, "Cholesterol")
-    
-    # Minerals
-    Calcium_per_g = get_nutrient_per_g(df, "Calcium")
-    Iron_per_g = get_nutrient_per_g(df, "Iron")
-    Magnesium_per_g = get_nutrient_per_g(df, "Magnesium")
-    Phosphorus_per_g = get_nutrient_per_g(df, "Phosphorus")
-    Potassium_per_g = get_nutrient_per_g(df, "Potassium")
-
-    # Vitamins (per 100 g -> per g)
-    vitamin_cols = [col for col in df.columns if col.startswith("Vitamin ")]
-    vitamins_per_g = {col: get_nutrient_per_g(df, col) for col in vitamin_cols}
-    
-    # Decision variable
-    x = cp.Variable(n, nonneg=True)
-    
-    # Constraints
-    constraints = [x <= params['max_per_food']]
+def optimize_diet(matrix, params, backend="cvxpy", time_limit=DEFAULT_TIME_LIMIT, race=False, use_presolve=True,
+                  metrics=None, fingerprint=None):
+    """Run diet optimization with given parameters, reusing cached solutions."""
+    metrics = metrics or Metrics()
+    cache = get_solution_cache()
+    with metrics.phase("cache lookup"):
+        fingerprint = fingerprint or matrix.fingerprint
+        key = solution_key(fingerprint, params, backend=backend, time_limit=time_limit, race=race,
+                           presolve=use_presolve)
+        result = cache.get(key)
+    if result is None:
+        # Slow solves leave a profile when DIET_PROFILE is set (see profiling.py)
+        with get_profiler().profile("optimize_diet", params, fingerprint, backend=backend,
+                              time_limit=time_limit, race=race, presolve=use_presolve):
+            result = run_optimization(matrix, params, fingerprint, backend, time_limit, race, use_presolve, metrics)
+        # A plan cut off by the time limit is not cached: a longer limit may improve it
+        if not str(result[0]).startswith("Error") and result[0] != "user_limit":
+            cache.put(key, result)
+    return result
+
+def uses_categories(matrix, params):
+    return matrix.categories is not None and params.get('min_categories', 0) > 0
+
+def run_sweep(matrix, fingerprint, params, axes):
+    """Cost sweep over axes on the shared model (warm-started point to point)."""
+    from sweep import sweep
+    use_categories = uses_categories(matrix, params)
+    model = shared_model("diet", fingerprint, use_categories, _matrix=matrix)
+    return sweep(model, params, axes)
+
+def run_frontier(matrix, fingerprint, params, column, max_points):
+    """Cost vs column frontier on the shared model (any column, same compiled model)."""
+    from frontier import frontier
+    use_categories = uses_categories(matrix, params)
+    model = shared_model("frontier", fingerprint, use_categories, _matrix=matrix)
+    return frontier(model, params, column, max_points)
+
+def diagnose_profile(matrix, fingerprint, params):
+    """Smallest relaxation and conflicting bounds for an infeasible profile (shared models)."""
+    from diagnose import diagnose
+    use_categories = uses_categories(matrix, params)
+    elastic = shared_model("elastic", fingerprint, use_categories, _matrix=matrix)
+    model = shared_model("diet", fingerprint, use_categories, _matrix=matrix)
+    return diagnose(matrix, params, use_categories, find_iis=True, elastic=elastic, model=model)
+
+def run_week(matrix, fingerprint, params, max_days, use_meals):
+    """(status, cost, plan table) of a seven-day plan on the shared weekly model."""
+    from weekly import plan_table
+    use_categories = uses_categories(matrix, params)
+    model = shared_model("weekly", fingerprint, use_categories, (use_meals,), _matrix=matrix)
+    status, cost, X = model.solve({**params, 'max_days': max_days})
+    if X is None:
+        return status, None, None
+    return status, cost, plan_table(model.matrix, X, model.meal_names)
+
+def sensitivity_tables(matrix, sensitivity, x_value, n_entering=10):
+    """(binding bounds with shadow prices, cheapest unused foods by reduced cost) tables."""
+    if sensitivity is None:
+        return None
+    prices = sensitivity.shadow_prices or {}
+    binding_df = pd.DataFrame({
+        'Bound': [BOUND_LABELS.get(key, key) for key in sensitivity.binding],
+        'Shadow price ($ per unit)': [prices.get(key) for key in sensitivity.binding],
+    })
+    entering_df = None
+    if sensitivity.reduced_costs is not None:
+        unused = np.flatnonzero(x_value <= 1e-3)
+        order = unused[np.argsort(sensitivity.reduced_costs[unused])[:n_entering]]
+        entering_df = pd.DataFrame({
+            'Food': [matrix.food_names[i] for i in order],
+            'Reduced cost ($ per 100 g)': sensitivity.reduced_costs[order] * 100,
+        })
+    return binding_df, entering_df
+
+def run_optimization(matrix, params, fingerprint, backend="cvxpy", time_limit=DEFAULT_TIME_LIMIT, race=False,
+                     use_presolve=True, metrics=None):
+    """Solve the diet LP for matrix with given parameters."""
+    from diet_model import WarmStartSession
+    from presolve import presolve
+
+    metrics = metrics or Metrics()
+    use_categories = uses_categories(matrix, params)
     
-    # Macronutrient constraints
-    constraints += [
-        cal_per_g @ x >= params['cal_min'],
-        cal_per_g @ x <= params['cal_max'],
-        prot_per_g @ x >= params['prot_min'],
-        carb_per_g @ x >= params['carb_min'],
-        carb_per_g @ x <= params['carb_max'],
-        fat_per_g @ x >= params['fat_min'],
-        fat_per_g @ x <= params['fat_max'],
-        fib_per_g @ x >= params['fib_min'],
-        sugar_per_g @ x <= params['sug_max'],
-        Na_per_g @ x <= params['na_max'],
-        chol_per_g @ x <= params['chol_max'],
-        sat_per_g @ x <= params['sat_max']
-    ]
-    
-    # Mineral constraints
-    constraints += [
-        Calcium_per_g @ x >= params['ca_min'],
-        Iron_per_g @ x >= params['iron_min'],
-        Magnesium_per_g @ x >= params['mag_min'],
-        Phosphorus_per_g @ x >= params['phos_min'],
-        Potassium_per_g @ x >= params['k_min']
-    ]
-    
-    # Category diversity constraint (optional)
-    if category_labels and params.get('min_categories', 0) > 0:
-        unique_cats = sorted(pd.Series(category_labels).unique())
-        min_cats_required = min(params['min_categories'], len(unique_cats))
-        y = cp.Variable(len(unique_cats), boolean=True)
-        max_per_food = params['max_per_food']
-        diversity_min_grams = 1.0  # require at least 1g to count a category
-        for idx, cat in enumerate(unique_cats):
-            mask = np.array([1.0 if label == cat else 0.0 for label in category_labels])
-            constraints.append(mask @ x <= max_per_food * y[idx])
-            constraints.append(mask @ x >= diversity_min_grams * y[idx])
-        constraints.append(cp.sum(y) >= min_cats_required)
-
-    # Objective: minimize cost
-    objective = cp.Minimize(c @ x)
-    prob = cp.Problem(objective, constraints)
+    # Drop foods that a cheaper, at-least-as-good food makes redundant for
+    # these bounds; the model is reused while the kept set stays the same
+    food_set, n_removed = fingerprint, 0
+    if use_presolve:
+        with metrics.phase("presolve"):
+            reduced = presolve(matrix, params, use_categories)
+        matrix, food_set, n_removed = reduced.matrix, (fingerprint, reduced.key), reduced.n_removed
+        metrics.count("foods removed by presolve", n_removed)
     
+    # Compiled model shared across sessions: built once per food set, category
+    # block and solver setup. Each session warm-starts from its own last solve
+    # while only bounds change and solves cold when it switches models
+    session = st.session_state.setdefault("warm_start", WarmStartSession())
     try:
-        solved = False
-        for solver in [cp.GLPK_MI, cp.ECOS_BB]:
-            try:
-                prob.solve(solver=solver)
-                solved = True
-                break
-            except Exception:
-                continue
-        if not solved:
-            prob.solve()
+        with metrics.phase("model build"):
+            if backend == "cvxpy":
+                model = shared_model("portfolio", food_set, use_categories, (time_limit, race), _matrix=matrix)
+            else:
+                model = shared_model(backend, food_set, use_categories, (time_limit,), _matrix=matrix)
+        # Both models apply the sidebar time limit; the portfolio picks the solvers
+        # Stats and duals come with the result: the model is shared by every session
+        result = model.solve_result(params, session=session)
+        status, cost, x_value = result.status, result.cost, result.x
+        solver_stats = dict(result.stats, presolve_removed=n_removed)
+        metrics.record("solve", solver_stats["wall_time"])
+        metrics.record_solve(solver_stats)
         
-        if prob.status in ["optimal", "optimal_inaccurate"]:
-            # Extract results
-            selected_foods = []
-            for i in range(n):
-                if x.value[i] is not None and x.value[i] > 1e-3:
-                    selected_foods.append({
-                        'Food': food_names[i],
-                        'Amount (g)': round(x.value[i], 1),
-                        'Cost ($)': round(x.value[i] * c[i], 2)
-                    })
-            
-            results_df = pd.DataFrame(selected_foods)
+        if status in SOLUTION_STATUSES and x_value is not None:
+            with metrics.phase("results"):
+                # Extract results
+                results_df = matrix.selection(x_value)
+                
+                # Calculate nutritional totals (one matrix-vector product)
+                nutrient_totals = matrix.totals(x_value)
+                totals = {label: nutrient_totals.get(column, 0.0) for label, column in TOTAL_LABELS.items()}
+
+                # Vitamin totals (dataset units)
+                vitamin_totals = {vit: total for vit, total in nutrient_totals.items() if vit.startswith("Vitamin ")}
+
+                sensitivity = sensitivity_tables(matrix, result.sensitivity, x_value)
             
-            # Calculate nutritional totals
-            totals = {
-                'Calories': float(cal_per_g @ x.value),
-                'Protein': float(prot_per_g @ x.value),
-                'Carbs': float(carb_per_g @ x.value),
-                'Fat': float(fat_per_g @ x.value),
-                'Fiber': float(fib_per_g @ x.value),
-                'Sugar': float(sugar_per_g @ x.value),
-                'Sodium': float(Na_per_g @ x.value),
-                'Cholesterol': float(chol_per_g @ x.value),
-                'Saturated Fat': float(sat_per_g @ x.value)
-            }
-
-            # Vitamin totals (dataset units)
-            vitamin_totals = {vit: float(arr @ x.value) for vit, arr in vitamins_per_g.items()}
-            
-            return prob.status, prob.value, results_df, totals, vitamin_totals
+            return status, cost, results_df, totals, vitamin_totals, solver_stats, sensitivity
         else:
-            return prob.status, None, None, None, None
+            return status, None, None, None, None, solver_stats, None
     except Exception as e:
-        return f"Error: {str(e)}", None, None, None, None
+        return f"Error: {str(e)}", None, None, None, None, None, None
+
+# Phase timings for this script run, shown under the results and exported
+# when DIET_METRICS is set
+metrics = Metrics(enabled=True, path=os.environ.get(METRICS_ENV))
 
 # Load data (built-in or uploaded)
 st.sidebar.header("Dataset")
@@ -211,19 +325,25 @@ try:
     if data_source == "Upload CSV":
         if uploaded_file is None:
             st.sidebar.info("Upload a CSV to use it, or switch back to the bundled dataset.")
-            df = load_data()
-            st.sidebar.success(f"Loaded {len(df)} foods from bundled dataset")
+            with metrics.phase("load dataset"):
+                foods, fingerprint = load_data()
+            st.sidebar.success(f"Loaded {foods.n_foods} foods from bundled dataset")
         else:
-            user_df = pd.read_csv(uploaded_file)
-            missing_cols = validate_dataset(user_df)
-            if missing_cols:
-                st.sidebar.error(f"Missing required columns: {', '.join(missing_cols)}")
+            with metrics.phase("csv parse"):
+                foods, fingerprint, upload_report = read_upload(uploaded_file.file_id, uploaded_file)
+            if foods is None:
+                st.sidebar.error("The uploaded file was rejected; fix the problems below and upload it again.")
+                st.error("Problems found in the uploaded file (row 1 is the first row after the header):")
+                st.dataframe(upload_report, hide_index=True)
                 st.stop()
-            df = clean_dataset(user_df)
-            st.sidebar.success(f"Loaded {len(df)} foods from uploaded file")
+            st.sidebar.success(f"Loaded {foods.n_foods} foods from uploaded file")
+            if not upload_report.empty:
+                with st.sidebar.expander(f"{len(upload_report)} warning(s) in the uploaded file"):
+                    st.dataframe(upload_report, hide_index=True)
     else:
-        df = load_data()
-        st.sidebar.success(f"Loaded {len(df)} foods from bundled dataset")
+        with metrics.phase("load dataset"):
+            foods, fingerprint = load_data()
+        st.sidebar.success(f"Loaded {foods.n_foods} foods from bundled dataset")
 except Exception as e:
     st.error(f"Error loading data: {e}")
     st.stop()
@@ -304,9 +424,9 @@ with st.sidebar.expander("Mineral Requirements"):
     params['k_min'] = st.number_input("Min Potassium (mg)", value=2500, step=100)
 
 # Category controls
-if "Category" in df.columns:
+if foods.categories is not None:
     st.sidebar.subheader("Food Categories")
-    categories_available = sorted(df["Category"].astype(str).unique())
+    categories_available = category_labels(foods)
     selected_categories = st.sidebar.multiselect(
         "Include categories",
         categories_available,
@@ -328,14 +448,12 @@ else:
     selected_categories = None
     params['min_categories'] = 0
 
-# Apply category filter
-if selected_categories:
-    df_active = df[df["Category"].astype(str).isin(selected_categories)].reset_index(drop=True)
-else:
-    df_active = df
+# Apply category filter (cached per dataset and selection)
+foods_active, active_fingerprint = active_foods(
+    fingerprint, tuple(selected_categories) if selected_categories else None, foods)
 
 # Stop early if filter removes everything
-if df_active.empty:
+if foods_active.n_foods == 0:
     st.error("No foods left after applying category filters. Please select more categories.")
     st.stop()
 
@@ -349,19 +467,68 @@ params['max_per_food'] = st.sidebar.slider(
     help="Lower values encourage more food variety"
 )
 
+# Solver backend
+backend = st.sidebar.radio(
+    "Solver backend",
+    ["cvxpy", "highs"],
+    horizontal=True,
+    help="cvxpy: compiled cvxpy model, warm-started between edits. highs: direct HiGHS via scipy, no cvxpy overhead."
+)
+time_limit = st.sidebar.number_input(
+    "Solver time limit (s)",
+    min_value=1.0,
+    max_value=120.0,
+    value=DEFAULT_TIME_LIMIT,
+    step=1.0,
+    help="Both backends: a category MILP stopped at the limit returns its best plan so far"
+)
+race = st.sidebar.checkbox(
+    "Race two solvers",
+    value=False,
+    disabled=backend != "cvxpy",
+    help="Solve with the two best installed solvers in parallel and keep the first optimal answer"
+)
+
+use_presolve = st.sidebar.checkbox(
+    "Drop dominated foods (presolve)",
+    value=True,
+    help="Skip foods that another food beats on price and every active bound; the optimum is unchanged"
+)
+
 # Optimize button
 if st.sidebar.button("Optimize Diet", type="primary", use_container_width=True):
     with st.spinner("Optimizing your diet..."):
-        status, cost, results_df, totals, vitamin_totals = optimize_diet(df_active, params)
+        status, cost, results_df, totals, vitamin_totals, solver_stats, sensitivity = optimize_diet(
+            foods_active, params, backend, time_limit, race and backend == "cvxpy", use_presolve, metrics,
+            active_fingerprint)
         
-        if status in ["optimal", "optimal_inaccurate"]:
-            st.success(f"Optimization successful!")
+        if status in SOLUTION_STATUSES and cost is not None:
+            if status == "user_limit":
+                st.warning("Solver hit the time limit; showing the best plan found so far (may not be optimal).")
+            else:
+                st.success(f"Optimization successful!")
             
             # Display results in columns
             col1, col2, col3 = st.columns(3)
             col1.metric("Total Cost", f"${cost:.2f}")
             col2.metric("Different Foods", len(results_df))
             col3.metric("Total Weight", f"{results_df['Amount (g)'].sum():.0f}g")
+            cache_stats = get_solution_cache().stats()
+            st.caption(f"Solution cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+                       f"{cache_stats['size']}/{cache_stats['maxsize']} entries")
+            if solver_stats:
+                iterations = solver_stats.get("iterations")
+                removed = solver_stats.get("presolve_removed")
+                failed = solver_stats.get("failed") or {}
+                fallback = f" after {', '.join(failed)} failed" if failed else ""
+                st.caption(f"Solver: {solver_stats['solver']}"
+                           f"{' (won race)' if solver_stats.get('raced') else ''}, "
+                           f"{solver_stats['wall_time'] * 1000:.0f} ms"
+                           f"{f', {iterations} iterations' if iterations is not None else ''}"
+                           f"{f', presolve removed {removed} dominated foods' if removed else ''}"
+                           f"{fallback}")
+                for solver, error in failed.items():
+                    st.caption(f"{solver} failed: {error}")
             
             # Food selection table
             st.subheader("Shopping List")
@@ -379,6 +546,25 @@ if st.sidebar.button("Optimize Diet", type="primary", use_container_width=True):
                 file_name="diet_shopping_list.csv",
                 mime="text/csv"
             )
+
+            # What drives the cost: duals of the same solve
+            if sensitivity is not None:
+                binding_df, entering_df = sensitivity
+                with st.expander("What drives the cost? (binding constraints and shadow prices)"):
+                    st.caption("Shadow price: how much the plan's cost rises if the bound is tightened by one unit "
+                               "(raise a minimum / lower a maximum). Empty for the category MILP, which has no duals.")
+                    st.dataframe(
+                        binding_df.style.format({'Shadow price ($ per unit)': '${:.4f}'}, na_rep="n/a"),
+                        use_container_width=True,
+                        hide_index=True
+                    )
+                    if entering_df is not None:
+                        st.caption("Unused foods closest to entering the plan: extra cost per 100 g forced in.")
+                        st.dataframe(
+                            entering_df.style.format({'Reduced cost ($ per 100 g)': '${:.3f}'}),
+                            use_container_width=True,
+                            hide_index=True
+                        )
             
             # Nutritional summary
             st.subheader("Nutritional Summary")
@@ -418,7 +604,36 @@ if st.sidebar.button("Optimize Diet", type="primary", use_container_width=True):
             
         else:
             st.error(f"Optimization failed: {status}")
-            st.info("Try relaxing some constraints or adjusting your requirements.")
+            diagnosis = diagnose_profile(foods_active, active_fingerprint, params) if status == "infeasible" else None
+            if diagnosis and diagnosis.relaxations:
+                st.info("Smallest change to your requirements that makes this plan possible:")
+                st.dataframe(
+                    pd.DataFrame({
+                        'Bound': [BOUND_LABELS.get(r.key, r.key) for r in diagnosis.relaxations],
+                        'Current': [r.bound for r in diagnosis.relaxations],
+                        'Relax to': [r.relaxed_to for r in diagnosis.relaxations],
+                        'Change': [r.relaxed_to - r.bound for r in diagnosis.relaxations],
+                    }).style.format({'Current': '{:.1f}', 'Relax to': '{:.1f}', 'Change': '{:+.1f}'}),
+                    use_container_width=True,
+                    hide_index=True
+                )
+                if diagnosis.iis:
+                    st.caption("These bounds conflict with each other (dropping any one of them removes the conflict): "
+                               + ", ".join(BOUND_LABELS.get(key, key) for key in diagnosis.iis))
+            else:
+                st.info("Try relaxing some constraints or adjusting your requirements.")
+
+        # Where the time went on this click (cached results only show the lookup)
+        with st.expander("Timing breakdown"):
+            st.dataframe(
+                pd.DataFrame(
+                    [(name, seconds * 1000, calls) for name, seconds, calls in metrics.rows()],
+                    columns=["Phase", "Time (ms)", "Calls"]
+                ).style.format({"Time (ms)": "{:.1f}"}),
+                use_container_width=True,
+                hide_index=True
+            )
+        metrics.export(script="app.py", backend=backend)
 else:
     # Show instructions
     st.info("Adjust your nutritional requirements in the sidebar and click **Optimize Diet**")
@@ -434,7 +649,98 @@ else:
     
     st.subheader("Available Foods Preview")
     st.dataframe(
-        df_active[['food', 'Caloric Value', 'Protein', 'Carbohydrates', 'Fat', 'Market Price (USD per gram)']].head(10),
+        preview_table(foods_active)[['food', 'Caloric Value', 'Protein', 'Carbohydrates', 'Fat',
+                                    'Market Price (USD per gram)']],
         use_container_width=True,
         hide_index=True
     )
+
+# Parametric sweep: cost curve as one or two bounds vary
+st.subheader("Cost Sweep")
+with st.expander("How does the cost change with a bound?"):
+    sweep_keys = [key for key in BOUND_LABELS if key != "min_categories"]
+    col1, col2, col3, col4 = st.columns(4)
+    sweep_key = col1.selectbox("Bound", sweep_keys, format_func=BOUND_LABELS.get)
+    current = float(params[sweep_key])
+    sweep_from = col2.number_input("From", value=round(current * 0.5, 1), key="sweep_from")
+    sweep_to = col3.number_input("To", value=round(current * 1.5, 1), key="sweep_to")
+    sweep_points = col4.number_input("Points", min_value=2, max_value=500, value=50, step=10, key="sweep_points")
+    axes = {sweep_key: np.linspace(sweep_from, sweep_to, int(sweep_points))}
+
+    second_key = st.selectbox(
+        "Second bound (optional)",
+        [None] + [key for key in sweep_keys if key != sweep_key],
+        format_func=lambda key: "None" if key is None else BOUND_LABELS[key]
+    )
+    if second_key is not None:
+        col1, col2, col3 = st.columns(3)
+        second = float(params[second_key])
+        second_from = col1.number_input("From", value=round(second * 0.5, 1), key="sweep_from_2")
+        second_to = col2.number_input("To", value=round(second * 1.5, 1), key="sweep_to_2")
+        second_points = col3.number_input("Points", min_value=2, max_value=20, value=4, key="sweep_points_2")
+        # The curve is drawn along the first bound, one line per value of the second
+        axes = {second_key: np.linspace(second_from, second_to, int(second_points)), **axes}
+
+    if st.button("Run sweep"):
+        with st.spinner("Sweeping..."):
+            result = run_sweep(foods_active, active_fingerprint, params, axes)
+        table = result.table
+        if second_key is None:
+            st.line_chart(table.set_index(sweep_key)["cost"])
+        else:
+            st.line_chart(table.pivot(index=sweep_key, columns=second_key, values="cost"))
+        solved = table["cost"].notna().sum()
+        st.caption(f"{solved}/{len(table)} points feasible; marginal cost is $ per unit of "
+                   f"{BOUND_LABELS[sweep_key]}")
+        st.markdown("**Breakpoints** (the food basket changes here)")
+        breakpoints = result.breakpoints.assign(foods=result.breakpoints["foods"].str.join(", "))
+        st.dataframe(
+            breakpoints[list(axes) + ["cost", "marginal_cost", "n_foods", "foods"]],
+            use_container_width=True,
+            hide_index=True
+        )
+
+# Trade-off frontier: the cheapest plan for every level of one nutrient
+st.subheader("Cost Trade-off")
+with st.expander("How much more does more protein (or nutrition density) cost?"):
+    frontier_columns = [column for column in ["Protein", "Nutrition Density", "Dietary Fiber",
+                                              "Calcium", "Iron", "Potassium"] if column in foods_active.index]
+    col1, col2 = st.columns(2)
+    frontier_column = col1.selectbox("Trade cost against", frontier_columns)
+    frontier_points = col2.number_input("Solves", min_value=3, max_value=200, value=30, step=5,
+                                        key="frontier_points")
+
+    if st.button("Trace frontier"):
+        with st.spinner("Tracing..."):
+            result = run_frontier(foods_active, active_fingerprint, params, frontier_column, int(frontier_points))
+        table = result.table
+        if table.empty:
+            st.error("No feasible plan for this profile.")
+        else:
+            st.line_chart(table.set_index(frontier_column)["cost"])
+            st.caption(f"{len(table)} non-dominated plans; marginal cost is $ per unit of {frontier_column}")
+            st.dataframe(
+                table.assign(foods=table["foods"].str.join(", "))[
+                    [frontier_column, "cost", "marginal_cost", "n_foods", "foods"]],
+                use_container_width=True,
+                hide_index=True
+            )
+
+# Weekly plan: seven days of the profile, with a variety rule across days
+st.subheader("Weekly Plan")
+with st.expander("Plan a whole week"):
+    col1, col2 = st.columns(2)
+    max_days = col1.slider("Max days any food appears", min_value=1, max_value=7, value=5,
+                           help="7 repeats the cheapest day; lower values force rotation")
+    use_meals = col2.checkbox("Split into breakfast / lunch / dinner", value=True)
+
+    if st.button("Plan week"):
+        with st.spinner("Planning..."):
+            status, week_cost, week_table = run_week(foods_active, active_fingerprint, params, max_days, use_meals)
+        if week_table is None:
+            st.error(f"No weekly plan: {status}")
+        else:
+            if status == "user_limit":
+                st.warning("Stopped at the time limit; the plan may not be the cheapest week.")
+            st.metric("Weekly cost", f"${week_cost:.2f}")
+            st.dataframe(week_table, use_container_width=True, hide_index=True)
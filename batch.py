@@ -0,0 +1,145 @@
+# Batch profile solver
+#
+# Reads a table of profiles (one row per person), solves every row against
+# one compiled DietModel and writes a single result table.
+#
+#   python batch.py Datasets/example_profiles.csv -o results.csv
+#   python batch.py profiles.csv -o results.csv --workers 0   # all cores
+#
+# Profile columns use the solve_diet() argument names from main.py plus the
+# mineral minimums (C_min, C_max, P_min, ..., SatFat_max, Ca_min, Iron_min,
+# Mag_min, Phos_min, K_min) and an optional name / max_per_food column.
+# The params keys used by app.py (cal_min, prot_min, ...) are accepted too.
+
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from dataset import DEFAULT_FILENAME
+from diet_model import NUTRIENT_BOUNDS, OPTIMAL_STATUSES, PROFILE_FIELDS, build_model
+from metrics import METRICS_ENV, Metrics
+from nutrients import load_matrix
+from parallel import solve_profiles_parallel
+
+DEFAULT_MAX_PER_FOOD = 300.0  # grams, same default as solve_diet
+
+
+def read_profiles(path) -> pd.DataFrame:
+    """Read a profile table (.csv or .xlsx) and rename columns to params keys."""
+    if path.endswith(".csv"):
+        profiles = pd.read_csv(path)
+    else:
+        profiles = pd.read_excel(path)
+    profiles = profiles.rename(columns=PROFILE_FIELDS)
+
+    missing = [key for key, _, _ in NUTRIENT_BOUNDS if key not in profiles.columns]
+    if missing:
+        raise ValueError(f"Profile table is missing columns: {', '.join(missing)}")
+    if "max_per_food" not in profiles.columns:
+        profiles["max_per_food"] = DEFAULT_MAX_PER_FOOD
+    if "name" not in profiles.columns:
+        profiles["name"] = [f"profile {i}" for i in range(len(profiles))]
+    return profiles
+
+
+def profile_records(profiles):
+    """Profile table -> list of params dicts."""
+    param_keys = [key for key, _, _ in NUTRIENT_BOUNDS] + ["max_per_food"]
+    return profiles.reindex(columns=param_keys).to_dict("records")
+
+
+def solve_profiles(model, profiles):
+    """
+    Solve every profile row with the compiled model.
+
+    Returns (statuses, costs, X) where X is a (profiles x foods) grams
+    matrix; rows of failed solves are NaN. A row with a blank or
+    non-numeric bound gets an "Error: ..." status naming the bounds.
+    """
+    return model.solve_many(profile_records(profiles))
+
+
+def build_result_table(matrix, profiles, statuses, costs, X):
+    """One row per profile: status, cost, nutrient totals and grams per food."""
+    totals = X @ matrix.values.T  # all profiles and nutrients in one product
+
+    grams = pd.DataFrame(np.where(X > 1e-3, X, 0.0).round(1),
+                         columns=[f"grams: {name}" for name in matrix.food_names])
+    totals_df = pd.DataFrame(totals, columns=[f"total: {name}" for name in matrix.names])
+
+    summary = pd.DataFrame({
+        "name": profiles["name"].to_numpy(),
+        "status": statuses,
+        "cost": costs,
+        "n_foods": (X > 1e-3).sum(axis=1),
+    })
+    return pd.concat([summary, totals_df, grams], axis=1)
+
+
+def write_results(results, path):
+    """Write the result table as .csv or .parquet depending on extension."""
+    if path.endswith(".parquet"):
+        results.to_parquet(path, index=False)
+    else:
+        results.to_csv(path, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve a table of diet profiles in one run.")
+    parser.add_argument("profiles", help="profile table (.csv or .xlsx)")
+    parser.add_argument("-o", "--output", default="batch_results.csv",
+                        help="result table (.csv or .parquet)")
+    parser.add_argument("--data", default=DEFAULT_FILENAME,
+                        help="dataset file in Datasets/ (default: %(default)s)")
+    parser.add_argument("--backend", choices=["cvxpy", "highs"], default="cvxpy",
+                        help="solver backend (default: %(default)s)")
+    parser.add_argument("-j", "--workers", type=int, default=1,
+                        help="worker processes, 0 = all cores (default: %(default)s)")
+    parser.add_argument("--metrics", default=os.environ.get(METRICS_ENV),
+                        help=f"phase timings: .prom (Prometheus text) or JSON lines file "
+                             f"(default: ${METRICS_ENV}, off if unset)")
+    args = parser.parse_args()
+    metrics = Metrics(enabled=bool(args.metrics), path=args.metrics)
+
+    with metrics.phase("load matrix"):
+        matrix = load_matrix(args.data)
+    with metrics.phase("read profiles"):
+        profiles = read_profiles(args.profiles)
+
+    start = time.perf_counter()
+    if args.workers == 1:
+        with metrics.phase("model build"):
+            model = build_model(matrix, backend=args.backend)
+        with metrics.phase("solve"):
+            statuses, costs, X = solve_profiles(model, profiles)
+    else:
+        with metrics.phase("solve"):
+            statuses, costs, X = solve_profiles_parallel(matrix, profile_records(profiles),
+                                                         workers=args.workers or None,
+                                                         backend=args.backend)
+    elapsed = time.perf_counter() - start
+
+    with metrics.phase("result table"):
+        results = build_result_table(matrix, profiles, statuses, costs, X)
+    with metrics.phase("write results"):
+        write_results(results, args.output)
+
+    for name, status in zip(profiles["name"], statuses):
+        if str(status).startswith("Error"):
+            print(f"Skipped {name}: {status}")
+    n_optimal = sum(status in OPTIMAL_STATUSES for status in statuses)
+    workers = args.workers or os.cpu_count()
+    print(f"Solved {len(profiles)} profiles ({n_optimal} optimal) on {workers} worker(s) in {elapsed:.2f} s "
+          f"({len(profiles) / elapsed:.1f} solves/s)")
+    print(f"Results written to {args.output}")
+
+    metrics.count("profiles", len(profiles))
+    metrics.count("optimal", n_optimal)
+    metrics.export(script="batch.py", backend=args.backend, workers=workers)
+
+
+if __name__ == "__main__":
+    main()
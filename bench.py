@@ -0,0 +1,255 @@
+# Benchmark suite on synthetic food catalogs
+#
+# Generates catalogs with the same columns as
+# Datasets/food_data_with_prices_with_category.csv (bundled rows resampled
+# with random scaling), then times each phase of a solve separately:
+#
+#   load     read_csv + clean_dataset
+#   arrays   NutrientMatrix.from_dataframe
+#   presolve dominated-food removal (with --presolve)
+#   build    model construction (+ cvxpy canonicalization)
+#   solve    solver call
+#   extract  shopping list table + nutrient totals
+#
+# for the diet LP, the category MILP and the two recipes-nutri-bowl models.
+# Results are JSON lines (one record per case and repeat) tagged with the
+# git commit, so runs can be compared between commits:
+#
+#   python bench.py --sizes 1000,10000 -o bench.jsonl
+#   python bench.py --sizes 1000,10000 -o new.jsonl --compare bench.jsonl
+#   python bench.py --sizes 100000 --duplicates 0.5 --presolve
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import cvxpy as cp
+import numpy as np
+import pandas as pd
+
+from bowls import BOWL_PRESETS, BowlModel
+from dataset import DATA_DIR, PRICE_COL, load_dataset
+from diet_model import build_model
+from nutrients import NutrientMatrix
+from presolve import presolve
+from solvers import DEFAULT_MIP_GAP, limit_options
+
+SOURCE_FILENAME = "food_data_with_prices_with_category.csv"
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+DEFAULT_CATEGORIES = 12
+MODELS = ["lp", "milp", "budget_bowl", "protein_bowl"]
+BOWL_OBJECTIVES = {"budget_bowl": "cost", "protein_bowl": "protein"}
+PHASES = ["load", "arrays", "presolve", "build", "solve", "extract"]
+
+# "Default profile" row of Datasets/example_profiles.csv, plus variety for the MILP
+DIET_PARAMS = {
+    "cal_min": 2200, "cal_max": 2600, "prot_min": 120,
+    "carb_min": 200, "carb_max": 350, "fat_min": 50, "fat_max": 90,
+    "fib_min": 25, "na_max": 2300, "sug_max": 50, "chol_max": 300, "sat_max": 30,
+    "ca_min": 800, "iron_min": 8, "mag_min": 200, "phos_min": 700, "k_min": 2500,
+    "max_per_food": 300, "min_categories": 6,
+}
+
+
+def synthetic_catalog(n_foods, n_categories=DEFAULT_CATEGORIES, seed=0, duplicates=0.0, data_dir=DATA_DIR):
+    """
+    Catalog of n_foods rows with the bundled dataset's columns.
+
+    Rows are bundled foods drawn with replacement, every nutrient and the
+    price scaled by an independent factor in [0.7, 1.3]; foods get unique
+    names and one of n_categories synthetic categories. A duplicates
+    fraction of the rows re-lists an earlier food (same nutrients and
+    category) at another price, like one product sold by several stores.
+    """
+    rng = np.random.default_rng(seed)
+    source = pd.read_csv(os.path.join(data_dir, SOURCE_FILENAME))
+    df = source.iloc[rng.integers(0, len(source), n_foods)].reset_index(drop=True)
+
+    numeric = [col for col in df.columns
+               if pd.api.types.is_numeric_dtype(df[col]) and not col.startswith("Unnamed")]
+    df[numeric] = df[numeric].to_numpy() * rng.uniform(0.7, 1.3, (n_foods, len(numeric)))
+    df["Unnamed: 0.1"] = df["Unnamed: 0"] = np.arange(n_foods)
+    df["food"] = [f"{name} #{i}" for i, name in enumerate(df["food"])]
+    df["Category"] = [f"category {k:02d}" for k in rng.integers(0, n_categories, n_foods)]
+
+    n_dup = int(duplicates * n_foods)
+    if n_dup:
+        copies = np.arange(n_foods - n_dup, n_foods)
+        originals = rng.integers(0, n_foods - n_dup, n_dup)
+        columns = [col for col in numeric if col != PRICE_COL] + ["Category"]
+        df.loc[copies, columns] = df.loc[originals, columns].to_numpy()
+        df.loc[copies, PRICE_COL] = df.loc[originals, PRICE_COL].to_numpy() * rng.uniform(0.7, 1.3, n_dup)
+    return df
+
+
+def make_model(kind, matrix, backend):
+    """Model for one benchmark case (bowls are cvxpy only)."""
+    if kind in BOWL_OBJECTIVES:
+        return BowlModel(matrix, BOWL_OBJECTIVES[kind])
+    return build_model(matrix, use_categories=kind == "milp", backend=backend)
+
+
+def case_params(kind):
+    if kind in BOWL_OBJECTIVES:
+        return BOWL_PRESETS[BOWL_OBJECTIVES[kind]]
+    return DIET_PARAMS
+
+
+def run_case(path, kind, backend, time_limit, use_presolve=False):
+    """Time every phase of one solve on the catalog at path; returns a result record."""
+    timings = {}
+    params = case_params(kind)
+    problem_class = "MILP" if kind == "milp" else "LP"
+
+    start = time.perf_counter()
+    df = load_dataset(os.path.basename(path), os.path.dirname(path))
+    timings["load"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    matrix = NutrientMatrix.from_dataframe(df)
+    timings["arrays"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    n_removed = 0
+    if use_presolve and kind not in BOWL_OBJECTIVES:  # bowl bounds are not diet params
+        reduced = presolve(matrix, params, use_categories=kind == "milp")
+        matrix, n_removed = reduced.matrix, reduced.n_removed
+    timings["presolve"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    model = make_model(kind, matrix, backend)
+    if hasattr(model, "compile"):
+        model.compile(params)  # cvxpy canonicalization belongs to the build
+    timings["build"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if hasattr(model, "problem"):
+        options = {cp.HIGHS: limit_options(cp.HIGHS, time_limit, DEFAULT_MIP_GAP, problem_class)}
+        status, value, x = model.solve(params, solvers=[cp.HIGHS], solver_options=options)
+    else:
+        options = {"time_limit": time_limit}
+        if problem_class == "MILP":
+            options.update(mip_rel_gap=DEFAULT_MIP_GAP, presolve=False)  # see limit_options
+        status, value, x = model.solve(params, **options)
+    timings["solve"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    n_selected = None
+    if x is not None:
+        n_selected = len(matrix.selection(x))
+        matrix.totals(x)
+    timings["extract"] = time.perf_counter() - start
+
+    return {
+        "model": kind,
+        "backend": "cvxpy" if kind in BOWL_OBJECTIVES else backend,
+        "n_foods": matrix.n_foods + n_removed,
+        "n_removed": n_removed,
+        "n_categories": len(matrix.category_index.labels),
+        "status": status,
+        "objective": value,
+        "n_selected": n_selected,
+        "solver": (model.last_stats or {}).get("solver"),
+        "iterations": (model.last_stats or {}).get("iterations"),
+        "timings": timings,
+        "total": sum(timings.values()),
+    }
+
+
+def git_commit():
+    """Short hash of HEAD, or None outside a git checkout."""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def read_results(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def summarize(records):
+    """Median phase timings per (model, backend, size) case."""
+    keys = ["model", "backend", "n_foods"]
+    columns = [f"timings.{phase}" for phase in PHASES] + ["total"]
+    df = pd.json_normalize(records).reindex(columns=keys + columns)  # older runs lack phases
+    return df.groupby(keys)[columns].median().rename(
+        columns=lambda col: col.removeprefix("timings."))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark load/build/solve phases on synthetic catalogs.")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="comma-separated catalog sizes (default: %(default)s)")
+    parser.add_argument("--categories", type=int, default=DEFAULT_CATEGORIES,
+                        help="categories per catalog (default: %(default)s)")
+    parser.add_argument("--models", default=",".join(MODELS),
+                        help="comma-separated subset of %(default)s")
+    parser.add_argument("--backend", choices=["cvxpy", "highs"], default="cvxpy",
+                        help="backend for the lp/milp models (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per case (default: %(default)s)")
+    parser.add_argument("--time-limit", type=float, default=60.0,
+                        help="solver time limit in seconds (default: %(default)s)")
+    parser.add_argument("--duplicates", type=float, default=0.0,
+                        help="fraction of foods re-listed at another price (default: %(default)s)")
+    parser.add_argument("--presolve", action="store_true",
+                        help="drop dominated foods before building the lp/milp models")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", default="bench_results.jsonl",
+                        help="JSON lines output, appended to (default: %(default)s)")
+    parser.add_argument("--compare", help="earlier JSON lines output to compare medians against")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    models = args.models.split(",")
+    unknown = set(models) - set(MODELS)
+    if unknown:
+        parser.error(f"unknown models: {', '.join(sorted(unknown))}")
+
+    run_info = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "cvxpy": cp.__version__,
+        "seed": args.seed,
+        "duplicates": args.duplicates,
+        "presolve": args.presolve,
+    }
+    records = []
+    with tempfile.TemporaryDirectory() as tmp, open(args.output, "a", encoding="utf-8") as out:
+        for size in sizes:
+            path = os.path.join(tmp, f"synthetic-{size}.csv")
+            start = time.perf_counter()
+            synthetic_catalog(size, args.categories, args.seed, args.duplicates).to_csv(path, index=False)
+            print(f"{size} foods: catalog written in {time.perf_counter() - start:.1f} s", file=sys.stderr)
+
+            for kind in models:
+                for repeat in range(args.repeat):
+                    record = {**run_info,
+                              **run_case(path, kind, args.backend, args.time_limit, args.presolve),
+                              "repeat": repeat}
+                    out.write(json.dumps(record) + "\n")
+                    out.flush()
+                    records.append(record)
+                    print(f"  {kind:<13} {record['status']:<12} " +
+                          " ".join(f"{phase} {record['timings'][phase]:.3f}" for phase in PHASES),
+                          file=sys.stderr)
+
+    summary = summarize(records)
+    print(summary.to_string(float_format="{:.3f}".format))
+    if args.compare:
+        baseline = summarize(read_results(args.compare))
+        ratio = (summary / baseline).dropna(how="all")
+        print("\nRatio to", args.compare, "(< 1 is faster)")
+        print(ratio.to_string(float_format="{:.2f}".format))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# Diet bounds, solve statuses and limits
+#
+# Plain definitions shared by every backend and by app.py; nothing here
+# imports a solver, so the app can read them before cvxpy is loaded.
+
+import numpy as np
+
+# ---------------------------------------------------------------------
+# Bound definitions: (params key, dataset column, sense)
+# Keys match the params dict used by app.py's optimize_diet.
+# ---------------------------------------------------------------------
+NUTRIENT_BOUNDS = [
+    ("cal_min",  "Caloric Value",  ">="),
+    ("cal_max",  "Caloric Value",  "<="),
+    ("prot_min", "Protein",        ">="),
+    ("carb_min", "Carbohydrates",  ">="),
+    ("carb_max", "Carbohydrates",  "<="),
+    ("fat_min",  "Fat",            ">="),
+    ("fat_max",  "Fat",            "<="),
+    ("fib_min",  "Dietary Fiber",  ">="),
+    ("sug_max",  "Sugars",         "<="),
+    ("na_max",   "Sodium",         "<="),
+    ("chol_max", "Cholesterol",    "<="),
+    ("sat_max",  "Saturated Fats", "<="),
+    # Minerals (mg)
+    ("ca_min",   "Calcium",        ">="),
+    ("iron_min", "Iron",           ">="),
+    ("mag_min",  "Magnesium",      ">="),
+    ("phos_min", "Phosphorus",     ">="),
+    ("k_min",    "Potassium",      ">="),
+]
+
+# solve_diet() argument names (main.py) -> params keys, used for profile tables
+PROFILE_FIELDS = {
+    "C_min": "cal_min", "C_max": "cal_max", "P_min": "prot_min",
+    "Carb_min": "carb_min", "Carb_max": "carb_max",
+    "Fat_min": "fat_min", "Fat_max": "fat_max", "Fib_min": "fib_min",
+    "Na_max": "na_max", "Sug_max": "sug_max", "Chol_max": "chol_max",
+    "SatFat_max": "sat_max",
+    "Ca_min": "ca_min", "Iron_min": "iron_min", "Mag_min": "mag_min",
+    "Phos_min": "phos_min", "K_min": "k_min",
+    "max_per_food": "max_per_food",
+}
+
+OPTIMAL_STATUSES = ["optimal", "optimal_inaccurate"]
+# Statuses that still come with a usable plan (e.g. MILP stopped at its time limit)
+SOLUTION_STATUSES = OPTIMAL_STATUSES + ["user_limit"]
+
+# Solve limits (see solvers.py)
+DEFAULT_TIME_LIMIT = 10.0  # seconds per solve
+DEFAULT_MIP_GAP = 0.005    # relative gap at which a MILP counts as solved
+
+
+def bound_vectors(params, bounds=NUTRIENT_BOUNDS):
+    """
+    (lower, upper) bound vectors from a params dict, ordered like bounds.
+
+    A missing ">=" key is 0 and a missing "<=" key is inf (no limit).
+    """
+    lower = np.array([float(params.get(key, 0)) for key, _, sense in bounds if sense == ">="])
+    upper = np.array([float(params.get(key, np.inf)) for key, _, sense in bounds if sense == "<="])
+    return lower, upper
+
+
+def finite_upper(upper, row_sums, max_per_food):
+    """
+    upper with infinite limits replaced by a value no plan reaches (every
+    food at max_per_food, plus one); SciPy's linprog and some cvxpy solvers
+    reject infinite right-hand sides. row_sums: per-gram row sums of the
+    "<=" nutrient rows.
+    """
+    return np.where(np.isfinite(upper), upper, np.asarray(row_sums) * max_per_food + 1.0)
@@ -0,0 +1,353 @@
+# Top-N distinct bowls for a menu
+#
+# BowlVariantModel is the bowl LP from bowls.py plus one binary per food
+# ("ingredient used") and a block of no-good cut rows. Every generated bowl
+# adds a cut that the next bowl must change at least min_changes
+# ingredients (add or drop) compared to it; cuts are rows of a cvxpy
+# Parameter, so adding one only fills in values and the model is compiled
+# once, not rebuilt per bowl. The block doubles when it runs out of rows.
+#
+# Parallel generation splits the ingredient sets around the best bowl S =
+# {s1..sk} into k+1 disjoint parts (s1..s(j-1) used and sj not used, plus
+# all of S used), generates each part in a worker process and merges them.
+# The workers share the N best objectives found so far; a part stops as
+# soon as its next bowl is worse than all of them, since every later bowl
+# of that part is worse still. With min_changes=1 the merge is exactly the
+# sequential top N.
+#
+#   python bowl_variants.py -n 50 --objective cost -o menu.csv
+#   python bowl_variants.py -n 50 --workers 0      # all cores
+#   python bowl_variants.py -n 50 --profile profiles --profile-threshold 5
+
+import argparse
+import bisect
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+import cvxpy as cp
+import numpy as np
+import pandas as pd
+
+from bowls import BOWL_BOUNDS, BOWL_PRESETS, BowlModel
+from dataset import DEFAULT_FILENAME
+from diet_model import SOLUTION_STATUSES
+from nutrients import load_matrix
+from profiling import DEFAULT_THRESHOLD, FORMAT_ENV, PROFILE_ENV, THRESHOLD_ENV, SlowCallProfiler
+
+MIN_INGREDIENT_GRAMS = 10.0  # an ingredient in a bowl uses at least this much
+CUT_BLOCK = 64               # cut rows allocated at a time
+USED_TOL = 0.5               # binaries above this count as 1
+FLOOR_SLACK = 1e-6           # relative slack on the "no better than the last bowl" row
+FLOOR_OFF = 1e9              # floor value that never binds
+
+# The bowl MILPs are tiny; HiGHS' sub-MIP heuristics cost more than they save. Presolve
+# stays on (without it HiGHS calls some cut protein bowls optimal that are not) and the
+# gap is closed, so the top N is exact rather than within the default 1e-4 gap
+BOWL_SOLVER_OPTIONS = {cp.HIGHS: {"mip_heuristic_effort": 0.0, "mip_rel_gap": 1e-9}}
+
+
+class Bowl(NamedTuple):
+    """One generated bowl: objective value, grams per food and the ingredient set."""
+    objective: float
+    x: np.ndarray
+    ingredients: frozenset
+
+
+class BowlVariantModel(BowlModel):
+    """
+    Bowl MILP with ingredient binaries, ingredient fixings and no-good cuts.
+
+    fix() forces ingredients in or out; add_cut() excludes the neighbourhood
+    of a bowl. Both persist across solves until reset().
+    """
+
+    def __init__(self, matrix, objective="cost", min_grams=MIN_INGREDIENT_GRAMS, max_cuts=CUT_BLOCK):
+        super().__init__(matrix, objective)
+        self.used = cp.Variable(self.n, boolean=True)
+        self.force_in = cp.Parameter(self.n, nonneg=True)
+        self.force_out = cp.Parameter(self.n, nonneg=True)
+        # Most grams of each food any bowl can hold; tighter than the bowl weight
+        self.most_grams = cp.Parameter(self.n, nonneg=True)
+        self._upper_rows = np.vstack([
+            self._upper_block(),
+            np.ones(self.n),
+        ])
+        # Cuts only remove bowls, so the next optimum is never below the last one
+        self.floor = cp.Parameter()
+        self._base = self.problem
+        self._links = [
+            self._base.objective.expr >= self.floor,
+            self.x <= cp.multiply(self.most_grams, self.used),
+            self.x >= min_grams * self.used,
+            self.used >= self.force_in,
+            self.used <= 1 - self.force_out,
+        ]
+        self._include = np.zeros(self.n)
+        self._exclude = np.zeros(self.n)
+        self._rows = np.zeros((0, self.n))
+        self._rhs = np.zeros(0)
+        self._floor = -np.inf
+        self._floor_params = None  # params the floor was found under
+        self._allocate(max_cuts)
+
+    def _allocate(self, capacity):
+        """(Re)build the problem with room for capacity cut rows."""
+        self.cut_rows = cp.Parameter((capacity, self.n))
+        self.cut_rhs = cp.Parameter(capacity)
+        self.problem = cp.Problem(self._base.objective, self._base.constraints + self._links + [
+            self.cut_rows @ self.used >= self.cut_rhs,
+        ])
+
+    @property
+    def n_cuts(self):
+        return len(self._rhs)
+
+    def _upper_block(self):
+        columns = [column for _, column, sense in BOWL_BOUNDS if sense == "<=" and column != "grams"]
+        return self.matrix.rows(columns)
+
+    def set_params(self, params):
+        """Bowl bounds from params; fixings and cuts from the model state."""
+        super().set_params(params)
+        # Each upper bound alone caps every food with a positive per-gram value
+        with np.errstate(divide="ignore"):
+            caps = np.where(self._upper_rows > 0, self.upper.value[:, None] / self._upper_rows, np.inf)
+        self.most_grams.value = caps.min(axis=0)
+        self.force_in.value = self._include
+        self.force_out.value = self._exclude
+        self.floor.value = max(self._floor, -FLOOR_OFF)
+        capacity = self.cut_rhs.shape[0]
+        rows = np.zeros((capacity, self.n))
+        rhs = np.zeros(capacity)  # unused rows read 0 >= 0
+        rows[:self.n_cuts] = self._rows
+        rhs[:self.n_cuts] = self._rhs
+        self.cut_rows.value, self.cut_rhs.value = rows, rhs
+
+    def fix(self, include=(), exclude=()):
+        """Force the foods at these indices into / out of every bowl."""
+        with self._lock:
+            self._include = np.zeros(self.n)
+            self._exclude = np.zeros(self.n)
+            self._include[list(include)] = 1.0
+            self._exclude[list(exclude)] = 1.0
+            self._floor = -np.inf
+
+    def add_cut(self, ingredients, min_changes=1):
+        """Require at least min_changes ingredients added or dropped relative to this set."""
+        row = np.ones(self.n)
+        row[list(ingredients)] = -1.0
+        with self._lock:
+            if self.n_cuts == self.cut_rhs.shape[0]:
+                self._allocate(2 * self.n_cuts)
+            self._rows = np.vstack([self._rows, row])
+            self._rhs = np.append(self._rhs, min_changes - len(ingredients))
+
+    def reset(self):
+        """Drop all cuts and fixings (the compiled problem is kept)."""
+        with self._lock:
+            self._rows = np.zeros((0, self.n))
+            self._rhs = np.zeros(0)
+            self._include = np.zeros(self.n)
+            self._exclude = np.zeros(self.n)
+            self._floor = -np.inf
+
+    def next_bowl(self, params, solvers=(cp.HIGHS,), solver_options=None, **solve_kwargs):
+        """Best bowl under the current cuts and fixings, or None when there is none."""
+        if params != self._floor_params:
+            self._floor = -np.inf  # the last bowl's objective only bounds solves with its params
+        status, value, x = self.solve(params, solvers=list(solvers),
+                                      solver_options=solver_options or BOWL_SOLVER_OPTIONS, **solve_kwargs)
+        if status not in SOLUTION_STATUSES or x is None:
+            return None
+        ingredients = frozenset(np.flatnonzero(self.used.value > USED_TOL).tolist())
+        self._floor = value - FLOOR_SLACK * max(1.0, abs(value))
+        self._floor_params = dict(params)
+        return Bowl(float(value), x, ingredients)
+
+
+def generate_bowls(model, params, n, min_changes=1, solvers=(cp.HIGHS,), profiler=None, accept=None):
+    """
+    Up to n bowls in objective order, each added as a cut before the next solve.
+
+    Cuts and fixings already on the model are kept, so this continues a
+    previous call or stays inside a fixed part of the search space. A slow
+    call leaves a profile when profiler (a SlowCallProfiler) is enabled.
+    accept(bowl) returning False ends the generation before that bowl.
+    """
+    bowls = []
+    with (profiler or SlowCallProfiler()).profile("generate_bowls", params, model.matrix.fingerprint,
+                                                   objective=model.objective, n=n, min_changes=min_changes,
+                                                   cuts=model.n_cuts):
+        while len(bowls) < n:
+            bowl = model.next_bowl(params, solvers)
+            if bowl is None or (accept is not None and not accept(bowl)):
+                break
+            bowls.append(bowl)
+            model.add_cut(bowl.ingredients, min_changes)
+    return bowls
+
+
+def partitions(ingredients):
+    """
+    Disjoint (include, exclude) parts covering every ingredient set.
+
+    Part j keeps the first j ingredients and drops the next one; the last
+    part keeps them all (this set and its supersets).
+    """
+    ordered = sorted(ingredients)
+    return [(ordered[:j], [ordered[j]]) for j in range(len(ordered))] + [(ordered, [])]
+
+
+def _keeps_distance(bowl, kept, min_changes):
+    return all(len(bowl.ingredients ^ other.ingredients) >= min_changes for other in kept)
+
+
+def _offer(best, objective):
+    """
+    Record an objective in the shared ascending array of the best ones found.
+
+    False when it is worse than every entry (the array is full of better
+    bowls), so the part that found it can stop.
+    """
+    with best.get_lock():
+        values = best[:]
+        if objective > values[-1]:
+            return False
+        i = bisect.bisect_right(values, objective)
+        best[i + 1:] = values[i:-1]
+        best[i] = objective
+        return True
+
+
+# Compiled model, profiler and shared best objectives held by each worker process
+_worker_model = None
+_worker_profiler = None
+_worker_best = None
+
+
+def _init_worker(matrix, objective, min_grams, profiler, best):
+    global _worker_model, _worker_profiler, _worker_best
+    _worker_model = BowlVariantModel(matrix, objective, min_grams)
+    _worker_profiler = profiler
+    _worker_best = best
+
+
+def _generate_part(task):
+    include, exclude, best, params, n, min_changes = task
+    # The part's fixings and first cut are labels, so a slow part can be replayed alone
+    with (_worker_profiler or SlowCallProfiler()).profile(
+            "generate_bowls_part", params, _worker_model.matrix.fingerprint,
+            objective=_worker_model.objective, n=n, min_changes=min_changes,
+            include=list(include), exclude=list(exclude), best=sorted(best)):
+        _worker_model.reset()
+        _worker_model.fix(include, exclude)
+        _worker_model.add_cut(best, min_changes)
+        return generate_bowls(_worker_model, params, n, min_changes,
+                              accept=lambda bowl: _offer(_worker_best, bowl.objective))
+
+
+def generate_bowls_parallel(matrix, params, n, objective="cost", min_changes=1, workers=None,
+                            min_grams=MIN_INGREDIENT_GRAMS, profiler=None):
+    """
+    generate_bowls() across worker processes, one part of the search space each.
+
+    Parts stop at the shared cutoff (the n-th best objective found by any
+    part so far). With min_changes > 1 the merged bowls are filtered in
+    objective order so that every pair still differs by min_changes
+    ingredients; the result can then differ from (and be shorter than) the
+    sequential one.
+    """
+    model = BowlVariantModel(matrix, objective, min_grams)
+    best = model.next_bowl(params)
+    if best is None or n <= 1:
+        return [best] if best is not None else []
+
+    workers = workers or os.cpu_count() or 1
+    tasks = [(include, exclude, best.ingredients, params, n - 1, min_changes)
+             for include, exclude in partitions(best.ingredients)]
+    shared_best = multiprocessing.Array("d", [np.inf] * n)
+    _offer(shared_best, best.objective)
+    candidates = []
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), initializer=_init_worker,
+                             initargs=(matrix, objective, min_grams, profiler, shared_best)) as executor:
+        for part in executor.map(_generate_part, tasks):
+            candidates.extend(part)
+
+    bowls = [best]
+    for bowl in sorted(candidates, key=lambda bowl: bowl.objective):
+        if len(bowls) == n:
+            break
+        if _keeps_distance(bowl, bowls, min_changes):
+            bowls.append(bowl)
+    return bowls
+
+
+def bowl_table(matrix, bowls):
+    """One row per bowl: cost, macros, weight and the ingredient list."""
+    price = np.asarray(matrix.cost)
+    rows = []
+    for rank, bowl in enumerate(bowls, start=1):
+        totals = matrix.totals(bowl.x)
+        order = sorted(bowl.ingredients, key=lambda i: -bowl.x[i])
+        rows.append({
+            "Bowl": rank,
+            "Cost ($)": round(float(price @ bowl.x), 2),
+            "Calories": round(totals.get("Caloric Value", 0.0), 1),
+            "Protein (g)": round(totals.get("Protein", 0.0), 1),
+            "Carbs (g)": round(totals.get("Carbohydrates", 0.0), 1),
+            "Fat (g)": round(totals.get("Fat", 0.0), 1),
+            "Fiber (g)": round(totals.get("Dietary Fiber", 0.0), 1),
+            "Weight (g)": round(float(bowl.x.sum()), 1),
+            "Ingredients": ", ".join(f"{matrix.food_names[i]} {bowl.x[i]:.0f} g" for i in order),
+        })
+    return pd.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a menu of distinct recipe bowls.")
+    parser.add_argument("-n", "--count", type=int, default=50, help="bowls to generate (default: %(default)s)")
+    parser.add_argument("--objective", choices=sorted(BOWL_PRESETS), default="cost",
+                        help="cheapest or highest-protein bowls (default: %(default)s)")
+    parser.add_argument("--min-changes", type=int, default=1,
+                        help="ingredients every bowl adds or drops vs. each earlier one (default: %(default)s)")
+    parser.add_argument("--data", default=DEFAULT_FILENAME,
+                        help="dataset file in Datasets/ (default: %(default)s)")
+    parser.add_argument("-j", "--workers", type=int, default=1,
+                        help="worker processes, 0 = all cores (default: %(default)s)")
+    parser.add_argument("-o", "--output", help="write the bowl table to this .csv")
+    parser.add_argument("--profile", default=os.environ.get(PROFILE_ENV),
+                        help=f"keep profiles of slow generations in this folder (default: ${PROFILE_ENV}, off if unset)")
+    parser.add_argument("--profile-threshold", type=float,
+                        default=float(os.environ.get(THRESHOLD_ENV) or DEFAULT_THRESHOLD),
+                        help="seconds a generation takes before its profile is kept (default: %(default)s)")
+    args = parser.parse_args()
+
+    matrix = load_matrix(args.data)
+    params = BOWL_PRESETS[args.objective]
+    profiler = SlowCallProfiler(args.profile, args.profile_threshold, os.environ.get(FORMAT_ENV) or "pstats")
+    start = time.perf_counter()
+    if args.workers == 1:
+        bowls = generate_bowls(BowlVariantModel(matrix, args.objective), params, args.count, args.min_changes,
+                               profiler=profiler)
+    else:
+        bowls = generate_bowls_parallel(matrix, params, args.count, args.objective, args.min_changes,
+                                        workers=args.workers or None, profiler=profiler)
+    elapsed = time.perf_counter() - start
+
+    table = bowl_table(matrix, bowls)
+    if args.output:
+        table.to_csv(args.output, index=False)
+        print(f"{len(table)} bowls written to {args.output}")
+    else:
+        with pd.option_context("display.max_colwidth", 80, "display.width", 200):
+            print(table.to_string(index=False))
+    print(f"Generated {len(bowls)} bowls in {elapsed:.2f} s")
+    if profiler.enabled:
+        print(f"Profiles of generations over {profiler.threshold:g} s are kept in {profiler.directory}/")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# Single-meal bowl models from recipes-nutri-bowl
+#
+# Same formulations as recipes-nutri-bowl/nutrition.py (cheapest bowl) and
+# recipes-nutri-bowl/protien-bowl/protein-opt.py (highest-protein bowl):
+# nutrient ranges plus a total bowl weight range. Compiled once per
+# dataset like DietModel, with every bound a cvxpy Parameter.
+
+import threading
+
+import cvxpy as cp
+
+from diet_model import DietModel, bound_vectors
+
+# (params key, dataset column, sense); "grams" is the bowl weight itself
+BOWL_BOUNDS = [
+    ("cal_min",   "Caloric Value", ">="),
+    ("cal_max",   "Caloric Value", "<="),
+    ("prot_min",  "Protein",       ">="),
+    ("carb_min",  "Carbohydrates", ">="),
+    ("carb_max",  "Carbohydrates", "<="),
+    ("fat_min",   "Fat",           ">="),
+    ("fat_max",   "Fat",           "<="),
+    ("fib_min",   "Dietary Fiber", ">="),
+    ("sug_max",   "Sugars",        "<="),
+    ("na_max",    "Sodium",        "<="),
+    ("grams_min", "grams",         ">="),
+    ("grams_max", "grams",         "<="),
+]
+
+# Bounds used by the two scripts
+BUDGET_BOWL = {
+    "cal_min": 1200, "cal_max": 1400, "prot_min": 25,
+    "carb_min": 50, "carb_max": 110, "fat_min": 10, "fat_max": 35,
+    "fib_min": 8, "sug_max": 20, "na_max": 2,
+    "grams_min": 350, "grams_max": 600,
+}
+PROTEIN_BOWL = {
+    "cal_min": 500, "cal_max": 800, "prot_min": 0,
+    "carb_min": 50, "carb_max": 110, "fat_min": 10, "fat_max": 35,
+    "fib_min": 8, "sug_max": 40, "na_max": 2,
+    "grams_min": 350, "grams_max": 600,
+}
+
+# objective name -> preset bounds
+BOWL_PRESETS = {"cost": BUDGET_BOWL, "protein": PROTEIN_BOWL}
+
+
+class BowlModel(DietModel):
+    """
+    Bowl LP compiled once per dataset.
+
+    objective: "cost" minimizes price (nutrition.py), "protein" maximizes
+    protein (protein-opt.py). solve() returns (status, objective value, x);
+    for "protein" the value is minus the protein grams, as in the script.
+    """
+
+    def __init__(self, matrix, objective="cost"):
+        if objective not in BOWL_PRESETS:
+            raise ValueError(f"Unknown bowl objective: {objective}")
+        self.matrix = matrix
+        self.objective = objective
+        self.cost = matrix.cost
+        self.n = matrix.n_foods
+        self.x = cp.Variable(self.n, nonneg=True)
+
+        def block(sense):
+            columns = [column for _, column, s in BOWL_BOUNDS if s == sense and column != "grams"]
+            return matrix.rows(columns)
+
+        # Nutrient rows first, then the bowl weight (sum of grams) per sense
+        self.lower = cp.Parameter(sum(s == ">=" for _, _, s in BOWL_BOUNDS), name="lower")
+        self.upper = cp.Parameter(sum(s == "<=" for _, _, s in BOWL_BOUNDS), name="upper")
+        weight = cp.sum(self.x)
+        constraints = [
+            cp.hstack([block(">=") @ self.x, weight]) >= self.lower,
+            cp.hstack([block("<=") @ self.x, weight]) <= self.upper,
+        ]
+        if objective == "cost":
+            goal = cp.Minimize(self.cost @ self.x)
+        else:
+            goal = cp.Minimize(-matrix.row("Protein") @ self.x)
+
+        self.n_categories = 0
+        self.min_categories = None
+        self.problem = cp.Problem(goal, constraints)
+        self.last_stats = None
+        self.last_sensitivity = None
+        self._lock = threading.Lock()
+
+    def _sensitivity(self, params, x):
+        return None  # bowl bounds include the bowl weight; not mapped to diet params
+
+    def set_params(self, params):
+        """Copy bowl bounds from a params dict (missing keys use the preset)."""
+        self.lower.value, self.upper.value = bound_vectors({**BOWL_PRESETS[self.objective], **params},
+                                                           BOWL_BOUNDS)
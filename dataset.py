@@ -0,0 +1,279 @@
+# Dataset helpers shared by main.py, app.py and batch.py
+#
+# CSVs are read in chunks with compact dtypes: the leftover index columns
+# ("Unnamed: ...") are never parsed, numeric nutrients are float32, price
+# stays float64 (costs are summed over many foods), food / Category are
+# categoricals and any other text column is kept as read. Each chunk is cleaned as soon as it is read, so peak
+# memory is one raw chunk plus about twice the cleaned rows (chunks and
+# the concatenated frame), never the raw file.
+#
+# Uploaded CSVs go through check_upload(): the header is checked before any
+# row is parsed, then every chunk is coerced to the same dtypes and
+# range-checked column by column with vectorized masks. Problems are
+# collected per (column, problem) with a row count and the first few row
+# numbers; reading stops after the first chunk with an error, so a bad file
+# is rejected before it is fully parsed (let alone solved).
+
+import hashlib
+import os
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+DATA_DIR = "Datasets"
+DEFAULT_FILENAME = "food_data_with_prices.csv"
+CACHE_DIRNAME = ".cache"  # binary matrix caches, inside the data folder
+PRICE_COL = "Market Price (USD per gram)"
+
+# conversion factor constant: dataset is per 100 g
+PER_100G_TO_PER_G = 100.0
+
+CHUNK_ROWS = 100_000                     # CSV rows parsed per chunk
+CATEGORICAL_COLS = ("food", "Category")  # text columns stored as pandas categoricals
+
+REQUIRED_COLS = ("food", PRICE_COL, "Caloric Value", "Protein", "Carbohydrates", "Fat")
+# Columns measured in grams, so a value per 100 g above 100 is suspect
+GRAM_COLS = ("Fat", "Saturated Fats", "Monounsaturated Fats", "Polyunsaturated Fats",
+             "Carbohydrates", "Sugars", "Protein", "Dietary Fiber", "Water")
+# Nutrient columns of the bundled datasets; in an upload these must be numeric
+KNOWN_NUTRIENT_COLS = (
+    "Caloric Value", "Fat", "Saturated Fats", "Monounsaturated Fats", "Polyunsaturated Fats",
+    "Carbohydrates", "Sugars", "Protein", "Dietary Fiber", "Cholesterol", "Sodium", "Water",
+    "Vitamin A", "Vitamin B1", "Vitamin B11", "Vitamin B12", "Vitamin B2", "Vitamin B3",
+    "Vitamin B5", "Vitamin B6", "Vitamin C", "Vitamin D", "Vitamin E", "Vitamin K",
+    "Calcium", "Copper", "Iron", "Magnesium", "Manganese", "Phosphorus", "Potassium",
+    "Selenium", "Zinc", "Nutrition Density",
+)
+MAX_EXAMPLE_ROWS = 5  # row numbers listed per problem in an upload report
+
+
+def resolve_data_path(filename=DEFAULT_FILENAME, data_dir=DATA_DIR):
+    """Path of a dataset in the Datasets/ folder; a missing .csv falls back to the .xlsx."""
+    data_path = os.path.join(data_dir, filename)
+    if data_path.endswith(".csv") and not os.path.exists(data_path):
+        data_path = os.path.splitext(data_path)[0] + ".xlsx"
+    return data_path
+
+
+def load_dataset(filename=DEFAULT_FILENAME, data_dir=DATA_DIR) -> pd.DataFrame:
+    """Load and clean a dataset from the Datasets/ folder (.csv, falling back to .xlsx)."""
+    data_path = resolve_data_path(filename, data_dir)
+    if data_path.endswith(".csv"):
+        return read_csv_chunked(data_path)
+    df = pd.read_excel(data_path)
+    df = df.drop(columns=[col for col in df.columns if str(col).startswith("Unnamed")])
+    return clean_dataset(compact_nutrients(df.astype(dataset_dtypes(df.columns), errors="ignore")))
+
+
+def dataset_dtypes(columns):
+    """Dtypes known from the header alone: categoricals for food / Category, float64 price."""
+    return {
+        col: "category" if col in CATEGORICAL_COLS else np.float64
+        for col in columns
+        if col in CATEGORICAL_COLS or col == PRICE_COL
+    }
+
+
+def compact_nutrients(df):
+    """Store the numeric nutrient columns as float32; other columns (notes, brands, ...) are kept as read."""
+    for col in nutrient_columns(df):
+        if df[col].dtype != np.float32:
+            df[col] = df[col].astype(np.float32)
+    return df
+
+
+def read_header(source):
+    """Dataset columns of a CSV (leftover index columns dropped), reading only the header."""
+    header = pd.read_csv(source, nrows=0).columns
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return [str(col) for col in header if not str(col).startswith("Unnamed")]
+
+
+def read_csv_chunked(source, chunk_rows=CHUNK_ROWS):
+    """
+    Read and clean a dataset CSV in chunks of chunk_rows rows.
+
+    Only the header is read up front, to pick the columns to keep and their
+    dtypes; every chunk has its nutrients narrowed and is cleaned before the
+    next one is parsed.
+    """
+    columns = read_header(source)
+    dtypes = dataset_dtypes(columns)
+    chunks = [
+        clean_dataset(compact_nutrients(chunk))
+        for chunk in pd.read_csv(source, usecols=columns, dtype=dtypes, chunksize=chunk_rows)
+    ]
+    if not chunks:
+        return clean_dataset(pd.DataFrame({col: pd.Series(dtype=dtypes.get(col, np.float32))
+                                           for col in columns}))
+    return concat_chunks(chunks)
+
+
+def concat_chunks(chunks):
+    """
+    Concatenate cleaned chunks (emptying the list), keeping categoricals categorical.
+
+    Each chunk's categories are looked up once in the merged category index
+    and its codes remapped, instead of re-encoding every row.
+    """
+    columns = list(chunks[0].columns)
+    categorical = [col for col in columns if isinstance(chunks[0][col].dtype, pd.CategoricalDtype)]
+    merged = {}
+    for col in categorical:
+        parts = [chunk[col].array for chunk in chunks]
+        categories = pd.Index(np.concatenate([part.categories.to_numpy() for part in parts])).unique()
+        codes = [np.append(categories.get_indexer(part.categories), -1)[part.codes] for part in parts]
+        merged[col] = pd.Categorical.from_codes(np.concatenate(codes), categories)
+    for i, chunk in enumerate(chunks):
+        chunks[i] = chunk.drop(columns=categorical)
+    df = pd.concat(chunks, ignore_index=True)
+    chunks.clear()
+    for col in categorical:
+        df.insert(columns.index(col), col, merged[col])
+    return df
+
+
+def file_fingerprint(path, chunk_size=1 << 20):
+    """Content hash (sha256 hex) of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def clean_dataset(df: pd.DataFrame) -> pd.DataFrame:
+    """Basic cleaning shared by bundled and uploaded datasets."""
+    # One mask and one copy: rows need a positive price, calories and protein
+    keep = (df[PRICE_COL] > 0) & df["Caloric Value"].notna() & df["Protein"].notna()
+    df = df[keep.to_numpy()].reset_index(drop=True)
+    if "Category" in df.columns:
+        category = df["Category"]
+        if isinstance(category.dtype, pd.CategoricalDtype) and "Unspecified" not in category.cat.categories:
+            category = category.cat.add_categories("Unspecified")
+        df["Category"] = category.fillna("Unspecified")
+    return df
+
+
+def validate_dataset(df: pd.DataFrame):
+    """Check for required columns and return missing ones."""
+    missing = [c for c in REQUIRED_COLS if c not in df.columns]
+    return missing
+
+
+class UploadCheck(NamedTuple):
+    """
+    Outcome of check_upload().
+
+    df is the cleaned dataset, or None when the report has an error. The
+    report has one row per (column, problem): severity ("error" rejects
+    the file, "warning" does not), the number of rows and the first row
+    numbers (1 = first data row). rows_checked counts the data rows read.
+    """
+    df: pd.DataFrame
+    report: pd.DataFrame
+    rows_checked: int
+
+
+def _flag(issues, column, problem, severity, mask, offset):
+    """Add the rows of mask (a chunk starting at data row offset) to an issue."""
+    rows = np.flatnonzero(np.asarray(mask))
+    if len(rows) == 0:
+        return
+    entry = issues.setdefault((column, problem), [severity, 0, []])
+    entry[1] += len(rows)
+    room = MAX_EXAMPLE_ROWS - len(entry[2])
+    if room > 0:
+        entry[2].extend((rows[:room] + offset + 1).tolist())
+
+
+def _check_chunk(chunk, issues, offset):
+    """Coerce a raw chunk's numeric columns in place and record its problems."""
+    if "food" in chunk.columns:
+        _flag(issues, "food", "missing value", "error", chunk["food"].isna(), offset)
+    for col in chunk.columns:
+        if col in CATEGORICAL_COLS:
+            continue
+        raw = chunk[col]
+        values = raw if pd.api.types.is_numeric_dtype(raw) else pd.to_numeric(raw, errors="coerce")
+        not_numeric = values.isna() & raw.notna()
+        if col != PRICE_COL and col not in KNOWN_NUTRIENT_COLS and not_numeric.any():
+            # An extra text column (notes, brand, ...) is kept but not used as a nutrient
+            _flag(issues, col, "text column (not used as a nutrient)", "warning", not_numeric, offset)
+            continue
+        _flag(issues, col, "not a number", "error", not_numeric, offset)
+        missing = raw.isna()
+        if col in REQUIRED_COLS:
+            _flag(issues, col, "missing value", "error", missing, offset)
+        else:
+            _flag(issues, col, "missing value (read as 0)", "warning", missing, offset)
+        _flag(issues, col, "negative price" if col == PRICE_COL else "negative value", "error",
+              values < 0, offset)
+        if col in GRAM_COLS:
+            _flag(issues, col, "over 100 g per 100 g", "warning", values > PER_100G_TO_PER_G, offset)
+        chunk[col] = values.astype(np.float64 if col == PRICE_COL else np.float32)
+
+
+def upload_report(issues):
+    """Report frame of check_upload(), errors first."""
+    report = pd.DataFrame(
+        [(col, problem, severity, count, rows) for (col, problem), (severity, count, rows) in issues.items()],
+        columns=["column", "problem", "severity", "rows", "first rows"],
+    )
+    return report.sort_values("severity", kind="stable", ignore_index=True)
+
+
+def check_upload(source, chunk_rows=CHUNK_ROWS, stop_on_error=True) -> UploadCheck:
+    """
+    Validate, coerce and clean an uploaded dataset CSV (path or file object).
+
+    Missing required columns are reported from the header alone. Every
+    chunk is then coerced to the dataset dtypes (unparseable numbers in the
+    price and the known nutrient columns become "not a number" errors) and
+    range-checked: negative prices or nutrients and missing required values
+    are errors; missing optional nutrients and gram columns above 100 g per
+    100 g are warnings, since some datasets list servings rather than 100 g.
+    Other columns with text in them are kept, reported as warnings and not
+    used as nutrients. With stop_on_error, reading stops after the first
+    chunk with an error.
+    """
+    issues = {}
+    columns = read_header(source)
+    for col in REQUIRED_COLS:
+        if col not in columns:
+            issues[(col, "missing column")] = ["error", 0, []]
+    if issues:
+        return UploadCheck(None, upload_report(issues), 0)
+
+    # Only the categoricals are typed while parsing; numbers are coerced and checked per chunk
+    text_dtypes = {col: "category" for col in columns if col in CATEGORICAL_COLS}
+    chunks, offset = [], 0
+    with pd.read_csv(source, usecols=columns, dtype=text_dtypes, chunksize=chunk_rows) as reader:
+        for chunk in reader:
+            _check_chunk(chunk, issues, offset)
+            offset += len(chunk)
+            has_error = any(severity == "error" for severity, _, _ in issues.values())
+            if has_error and stop_on_error:
+                break
+            if not has_error:
+                chunks.append(clean_dataset(chunk))
+    if offset == 0:
+        issues[("(file)", "no data rows")] = ["error", 0, []]
+
+    report = upload_report(issues)
+    if (report["severity"] == "error").any():
+        return UploadCheck(None, report, offset)
+    return UploadCheck(concat_chunks(chunks), report, offset)
+
+
+def nutrient_columns(df):
+    """Numeric nutrient columns of a dataset (everything except ids, name, price, category)."""
+    skip = {"food", PRICE_COL, "Category"}
+    return [
+        col for col in df.columns
+        if col not in skip
+        and not col.startswith("Unnamed")
+        and pd.api.types.is_numeric_dtype(df[col])
+    ]
@@ -0,0 +1,182 @@
+# Infeasibility diagnosis
+#
+# One elastic solve: every bound gets a nonnegative slack, the objective is
+# the total relative relaxation (slack / max(1, |bound|)), so the solution
+# names the few bounds that have to move and by how much. An optional
+# deletion filter on the regular model then finds an irreducible
+# infeasible subset (IIS): bounds that conflict with each other, where
+# dropping any single one makes the rest feasible.
+
+import threading
+from typing import NamedTuple
+
+import cvxpy as cp
+import numpy as np
+
+from diet_model import (
+    DIVERSITY_MIN_GRAMS, NUTRIENT_BOUNDS, OPTIMAL_STATUSES, DietModel, bound_vectors,
+)
+
+RELAX_TOL = 1e-6      # slacks below this (relative) count as zero
+RELAXED_UPPER = 1e9   # stands in for "no upper bound" when the IIS filter drops one
+
+
+class Relaxation(NamedTuple):
+    """One bound that has to move: params key, current value, feasible value."""
+    key: str
+    bound: float
+    relaxed_to: float
+
+    @property
+    def amount(self):
+        return abs(self.relaxed_to - self.bound)
+
+
+class Diagnosis(NamedTuple):
+    """Result of diagnose(): minimal relaxations, plus the IIS when requested."""
+    status: str
+    relaxations: list
+    iis: list
+
+
+class ElasticDietModel:
+    """Diet model with a penalized slack on every bound, compiled once per dataset."""
+
+    def __init__(self, matrix, use_categories=False):
+        self.matrix = matrix
+        self.lower_keys = [key for key, _, sense in NUTRIENT_BOUNDS if sense == ">="]
+        self.upper_keys = [key for key, _, sense in NUTRIENT_BOUNDS if sense == "<="]
+        A_lower = matrix.rows([column for _, column, sense in NUTRIENT_BOUNDS if sense == ">="])
+        A_upper = matrix.rows([column for _, column, sense in NUTRIENT_BOUNDS if sense == "<="])
+
+        x = cp.Variable(matrix.n_foods, nonneg=True)
+        self.s_lower = cp.Variable(len(self.lower_keys), nonneg=True)
+        self.s_upper = cp.Variable(len(self.upper_keys), nonneg=True)
+        self.s_cap = cp.Variable(nonneg=True)
+        self.lower = cp.Parameter(len(self.lower_keys))
+        self.upper = cp.Parameter(len(self.upper_keys))
+        self.max_per_food = cp.Parameter(nonneg=True)
+        self.w_lower = cp.Parameter(len(self.lower_keys), nonneg=True)
+        self.w_upper = cp.Parameter(len(self.upper_keys), nonneg=True)
+        self.w_cap = cp.Parameter(nonneg=True)
+
+        constraints = [
+            x <= self.max_per_food + self.s_cap,
+            A_lower @ x + self.s_lower >= self.lower,
+            A_upper @ x - self.s_upper <= self.upper,
+        ]
+        penalty = self.w_lower @ self.s_lower + self.w_upper @ self.s_upper + self.w_cap * self.s_cap
+
+        # Category block: the variety target is elastic too
+        self.n_categories = 0
+        self.min_categories = None
+        if use_categories and matrix.category_index is not None:
+            onehot = matrix.category_index.onehot
+            self.n_categories = onehot.shape[0]
+            self.min_categories = cp.Parameter(nonneg=True)
+            self.s_categories = cp.Variable(nonneg=True)
+            self.w_categories = cp.Parameter(nonneg=True)
+            y = cp.Variable(self.n_categories, boolean=True)
+            constraints += [
+                # relaxing the cap relaxes the category totals by the same amount
+                onehot @ x <= self.max_per_food * y + self.s_cap,
+                onehot @ x >= DIVERSITY_MIN_GRAMS * y,
+                cp.sum(y) + self.s_categories >= self.min_categories,
+            ]
+            penalty += self.w_categories * self.s_categories
+
+        self.problem = cp.Problem(cp.Minimize(penalty), constraints)
+        self._lock = threading.Lock()
+
+    def solve(self, params, solvers=(cp.HIGHS,)):
+        """(status, list of Relaxation) with the smallest total relative relaxation."""
+        lower, upper = bound_vectors(params)
+        max_per_food = float(params.get("max_per_food", 0))
+        with self._lock:
+            self.lower.value, self.upper.value = lower, upper
+            self.max_per_food.value = max_per_food
+            self.w_lower.value = 1.0 / np.maximum(1.0, np.abs(lower))
+            self.w_upper.value = 1.0 / np.maximum(1.0, np.abs(upper))
+            self.w_cap.value = 1.0 / max(1.0, max_per_food)
+            min_categories = 0.0
+            if self.min_categories is not None:
+                min_categories = min(float(params.get("min_categories", 0)), self.n_categories)
+                self.min_categories.value = min_categories
+                self.w_categories.value = 1.0 / max(1.0, min_categories)
+            self.problem.solve(solver=solvers[0])
+            if self.problem.status not in OPTIMAL_STATUSES:
+                return self.problem.status, []
+
+            relaxations = []
+            for key, bound, slack in zip(self.lower_keys, lower, self.s_lower.value):
+                if slack > RELAX_TOL * max(1.0, abs(bound)):
+                    relaxations.append(Relaxation(key, float(bound), float(bound - slack)))
+            for key, bound, slack in zip(self.upper_keys, upper, self.s_upper.value):
+                if slack > RELAX_TOL * max(1.0, abs(bound)):
+                    relaxations.append(Relaxation(key, float(bound), float(bound + slack)))
+            if self.s_cap.value > RELAX_TOL * max(1.0, max_per_food):
+                relaxations.append(Relaxation("max_per_food", max_per_food,
+                                              float(max_per_food + self.s_cap.value)))
+            if self.min_categories is not None and self.s_categories.value > RELAX_TOL:
+                relaxations.append(Relaxation("min_categories", min_categories,
+                                              float(min_categories - self.s_categories.value)))
+            return self.problem.status, relaxations
+
+
+def relaxed_params(params, relaxations):
+    """params with every relaxation applied."""
+    return {**params, **{relaxation.key: relaxation.relaxed_to for relaxation in relaxations}}
+
+
+def _dropped(params, key):
+    """params with one bound made inactive."""
+    if key in ("max_per_food",) or key.endswith("_max"):
+        return {**params, key: RELAXED_UPPER}
+    return {**params, key: 0.0}
+
+
+def irreducible_subset(model, params, solvers=(cp.HIGHS,)):
+    """
+    Deletion filter: params keys of an irreducible infeasible subset.
+
+    Drops active bounds one at a time on the regular model (one re-solve
+    each); a bound stays dropped when the rest is still infeasible. Empty
+    when params are feasible.
+    """
+    def infeasible(candidate):
+        status, _, _ = model.solve(candidate, solvers=list(solvers))
+        return status not in OPTIMAL_STATUSES and status != "user_limit"
+
+    if not infeasible(params):
+        return []
+
+    keys = [key for key, _, sense in NUTRIENT_BOUNDS
+            if sense == "<=" or float(params.get(key, 0)) > 0]
+    keys.append("max_per_food")
+    if float(params.get("min_categories", 0)) > 0:
+        keys.append("min_categories")
+
+    current = dict(params)
+    subset = []
+    for key in keys:
+        candidate = _dropped(current, key)
+        if infeasible(candidate):
+            current = candidate
+        else:
+            subset.append(key)
+    return subset
+
+
+def diagnose(matrix, params, use_categories=False, find_iis=False, elastic=None, model=None):
+    """
+    Diagnose an infeasible profile with one elastic solve.
+
+    elastic / model: optional compiled ElasticDietModel / DietModel to reuse;
+    model is only needed (and built if missing) when find_iis is set.
+    """
+    elastic = elastic or ElasticDietModel(matrix, use_categories)
+    status, relaxations = elastic.solve(params)
+    iis = None
+    if find_iis:
+        iis = irreducible_subset(model or DietModel(matrix, use_categories), params)
+    return Diagnosis(status, relaxations, iis)
@@ -0,0 +1,315 @@
+# Compiled diet LP shared by main.py and app.py
+#
+# The model is built once per dataset. Every nutrient bound and the
+# per-food cap are cvxpy Parameters, so re-solving for a new profile only
+# updates parameter values and cvxpy reuses the cached (DPP) canonicalization.
+
+import threading
+import time
+import weakref
+from typing import NamedTuple
+
+import cvxpy as cp
+import numpy as np
+
+from bounds import (  # re-exported for existing imports
+    NUTRIENT_BOUNDS, OPTIMAL_STATUSES, PROFILE_FIELDS, SOLUTION_STATUSES, bound_vectors, finite_upper,
+)
+
+# Require at least this many grams for a category to count towards variety
+DIVERSITY_MIN_GRAMS = 1.0
+
+# A bound is binding when its slack is below this, relative to max(1, |bound|)
+BINDING_TOL = 1e-6
+
+
+class Sensitivity(NamedTuple):
+    """
+    Dual information of one solve.
+
+    shadow_prices : params key -> cost change ($) from tightening the bound
+                    by one unit (raising a min, lowering a max); None for
+                    the category MILP, which has no duals
+    reduced_costs : per food, $ per gram added to the cost by forcing one
+                    more gram of it into the plan (None for the MILP)
+    binding       : params keys of bounds that hold with equality
+    """
+    shadow_prices: dict
+    reduced_costs: np.ndarray
+    binding: list
+
+
+class SolveResult(NamedTuple):
+    """
+    One solve: (status, cost, x) plus the statistics and sensitivity of that
+    call, so callers sharing a model never read another call's numbers.
+    """
+    status: str
+    cost: float
+    x: np.ndarray
+    stats: dict
+    sensitivity: Sensitivity
+
+
+def build_model(matrix, use_categories=False, backend="cvxpy"):
+    """Diet model for the chosen backend: "cvxpy" (DietModel) or "highs" (scipy HiGHS)."""
+    if backend == "highs":
+        from highs_backend import HighsDietModel
+        return HighsDietModel(matrix, use_categories)
+    if backend != "cvxpy":
+        raise ValueError(f"Unknown backend: {backend}")
+    return DietModel(matrix, use_categories)
+
+
+def invalid_bounds(params):
+    """Params keys whose value is missing, blank or not a finite number."""
+    invalid = []
+    for key, value in params.items():
+        try:
+            if not np.isfinite(float(value)):
+                invalid.append(key)
+        except (TypeError, ValueError):
+            invalid.append(key)
+    return invalid
+
+
+class BaseDietModel:
+    """
+    Backend-independent helpers; subclasses implement solve_result(params,
+    **kwargs) and set lower_keys, upper_keys, A_lower and A_upper.
+    """
+
+    def solve(self, params, *args, **kwargs):
+        """(status, cost, x) of solve_result()."""
+        return tuple(self.solve_result(params, *args, **kwargs)[:3])
+
+    def solve_many(self, records):
+        """
+        Solve a list of params dicts; returns (statuses, costs, X) where X
+        is a (profiles x foods) grams matrix with NaN rows for failed solves.
+        """
+        statuses = []
+        costs = np.full(len(records), np.nan)
+        X = np.full((len(records), self.n), np.nan)
+        for i, params in enumerate(records):
+            # A bad row gets an error status instead of aborting the whole batch
+            invalid = invalid_bounds(params)
+            if invalid:
+                statuses.append(f"Error: missing or non-numeric {', '.join(invalid)}")
+                continue
+            try:
+                status, cost, x_value = self.solve(params)
+            except Exception as e:
+                statuses.append(f"Error: {e}")
+                continue
+            statuses.append(status)
+            if x_value is not None:
+                costs[i] = cost
+                X[i] = x_value
+        return statuses, costs, X
+
+    def solver_bounds(self, params):
+        """(lower, upper, max_per_food) for the solver; a missing upper limit becomes a finite no-op."""
+        lower, upper = bound_vectors(params)
+        max_per_food = float(params.get("max_per_food", 0))
+        if getattr(self, "_upper_sums", None) is None:
+            self._upper_sums = self.matrix.rows(
+                [column for _, column, sense in NUTRIENT_BOUNDS if sense == "<="]).sum(axis=1)
+        return lower, finite_upper(upper, self._upper_sums, max_per_food), max_per_food
+
+    def sensitivity(self, params, x, lower_duals=None, upper_duals=None, cap_duals=None):
+        """
+        Sensitivity of a solution x from nonnegative bound duals (as cvxpy
+        reports them); without duals only the binding list is filled in.
+        """
+        lower, upper = bound_vectors(params)
+        max_per_food = float(params.get("max_per_food", 0))
+
+        def is_binding(activity, bound):
+            return np.isfinite(bound) & (np.abs(activity - bound) <= BINDING_TOL * np.maximum(1.0, np.abs(bound)))
+
+        binding = [key for key, hit in zip(self.lower_keys, is_binding(self.A_lower @ x, lower)) if hit]
+        binding += [key for key, hit in zip(self.upper_keys, is_binding(self.A_upper @ x, upper)) if hit]
+        if is_binding(x, max_per_food).any():
+            binding.append("max_per_food")
+
+        if lower_duals is None:
+            return Sensitivity(None, None, binding)
+        shadow_prices = dict(zip(self.lower_keys, np.asarray(lower_duals, dtype=float).tolist()))
+        shadow_prices.update(zip(self.upper_keys, np.asarray(upper_duals, dtype=float).tolist()))
+        shadow_prices["max_per_food"] = float(np.sum(cap_duals))
+        reduced_costs = np.asarray(self.cost) - self.A_lower.T @ lower_duals + self.A_upper.T @ upper_duals
+        return Sensitivity(shadow_prices, reduced_costs, binding)
+
+
+class DietModel(BaseDietModel):
+    """Diet LP compiled once per dataset and re-solved with new bounds."""
+
+    def __init__(self, matrix, use_categories=False):
+        """
+        matrix         : NutrientMatrix for the active foods
+        use_categories : add the min_categories diversity block (MILP);
+                         needs matrix.categories
+        """
+        self.matrix = matrix
+        self.cost = matrix.cost
+        self.n = matrix.n_foods
+        self.x = cp.Variable(self.n, nonneg=True)
+
+        # Bounds split into one ">=" block and one "<=" block over nutrient rows
+        self.lower_keys = [key for key, _, sense in NUTRIENT_BOUNDS if sense == ">="]
+        self.upper_keys = [key for key, _, sense in NUTRIENT_BOUNDS if sense == "<="]
+        self.A_lower = matrix.rows([column for _, column, sense in NUTRIENT_BOUNDS if sense == ">="])
+        self.A_upper = matrix.rows([column for _, column, sense in NUTRIENT_BOUNDS if sense == "<="])
+        self.lower = cp.Parameter(len(self.lower_keys), name="lower")
+        self.upper = cp.Parameter(len(self.upper_keys), name="upper")
+        self.max_per_food = cp.Parameter(nonneg=True, name="max_per_food")
+
+        constraints = [
+            # Upper bound per food to encourage variety
+            self.x <= self.max_per_food,
+            self.A_lower @ self.x >= self.lower,
+            self.A_upper @ self.x <= self.upper,
+        ]
+        self.cap_constraint, self.lower_constraint, self.upper_constraint = constraints
+
+        # Category diversity constraint (optional): one binary per category,
+        # linked to the category gram totals through the sparse one-hot matrix
+        self.n_categories = 0
+        self.min_categories = None
+        if use_categories and matrix.category_index is not None:
+            onehot = matrix.category_index.onehot
+            self.n_categories = onehot.shape[0]
+            self.min_categories = cp.Parameter(nonneg=True, name="min_categories")
+            y = cp.Variable(self.n_categories, boolean=True)
+            constraints += [
+                onehot @ self.x <= self.max_per_food * y,
+                onehot @ self.x >= DIVERSITY_MIN_GRAMS * y,
+                cp.sum(y) >= self.min_categories,
+            ]
+
+        self.problem = cp.Problem(cp.Minimize(self.cost @ self.x), constraints)
+        self.last_stats = None
+        self.last_sensitivity = None
+        # Parameter values are shared state; one solve at a time per model
+        self._lock = threading.Lock()
+
+    def set_params(self, params):
+        """Copy bound values from a params dict into the cvxpy Parameters."""
+        self.lower.value, self.upper.value, self.max_per_food.value = self.solver_bounds(params)
+        if self.min_categories is not None:
+            self.min_categories.value = min(float(params.get("min_categories", 0)),
+                                            self.n_categories)
+
+    def compile(self, params, solver=cp.HIGHS):
+        """Canonicalize for solver ahead of the first solve (params only fill in values)."""
+        with self._lock:
+            self.set_params(params)
+            self.problem.get_problem_data(solver)
+
+    def solve_result(self, params, solvers=None, solver_options=None, session=None, **solve_kwargs):
+        """
+        Solve for one profile and return a SolveResult; cost and x are None
+        unless status is in SOLUTION_STATUSES.
+
+        solvers: optional list of solver names to try in order; falls back
+        to cvxpy's default choice if none of them is available.
+        solver_options: optional solver name -> extra solve() kwargs, used
+        only when that solver is tried (e.g. time limits, see solvers.py).
+        session: optional WarmStartSession; the solve is warm-started from
+        that session's previous solve on this model (cold otherwise), not
+        from whichever caller solved last.
+        stats["failed"] names the solvers that raised a SolverError before
+        the one that produced the result, with their messages.
+        The statistics and sensitivity are also kept in self.last_stats and
+        self.last_sensitivity for single-threaded callers; a model shared
+        between threads must use the returned ones.
+        """
+        solver_options = solver_options or {}
+        with self._lock:
+            start = time.perf_counter()
+            self.set_params(params)
+            if session is None:
+                failed = self._run_solvers(solvers, solver_options, solve_kwargs)
+            else:
+                model_cache = self.problem._solver_cache
+                try:
+                    solve_kwargs["warm_start"] = session.enter(self)
+                    failed = self._run_solvers(solvers, solver_options, solve_kwargs)
+                finally:
+                    session.leave(self)
+                    self.problem._solver_cache = model_cache
+
+            status = self.problem.status
+            solver_stats = self.problem.solver_stats
+            stats = {
+                "solver": solver_stats.solver_name,
+                "status": status,
+                "solve_time": solver_stats.solve_time,
+                "compile_time": self.problem.compilation_time,
+                "wall_time": time.perf_counter() - start,
+                "iterations": solver_stats.num_iters,
+                "failed": failed,
+            }
+            # A solver stopped by its limit may report a status without an incumbent
+            if (status not in SOLUTION_STATUSES or self.x.value is None
+                    or not np.all(np.isfinite(self.x.value))):
+                result = SolveResult(status, None, None, stats, None)
+            else:
+                x = np.array(self.x.value)
+                result = SolveResult(status, self.problem.value, x, stats, self._sensitivity(params, x))
+            self.last_stats, self.last_sensitivity = result.stats, result.sensitivity
+            return result
+
+    def _run_solvers(self, solvers, solver_options, solve_kwargs):
+        """
+        Solve with the first of solvers that works, else cvxpy's default
+        choice; returns solver name -> error message of those that failed.
+        """
+        failed = {}
+        for solver in solvers or []:
+            try:
+                self.problem.solve(solver=solver, **solve_kwargs, **solver_options.get(solver, {}))
+                return failed
+            except cp.error.SolverError as e:
+                failed[solver] = str(e)
+        self.problem.solve(**solve_kwargs)
+        return failed
+
+    def _sensitivity(self, params, x):
+        """Sensitivity from the constraint duals (LP only; MILPs have none)."""
+        if self.n_categories or self.lower_constraint.dual_value is None:
+            return self.sensitivity(params, x)
+        return self.sensitivity(params, x, self.lower_constraint.dual_value,
+                                self.upper_constraint.dual_value, self.cap_constraint.dual_value)
+
+
+class WarmStartSession:
+    """
+    Warm-start state of one interactive session on models shared by all sessions.
+
+    cvxpy keeps the previous solver run (for HiGHS the solution it seeds the
+    next solve with) in the problem's solver cache. The session keeps its
+    own copy for the model it last solved and swaps it in for its solves,
+    so a session whose edits only change bounds re-solves warm from its own
+    last plan; a different model (food set, category block, solver setup)
+    solves cold and becomes the session's model.
+    """
+
+    def __init__(self):
+        self._model = None  # weakref to the model the cache belongs to
+        self.solver_cache = {}
+        self.last_warm = False
+
+    def enter(self, model):
+        """Install this session's cache on model (called under its lock); True if warm."""
+        self.last_warm = self._model is not None and self._model() is model
+        if not self.last_warm:
+            self.solver_cache = {}
+        model.problem._solver_cache = self.solver_cache
+        return self.last_warm
+
+    def leave(self, model):
+        """Keep the solver state the solve left on model."""
+        self._model = weakref.ref(model)
+        self.solver_cache = model.problem._solver_cache
@@ -0,0 +1,194 @@
+# Pareto frontiers: cost vs. one nutrient column
+#
+# Epsilon-constraint method on the constraints of any compiled model
+# (DietModel, BowlModel): minimize cost subject to benefit @ x >= target,
+# where the per-gram benefit row and the target are cvxpy Parameters. One
+# compiled FrontierModel therefore serves cost vs Protein, cost vs
+# Nutrition Density and any other column, and every target is a warm re-solve.
+#
+# Sampling is adaptive: start from the two ends (cheapest plan, most
+# benefit), then keep bisecting the target interval whose midpoint lies
+# farthest from the chord between its ends. Straight stretches of the curve
+# stop early and the points gather where it bends.
+#
+#   result = frontier(FrontierModel(BowlModel(matrix)), PROTEIN_BOWL, "Protein")
+#   result.table[["cost", "Protein", "marginal_cost", "foods"]]
+#
+#   python frontier.py --benefit Protein -n 30 -o frontier.csv
+
+import argparse
+import heapq
+import threading
+from typing import NamedTuple
+
+import cvxpy as cp
+import numpy as np
+import pandas as pd
+
+from bowls import PROTEIN_BOWL, BowlModel
+from dataset import DEFAULT_FILENAME
+from diet_model import SOLUTION_STATUSES
+from nutrients import load_matrix
+from sweep import SUPPORT_GRAMS
+
+DEFAULT_POINTS = 30   # solves per frontier, ends included
+BEND_TOL = 1e-3       # stop splitting when the chord is this close (share of the cost range)
+TARGET_SLACK = 1e-7   # relative slack on the best-benefit target, against solver noise
+NO_TARGET = -1e9      # target value that never binds
+
+
+class FrontierResult(NamedTuple):
+    """Non-dominated points in benefit order, plus their grams (rows match table)."""
+    table: pd.DataFrame
+    X: np.ndarray
+
+
+class FrontierModel:
+    """Min-cost and max-benefit problems over the constraints of a compiled model."""
+
+    def __init__(self, model):
+        self.model = model
+        self.matrix = model.matrix
+        x = model.x
+        self.benefit = cp.Parameter(model.n, name="benefit")
+        self.target = cp.Parameter(name="target")
+        constraints = model.problem.constraints
+        self.min_cost = cp.Problem(cp.Minimize(model.cost @ x), constraints + [self.benefit @ x >= self.target])
+        self.max_benefit = cp.Problem(cp.Maximize(self.benefit @ x), constraints)
+        # Shares the model's Parameters, so solves go through the model's lock
+        self._lock = getattr(model, "_lock", threading.Lock())
+
+    def _solve(self, problem, params, column, target, solvers):
+        with self._lock:
+            self.model.set_params(params)
+            self.benefit.value = np.asarray(self.matrix.row(column), dtype=float)
+            self.target.value = target
+            for solver in solvers:
+                try:
+                    problem.solve(solver=solver, warm_start=True)
+                    break
+                except Exception:
+                    continue
+            else:
+                problem.solve(warm_start=True)
+            x = self.model.x.value
+            if problem.status not in SOLUTION_STATUSES or x is None:
+                return problem.status, None
+            return problem.status, np.array(x)
+
+    def cheapest(self, params, column, target=NO_TARGET, solvers=(cp.HIGHS,)):
+        """(status, x) of the cheapest plan with at least target of column."""
+        return self._solve(self.min_cost, params, column, float(target), solvers)
+
+    def most(self, params, column, solvers=(cp.HIGHS,)):
+        """(status, x) of the cheapest plan among those with the most of column."""
+        status, x = self._solve(self.max_benefit, params, column, NO_TARGET, solvers)
+        if x is None:
+            return status, None
+        best = float(self.matrix.row(column) @ x)
+        return self.cheapest(params, column, best - TARGET_SLACK * max(1.0, abs(best)), solvers)
+
+
+def non_dominated(points):
+    """Indices of (cost, benefit) points no other point beats on both, by benefit."""
+    order = sorted(range(len(points)), key=lambda i: (points[i][0], -points[i][1]))
+    kept = []
+    for i in order:
+        best = points[kept[-1]][1] if kept else -np.inf
+        if not kept or points[i][1] > best + TARGET_SLACK * max(1.0, abs(best)):
+            kept.append(i)
+    return kept
+
+
+def frontier(frontier_model, params, column, max_points=DEFAULT_POINTS, tol=BEND_TOL,
+             solvers=(cp.HIGHS,)):
+    """
+    Adaptive cost-vs-column frontier for one profile.
+
+    At most max_points solves; a target interval is split while its
+    midpoint is more than tol (share of the cost range) off the chord.
+    The table has target, cost, the column total, marginal_cost (cost per
+    unit of the column between neighbouring points), n_foods and foods.
+    """
+    matrix = frontier_model.matrix
+    benefit_row, price = matrix.row(column), np.asarray(matrix.cost)
+    samples = {}  # target -> (status, x)
+
+    def sample(target):
+        samples[target] = frontier_model.cheapest(params, column, target, solvers)
+        return samples[target][1]
+
+    _, low = frontier_model.cheapest(params, column, solvers=solvers)
+    _, high = frontier_model.most(params, column, solvers)
+    if low is None or high is None:
+        return FrontierResult(pd.DataFrame(columns=["target", "cost", column, "marginal_cost",
+                                                    "n_foods", "foods"]), np.zeros((0, matrix.n_foods)))
+    lo, hi = float(benefit_row @ low), float(benefit_row @ high)
+    samples[lo], samples[hi] = ("optimal", low), ("optimal", high)
+    cost_range = max(float(price @ high - price @ low), 1e-12)
+
+    def cost_at(target):
+        x = samples[target][1]
+        return None if x is None else float(price @ x)
+
+    # Max-heap of intervals by the bend measured at their parent's midpoint
+    heap = [(-np.inf, lo, hi)] if hi > lo else []
+    while heap and len(samples) < max_points:
+        _, a, b = heapq.heappop(heap)
+        mid = 0.5 * (a + b)
+        if sample(mid) is None:
+            continue
+        chord = cost_at(a) + (cost_at(b) - cost_at(a)) * (mid - a) / (b - a)
+        bend = abs(chord - cost_at(mid)) / cost_range
+        if bend > tol:
+            heapq.heappush(heap, (-bend, a, mid))
+            heapq.heappush(heap, (-bend, mid, b))
+
+    solved = [(target, x) for target, (_, x) in samples.items() if x is not None]
+    points = [(float(price @ x), float(benefit_row @ x)) for _, x in solved]
+    kept = sorted(non_dominated(points), key=lambda i: points[i][1])
+
+    rows, X = [], []
+    for i in kept:
+        target, x = solved[i]
+        basket = np.flatnonzero(x > SUPPORT_GRAMS)
+        rows.append({
+            "target": target,
+            "cost": points[i][0],
+            column: points[i][1],
+            "n_foods": len(basket),
+            "foods": [matrix.food_names[j] for j in basket],
+        })
+        X.append(x)
+    table = pd.DataFrame(rows)
+    table.insert(3, "marginal_cost", table["cost"].diff() / table[column].diff())
+    return FrontierResult(table, np.vstack(X))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cost vs. nutrient frontier for the recipe bowl.")
+    parser.add_argument("--benefit", default="Protein",
+                        help="dataset column to trade against cost (default: %(default)s)")
+    parser.add_argument("-n", "--points", type=int, default=DEFAULT_POINTS,
+                        help="most solves (default: %(default)s)")
+    parser.add_argument("--data", default=DEFAULT_FILENAME,
+                        help="dataset file in Datasets/ (default: %(default)s)")
+    parser.add_argument("-o", "--output", help="write the frontier table to this .csv")
+    args = parser.parse_args()
+
+    matrix = load_matrix(args.data)
+    if args.benefit not in matrix.index:
+        parser.error(f"Unknown column: {args.benefit}")
+    # protein-opt.py bounds: no protein floor, so the cheap end is nutrition.py's trade-off
+    result = frontier(FrontierModel(BowlModel(matrix, "cost")), PROTEIN_BOWL, args.benefit, args.points)
+    table = result.table.assign(foods=result.table["foods"].str.join(", "))
+    if args.output:
+        table.to_csv(args.output, index=False)
+        print(f"{len(table)} frontier points written to {args.output}")
+    else:
+        with pd.option_context("display.max_colwidth", 80, "display.width", 200):
+            print(table.round(4).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
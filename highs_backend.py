@@ -0,0 +1,124 @@
+# Direct HiGHS backend (scipy.optimize.linprog / milp)
+#
+# Builds the constraint matrix straight from the NutrientMatrix and calls
+# scipy's HiGHS wrappers, skipping cvxpy's canonicalization entirely. Same
+# solve(params) -> (status, cost, x) and solve_result() interface as DietModel, so callers
+# switch with diet_model.build_model(..., backend="highs").
+
+import threading
+import time
+
+import numpy as np
+from scipy import sparse
+from scipy.optimize import Bounds, LinearConstraint, linprog, milp
+
+from bounds import DEFAULT_MIP_GAP, DEFAULT_TIME_LIMIT
+from diet_model import (
+    DIVERSITY_MIN_GRAMS, NUTRIENT_BOUNDS, SOLUTION_STATUSES, BaseDietModel, SolveResult,
+)
+
+# scipy status codes -> cvxpy status strings (same for linprog and milp)
+STATUS_MAP = {
+    0: "optimal",
+    1: "user_limit",
+    2: "infeasible",
+    3: "unbounded",
+    4: "solver_error",
+}
+
+
+class HighsDietModel(BaseDietModel):
+    """Diet LP / category MILP solved directly with HiGHS."""
+
+    def __init__(self, matrix, use_categories=False, time_limit=DEFAULT_TIME_LIMIT, mip_gap=DEFAULT_MIP_GAP):
+        """Same arguments as DietModel, plus the limits applied to every solve."""
+        self.matrix = matrix
+        self.cost = np.asarray(matrix.cost, dtype=float)
+        self.n = matrix.n_foods
+
+        # A_ub @ x <= b_ub with the ">=" rows negated
+        self.lower_keys = [key for key, _, sense in NUTRIENT_BOUNDS if sense == ">="]
+        self.upper_keys = [key for key, _, sense in NUTRIENT_BOUNDS if sense == "<="]
+        self.A_lower = matrix.rows([column for _, column, sense in NUTRIENT_BOUNDS if sense == ">="])
+        self.A_upper = matrix.rows([column for _, column, sense in NUTRIENT_BOUNDS if sense == "<="])
+        self.A_ub = sparse.csr_array(np.vstack([-self.A_lower, self.A_upper]))
+
+        # Category diversity block (optional): one binary y per category
+        self.n_categories = 0
+        if use_categories and matrix.category_index is not None:
+            self.onehot = matrix.category_index.onehot
+            self.n_categories = self.onehot.shape[0]
+        # Same limits as the cvxpy portfolio's SCIPY options (solvers.limit_options)
+        self.options = {"time_limit": time_limit}
+        if self.n_categories:
+            self.options["mip_rel_gap"] = mip_gap
+        self.last_stats = None
+        self.last_sensitivity = None
+        self._lock = threading.Lock()
+
+    def solve_result(self, params, solvers=None, warm_start=False, session=None, **options):
+        """
+        Solve for one profile and return a SolveResult.
+
+        solvers, warm_start and session are accepted for interface compatibility
+        with DietModel and ignored; options go to HiGHS on top of the
+        model's time limit and MIP gap.
+        """
+        options = {**self.options, **options}
+        start = time.perf_counter()
+        lower, upper, max_per_food = self.solver_bounds(params)
+        b_ub = np.concatenate([-lower, upper])
+
+        with self._lock:
+            if self.n_categories == 0:
+                res = linprog(self.cost, A_ub=self.A_ub, b_ub=b_ub,
+                              bounds=(0, max_per_food), method="highs", options=options)
+            else:
+                res = self._solve_milp(b_ub, max_per_food, params, options)
+
+        status = STATUS_MAP.get(res.status, "solver_error")
+        wall_time = time.perf_counter() - start
+        stats = {
+            "solver": "HIGHS (scipy)",
+            "status": status,
+            "solve_time": wall_time,
+            "wall_time": wall_time,
+            "iterations": getattr(res, "nit", None) or getattr(res, "mip_node_count", None),
+        }
+        if status not in SOLUTION_STATUSES or res.x is None:
+            result = SolveResult(status, None, None, stats, None)
+        else:
+            x = np.asarray(res.x[:self.n])
+            if self.n_categories == 0 and status == "optimal":
+                # HiGHS marginals are d(cost)/d(rhs) of the "<=" form; flip to cvxpy's signs
+                marginals = -res.ineqlin.marginals
+                n_lower = len(self.lower_keys)
+                sensitivity = self.sensitivity(params, x, marginals[:n_lower], marginals[n_lower:],
+                                               -res.upper.marginals)
+            else:
+                sensitivity = self.sensitivity(params, x)
+            result = SolveResult(status, float(res.fun), x, stats, sensitivity)
+        self.last_stats, self.last_sensitivity = result.stats, result.sensitivity
+        return result
+
+    def _solve_milp(self, b_ub, max_per_food, params, options):
+        """Category MILP over [x, y]: grams plus one binary per category."""
+        k = self.n_categories
+        min_categories = min(float(params.get("min_categories", 0)), k)
+        zeros = sparse.csr_array((self.A_ub.shape[0], k))
+        A = sparse.vstack([
+            sparse.hstack([self.A_ub, zeros]),
+            # onehot @ x - max_per_food * y <= 0 and onehot @ x - min_grams * y >= 0
+            sparse.hstack([self.onehot, -max_per_food * sparse.eye_array(k)]),
+            sparse.hstack([self.onehot, -DIVERSITY_MIN_GRAMS * sparse.eye_array(k)]),
+            # sum(y) >= min_categories
+            sparse.hstack([sparse.csr_array((1, self.n)), np.ones((1, k))]),
+        ], format="csr")
+        lb = np.concatenate([np.full(len(b_ub), -np.inf), np.full(k, -np.inf), np.zeros(k), [min_categories]])
+        ub = np.concatenate([b_ub, np.zeros(k), np.full(k, np.inf), [np.inf]])
+
+        c = np.concatenate([self.cost, np.zeros(k)])
+        integrality = np.concatenate([np.zeros(self.n), np.ones(k)])
+        bounds = Bounds(np.zeros(self.n + k), np.concatenate([np.full(self.n, max_per_food), np.ones(k)]))
+        return milp(c, constraints=LinearConstraint(A, lb, ub), integrality=integrality,
+                    bounds=bounds, options=options)
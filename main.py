@@ -1,99 +1,105 @@
 # 11/15/25 - Data-driven code with proper units - Mohammad Hasan
 
-import cvxpy as cp
-import numpy as np
-import pandas as pd
-import os
+import sys
+
+from diagnose import ElasticDietModel, diagnose
+from diet_model import DietModel, NUTRIENT_BOUNDS, OPTIMAL_STATUSES
+from metrics import Metrics
+from nutrients import load_matrix
+from profiling import SlowCallProfiler
+from weekly import DEFAULT_MEALS, WeeklyPlanModel, plan_table
+
+# Phase timings, collected only when DIET_METRICS names an output file
+METRICS = Metrics.from_env()
+# Profiles of slow solves, kept only when DIET_PROFILE names an output folder
+PROFILER = SlowCallProfiler.from_env()
 
 # ---------------------------------------------------------------------
 # 1. Load dataset from Datasets/ folder
 # ---------------------------------------------------------------------
-DATA_DIR = "Datasets"
 FILENAME = "food_data_with_prices.csv" 
-DATA_PATH = os.path.join(DATA_DIR, FILENAME)
-
-#Checksum
-if DATA_PATH.endswith(".csv"):
-    try:
-        df = pd.read_csv(DATA_PATH)
-    except FileNotFoundError:
-        DATA_PATH = os.path.join(DATA_DIR, "food_data_with_prices.xlsx")
-        df = pd.read_excel(DATA_PATH)
-else:
-    df = pd.read_excel(DATA_PATH)
 
-# Basic cleaning: drop rows without price or calories/protein
-df = df.dropna(subset=["Market Price (USD per gram)", "Caloric Value", "Protein"])
-df = df[df["Market Price (USD per gram)"] > 0].reset_index(drop=True)
+# Parsed and cleaned once, then memory-mapped from Datasets/.cache/ on later
+# runs; the cache is rebuilt whenever the file's content hash changes
+with METRICS.phase("load matrix"):
+    MATRIX = load_matrix(FILENAME)
 
-food_names = df["food"].astype(str).tolist()
-n = len(df)
+food_names = MATRIX.food_names
+n = MATRIX.n_foods
 
 # ---------------------------------------------------------------------
-# 2. Build per-gram nutrient arrays
-#    Dataset is per 100 g, so divide by 100 to get "per gram"
+# 2. Per-gram nutrient matrix
+#    Dataset is per 100 g; one (nutrients x foods) matrix holds every
+#    nutrient per gram, indexed by column name
 # ---------------------------------------------------------------------
+c = MATRIX.cost  # USD / g (already per gram per dataset description)
 
-# conversion factor constant
-PER_100G_TO_PER_G = 100.0
-
-# function to convert nutrient values with error handling
-def get_nutrient_per_g(column_name, conversion_factor=PER_100G_TO_PER_G):
-    """Extract nutrient data and convert to per-gram basis."""
-    if column_name not in df.columns:
-        print(f"Warning: Column '{column_name}' not found in dataset")
-        return np.zeros(n)
-    return df[column_name].fillna(0).to_numpy() / conversion_factor
-
-# Cost per gram (already per gram per dataset description)
-c = get_nutrient_per_g("Market Price (USD per gram)", conversion_factor=1.0)  # USD / g
-
-# Macronutrients and other main nutrients (per 100 g → per g)
-cal_per_g   = get_nutrient_per_g("Caloric Value")              # kcal/g
-fat_per_g   = get_nutrient_per_g("Fat")                        # g/g
-sat_per_g   = get_nutrient_per_g("Saturated Fats")             # g/g
-mono_per_g  = get_nutrient_per_g("Monounsaturated Fats")       # g/g
-poly_per_g  = get_nutrient_per_g("Polyunsaturated Fats")       # g/g
-carb_per_g  = get_nutrient_per_g("Carbohydrates")              # g/g
-sugar_per_g = get_nutrient_per_g("Sugars")                     # g/g
-prot_per_g  = get_nutrient_per_g("Protein")                    # g/g
-fib_per_g   = get_nutrient_per_g("Dietary Fiber")              # g/g
-
-# Cholesterol: mg per 100 g → mg/g
-chol_per_g  = get_nutrient_per_g("Cholesterol")                # mg/g
-
-# Sodium: mg per 100 g → mg/g
-Na_per_g    = get_nutrient_per_g("Sodium")                     # mg/g
-
-# Water: g per 100 g → g/g
-water_per_g = get_nutrient_per_g("Water")                      # g/g
-
-# Minerals: mg per 100 g → mg/g (using dictionary for cleaner code)
+# Minerals: mg per 100 g → mg/g
 mineral_names = ["Calcium", "Copper", "Iron", "Magnesium", "Manganese", 
                  "Phosphorus", "Potassium", "Selenium", "Zinc"]
-minerals_per_g = {mineral: get_nutrient_per_g(mineral) for mineral in mineral_names}
-
-# Create individual variables for backward compatibility
-Calcium_per_g    = minerals_per_g["Calcium"]
-Copper_per_g     = minerals_per_g["Copper"]
-Iron_per_g       = minerals_per_g["Iron"]
-Magnesium_per_g  = minerals_per_g["Magnesium"]
-Manganese_per_g  = minerals_per_g["Manganese"]
-Phosphorus_per_g = minerals_per_g["Phosphorus"]
-Potassium_per_g  = minerals_per_g["Potassium"]
-Selenium_per_g   = minerals_per_g["Selenium"]
-Zinc_per_g       = minerals_per_g["Zinc"]
 
 # Vitamins: treat all as "per 100 g → per g" regardless of mg / µg;
 # we'll just report totals with a unit tag.
-vitamin_cols = [col for col in df.columns if col.startswith("Vitamin ")]
-vitamins_per_g = {col: get_nutrient_per_g(col) for col in vitamin_cols}
+vitamin_cols = [col for col in MATRIX.names if col.startswith("Vitamin ")]
 
-# nutrition density (unitless score per 100 g → per g)
-if "Nutrition Density" in df.columns:
-    nutrition_density_per_g = df["Nutrition Density"].to_numpy() / 100.0
-else:
-    nutrition_density_per_g = None
+for column in [column for _, column, _ in NUTRIENT_BOUNDS] + mineral_names:
+    if column not in MATRIX.index:
+        print(f"Warning: Column '{column}' not found in dataset")
+
+# ---------------------------------------------------------------------
+# Compiled model: built once, re-solved for every profile below
+# ---------------------------------------------------------------------
+with METRICS.phase("model build"):
+    DIET_MODEL = DietModel(MATRIX)
+
+def profile_params(C_min, C_max, P_min, Carb_min, Carb_max, Fat_min, Fat_max,
+                   Fib_min, Na_max, Sug_max, Chol_max, SatFat_max, max_per_food):
+    """Map solve_diet arguments (plus the mineral targets) to model params."""
+    return {
+        "cal_min": C_min, "cal_max": C_max, "prot_min": P_min,
+        "carb_min": Carb_min, "carb_max": Carb_max,
+        "fat_min": Fat_min, "fat_max": Fat_max, "fib_min": Fib_min,
+        "na_max": Na_max, "sug_max": Sug_max, "chol_max": Chol_max,
+        "sat_max": SatFat_max, "max_per_food": max_per_food,
+        "ca_min": Ca_min, "iron_min": Iron_min, "mag_min": Mag_min,
+        "phos_min": Phos_min, "k_min": K_min,
+    }
+
+def solve_profile(params):
+    """DIET_MODEL.solve, timed when metrics are enabled."""
+    with METRICS.phase("solve"):
+        result = DIET_MODEL.solve(params)
+    METRICS.record_solve(DIET_MODEL.last_stats)
+    return result
+
+# params key -> "Protein (min)" style label for the sensitivity report
+BOUND_LABELS = {key: f"{column} ({'min' if sense == '>=' else 'max'})"
+                for key, column, sense in NUTRIENT_BOUNDS}
+BOUND_LABELS["max_per_food"] = "Grams per food (max)"
+
+def show_sensitivity(sensitivity):
+    """Binding bounds of the last solve with their shadow prices."""
+    if sensitivity is None:
+        return
+    print("\nBinding constraints (cost of tightening by one unit):")
+    for key in sensitivity.binding:
+        price = sensitivity.shadow_prices[key] if sensitivity.shadow_prices else None
+        print(f"  {BOUND_LABELS[key]:30s} -> " + (f"${price:.4f}" if price is not None else "n/a"))
+
+def show_diagnosis(params):
+    """Explain an infeasible profile: smallest relaxation plus the conflicting bounds."""
+    global ELASTIC_MODEL
+    if ELASTIC_MODEL is None:
+        ELASTIC_MODEL = ElasticDietModel(MATRIX)
+    diagnosis = diagnose(MATRIX, params, find_iis=True, elastic=ELASTIC_MODEL, model=DIET_MODEL)
+    if diagnosis.relaxations:
+        print("Smallest change that makes it feasible:")
+        for relaxation in diagnosis.relaxations:
+            print(f"  {BOUND_LABELS[relaxation.key]:30s} {relaxation.bound:g} -> {relaxation.relaxed_to:.1f}")
+    if diagnosis.iis:
+        print("Conflicting bounds: " + ", ".join(BOUND_LABELS[key] for key in diagnosis.iis))
+
+ELASTIC_MODEL = None  # built on the first infeasible profile
 
 def show_range(name, value, lower=None, upper=None, unit=""):
     s = f"{name:20s}: {value:.2f} {unit}"
@@ -120,66 +126,25 @@ def solve_diet(
     print(f"Scenario: {name}")
     print("="*60)
 
-    n = len(c)  # cost vector from before
-    x = cp.Variable(n, nonneg=True)
-
-    # Upper bound per food to encourage variety (reduced from 1000g)
-    u = np.full(n, max_per_food)
-    constraints = [x <= u]
-
-    # Calories
-    constraints += [cal_per_g @ x >= C_min,
-                    cal_per_g @ x <= C_max]
-
-    # Protein
-    constraints += [prot_per_g @ x >= P_min]
+    params = profile_params(
+        C_min, C_max, P_min, Carb_min, Carb_max, Fat_min, Fat_max, Fib_min,
+        Na_max, Sug_max, Chol_max, SatFat_max, max_per_food
+    )
+    with PROFILER.profile("solve_diet", params, MATRIX.fingerprint, scenario=name, data=FILENAME):
+        status, cost, x_value = solve_profile(params)
 
-    # Carbs
-    constraints += [carb_per_g @ x >= Carb_min,
-                    carb_per_g @ x <= Carb_max]
-
-    # Fat
-    constraints += [fat_per_g @ x >= Fat_min,
-                    fat_per_g @ x <= Fat_max]
-
-    # Fiber
-    constraints += [fib_per_g @ x >= Fib_min]
-
-    # Sodium
-    constraints += [Na_per_g @ x <= Na_max]
-
-    # Sugar
-    constraints += [sugar_per_g @ x <= Sug_max]
-
-    # Cholesterol
-    constraints += [chol_per_g @ x <= Chol_max]
-
-    # Sat fat
-    constraints += [sat_per_g @ x <= SatFat_max]
-
-    # (Optionally keep mineral constraints too, or drop if infeasible) - I did not add it - Maybe if we have character with mineral constrains we can certainly add them here
-    constraints += [
-        Calcium_per_g    @ x >= Ca_min,
-        Iron_per_g       @ x >= Iron_min,
-        Magnesium_per_g  @ x >= Mag_min,
-        Phosphorus_per_g @ x >= Phos_min,
-        Potassium_per_g  @ x >= K_min,
-    ]
-
-    objective = cp.Minimize(c @ x)
-    prob = cp.Problem(objective, constraints)
-    prob.solve()
-
-    print("Status:", prob.status)
-    if prob.status not in ["optimal", "optimal_inaccurate"]:
+    print("Status:", status)
+    if status not in OPTIMAL_STATUSES:
         print("Infeasible or failed for this profile.")
+        if status == "infeasible":
+            show_diagnosis(params)
         return
 
-    print(f"Optimal cost: ${prob.value:.2f} USD")
+    print(f"Optimal cost: ${cost:.2f} USD")
 
     # Count and display selected foods
-    selected_foods = [(food_names[i], x.value[i]) for i in range(n) 
-                      if x.value[i] is not None and x.value[i] > 1e-3]
+    selected_foods = [(food_names[i], x_value[i]) for i in range(n) 
+                      if x_value[i] > 1e-3]
     
     print(f"\nNumber of different foods: {len(selected_foods)}")
     print(f"Max allowed per food: {max_per_food:.0f}g\n")
@@ -187,27 +152,21 @@ def solve_diet(
     for food_name, amount in selected_foods:
         print(f"  {food_name:30s} -> {amount:7.1f} g")
 
-    # Compute totals
-    total_cal   = float(cal_per_g   @ x.value)
-    total_prot  = float(prot_per_g  @ x.value)
-    total_carb  = float(carb_per_g  @ x.value)
-    total_fat   = float(fat_per_g   @ x.value)
-    total_fib   = float(fib_per_g   @ x.value)
-    total_sugar = float(sugar_per_g @ x.value)
-    total_Na    = float(Na_per_g    @ x.value)
-    total_chol  = float(chol_per_g  @ x.value)
-    total_sat   = float(sat_per_g   @ x.value)
+    # Compute totals (one matrix-vector product)
+    with METRICS.phase("totals"):
+        totals = MATRIX.totals(x_value)
 
     # Show constraint checks
-    show_range("Calories", total_cal, C_min, C_max, "kcal")
-    show_range("Protein", total_prot, P_min, None, "g")
-    show_range("Carbs", total_carb, Carb_min, Carb_max, "g")
-    show_range("Fat", total_fat, Fat_min, Fat_max, "g")
-    show_range("Fiber", total_fib, Fib_min, None, "g")
-    show_range("Sugar", total_sugar, None, Sug_max, "g")
-    show_range("Sodium", total_Na, None, Na_max, "mg")
-    show_range("Cholesterol", total_chol, None, Chol_max, "mg")
-    show_range("Sat fat", total_sat, None, SatFat_max, "g")
+    show_range("Calories", totals["Caloric Value"], C_min, C_max, "kcal")
+    show_range("Protein", totals["Protein"], P_min, None, "g")
+    show_range("Carbs", totals["Carbohydrates"], Carb_min, Carb_max, "g")
+    show_range("Fat", totals["Fat"], Fat_min, Fat_max, "g")
+    show_range("Fiber", totals["Dietary Fiber"], Fib_min, None, "g")
+    show_range("Sugar", totals["Sugars"], None, Sug_max, "g")
+    show_range("Sodium", totals["Sodium"], None, Na_max, "mg")
+    show_range("Cholesterol", totals["Cholesterol"], None, Chol_max, "mg")
+    show_range("Sat fat", totals["Saturated Fats"], None, SatFat_max, "g")
+    show_sensitivity(DIET_MODEL.last_sensitivity)
 
     print()  # blank line
 
@@ -234,80 +193,32 @@ Phos_min    = 700    # mg/day
 K_min       = 2500   # mg/day
 
 # ---------------------------------------------------------------------
-# 4. CVX optimization problem
+# 4. Default profile, solved with the compiled model
 #    Decision variable x_i = grams of food i
 # ---------------------------------------------------------------------
-x = cp.Variable(n, nonneg=True)  # grams
-
-# Upper bound per food to encourage variety (reduced from 1000g to 300g)
-# This prevents the optimizer from selecting just 1-2 cheap foods
-MAX_GRAMS_PER_FOOD = 300.0  # grams
-u = np.full(n, MAX_GRAMS_PER_FOOD)  # grams
-constraints = [x <= u]
+MAX_GRAMS_PER_FOOD = 300.0  # grams, limits any one food to encourage variety
 
-# Energy
-constraints += [
-    cal_per_g @ x >= C_min,
-    cal_per_g @ x <= C_max
-]
-
-# Protein
-constraints += [prot_per_g @ x >= P_min]
-
-# Carbs
-constraints += [
-    carb_per_g @ x >= Carb_min,
-    carb_per_g @ x <= Carb_max
-]
-
-# Total fat
-constraints += [
-    fat_per_g @ x >= Fat_min,
-    fat_per_g @ x <= Fat_max
-]
-
-# Fiber
-constraints += [fib_per_g @ x >= Fib_min]
-
-# Sodium (mg)
-constraints += [Na_per_g @ x <= Na_max]
-
-# Sugar (g)
-constraints += [sugar_per_g @ x <= Sug_max]
-
-# Cholesterol (mg)
-constraints += [chol_per_g @ x <= Chol_max]
-
-# Saturated fat (g)
-constraints += [sat_per_g @ x <= SatFat_max]
-
-# Minerals (mg)
-constraints += [
-    Calcium_per_g    @ x >= Ca_min,
-    Iron_per_g       @ x >= Iron_min,
-    Magnesium_per_g  @ x >= Mag_min,
-    Phosphorus_per_g @ x >= Phos_min,
-    Potassium_per_g  @ x >= K_min,
-]
-
-# Objective: minimize total cost (USD)
-objective = cp.Minimize(c @ x)
-
-problem = cp.Problem(objective, constraints)
-problem.solve()
+default_params = profile_params(
+    C_min, C_max, P_min, Carb_min, Carb_max, Fat_min, Fat_max, Fib_min,
+    Na_max, Sug_max, Chol_max, SatFat_max, MAX_GRAMS_PER_FOOD
+)
+with PROFILER.profile("solve_diet", default_params, MATRIX.fingerprint, scenario="default", data=FILENAME):
+    status, optimal_cost, x_value = solve_profile(default_params)
 
 # ---------------------------------------------------------------------
 # 5. Display results with units
 # ---------------------------------------------------------------------
-print("Status:", problem.status)
-if problem.status not in ["optimal", "optimal_inaccurate"]:
+print("Status:", status)
+if status not in OPTIMAL_STATUSES:
     print("Problem is not optimal; maybe constraints are too strict.")
+    if status == "infeasible":
+        show_diagnosis(default_params)
 else:
-    print(f"Optimal cost: ${problem.value:.2f} USD")
+    print(f"Optimal cost: ${optimal_cost:.2f} USD")
 
     # Count and display selected foods
-    selected_foods = [(food_names[i], x.value[i]) for i in range(n) 
-                      if x.value[i] is not None and x.value[i] > 1e-3]
+    selected_foods = [(food_names[i], x_value[i]) for i in range(n) 
+                      if x_value[i] > 1e-3]
     
     print(f"\nNumber of different foods: {len(selected_foods)}")
     print(f"Max allowed per food: {MAX_GRAMS_PER_FOOD:.0f}g\n")
@@ -315,54 +226,45 @@ else:
     for food_name, amount in selected_foods:
         print(f"  {food_name:30s} -> {amount:7.1f} g")
 
-    # Totals
-    total_cal   = float(cal_per_g   @ x.value)  # kcal
-    total_prot  = float(prot_per_g  @ x.value)  # g
-    total_carb  = float(carb_per_g  @ x.value)  # g
-    total_fat   = float(fat_per_g   @ x.value)  # g
-    total_sat   = float(sat_per_g   @ x.value)  # g
-    total_mono  = float(mono_per_g  @ x.value)  # g
-    total_poly  = float(poly_per_g  @ x.value)  # g
-    total_fib   = float(fib_per_g   @ x.value)  # g
-    total_sugar = float(sugar_per_g @ x.value)  # g
-    total_chol  = float(chol_per_g  @ x.value)  # mg
-    total_Na    = float(Na_per_g    @ x.value)  # mg
-    total_water = float(water_per_g @ x.value)  # g
+    # Totals (every nutrient from one matrix-vector product)
+    with METRICS.phase("totals"):
+        totals = MATRIX.totals(x_value)
 
     print("\n=== Nutrient totals ===")
-    print(f"Total calories:       {total_cal:.1f} kcal")
-    print(f"Total protein:        {total_prot:.1f} g")
-    print(f"Total carbs:          {total_carb:.1f} g")
-    print(f"Total fat:            {total_fat:.1f} g")
-    print(f"  Saturated fat:      {total_sat:.1f} g")
-    print(f"  Monounsaturated:    {total_mono:.1f} g")
-    print(f"  Polyunsaturated:    {total_poly:.1f} g")
-    print(f"Total fiber:          {total_fib:.1f} g")
-    print(f"Total sugar:          {total_sugar:.1f} g")
-    print(f"Total cholesterol:    {total_chol:.1f} mg")
-    print(f"Total sodium:         {total_Na:.1f} mg")
-    print(f"Total water:          {total_water:.1f} g")
+    print(f"Total calories:       {totals['Caloric Value']:.1f} kcal")
+    print(f"Total protein:        {totals['Protein']:.1f} g")
+    print(f"Total carbs:          {totals['Carbohydrates']:.1f} g")
+    print(f"Total fat:            {totals['Fat']:.1f} g")
+    print(f"  Saturated fat:      {totals['Saturated Fats']:.1f} g")
+    print(f"  Monounsaturated:    {totals['Monounsaturated Fats']:.1f} g")
+    print(f"  Polyunsaturated:    {totals['Polyunsaturated Fats']:.1f} g")
+    print(f"Total fiber:          {totals['Dietary Fiber']:.1f} g")
+    print(f"Total sugar:          {totals['Sugars']:.1f} g")
+    print(f"Total cholesterol:    {totals['Cholesterol']:.1f} mg")
+    print(f"Total sodium:         {totals['Sodium']:.1f} mg")
+    print(f"Total water:          {totals['Water']:.1f} g")
 
     print("\n=== Mineral totals (approx) ===")
-    print(f"Calcium:              {float(Calcium_per_g    @ x.value):.1f} mg")
-    print(f"Copper:               {float(Copper_per_g     @ x.value):.2f} mg")
-    print(f"Iron:                 {float(Iron_per_g       @ x.value):.2f} mg")
-    print(f"Magnesium:            {float(Magnesium_per_g  @ x.value):.1f} mg")
-    print(f"Manganese:            {float(Manganese_per_g  @ x.value):.2f} mg")
-    print(f"Phosphorus:           {float(Phosphorus_per_g @ x.value):.1f} mg")
-    print(f"Potassium:            {float(Potassium_per_g  @ x.value):.1f} mg")
-    print(f"Selenium:             {float(Selenium_per_g   @ x.value):.2f} mg")
-    print(f"Zinc:                 {float(Zinc_per_g       @ x.value):.2f} mg")
+    print(f"Calcium:              {totals['Calcium']:.1f} mg")
+    print(f"Copper:               {totals['Copper']:.2f} mg")
+    print(f"Iron:                 {totals['Iron']:.2f} mg")
+    print(f"Magnesium:            {totals['Magnesium']:.1f} mg")
+    print(f"Manganese:            {totals['Manganese']:.2f} mg")
+    print(f"Phosphorus:           {totals['Phosphorus']:.1f} mg")
+    print(f"Potassium:            {totals['Potassium']:.1f} mg")
+    print(f"Selenium:             {totals['Selenium']:.2f} mg")
+    print(f"Zinc:                 {totals['Zinc']:.2f} mg")
 
     print("\n=== Vitamin totals (approx, from dataset units) ===")
-    for vit_name, vit_arr_per_g in vitamins_per_g.items():
-        total_vit = float(vit_arr_per_g @ x.value)
-        print(f"{vit_name:20s}: {total_vit:.4f} (per-day total in dataset units)")
+    for vit_name in vitamin_cols:
+        print(f"{vit_name:20s}: {totals[vit_name]:.4f} (per-day total in dataset units)")
 
-    if nutrition_density_per_g is not None:
-        total_nd = float(nutrition_density_per_g @ x.value)
+    if "Nutrition Density" in totals:
+        total_nd = totals["Nutrition Density"]
         print(f"\nNutrition density (weighted sum over grams): {total_nd:.2f}")
 
+    show_sensitivity(DIET_MODEL.last_sensitivity)
+
 
 # Example scenarios - User with different constraints
 solve_diet(
@@ -403,3 +305,35 @@ solve_diet(
     Chol_max=200,
     SatFat_max=20
 )
+
+# ---------------------------------------------------------------------
+# 6. Weekly plan: default profile every day, three meals, and no food on
+#    more than MAX_DAYS_PER_FOOD of the 7 days
+# ---------------------------------------------------------------------
+MAX_DAYS_PER_FOOD = 5
+
+print("\n" + "=" * 60)
+print(f"Weekly plan - default profile, no food on more than {MAX_DAYS_PER_FOOD} days")
+print("=" * 60)
+with METRICS.phase("weekly plan"):
+    WEEKLY_MODEL = WeeklyPlanModel(MATRIX, days=7, meals=DEFAULT_MEALS)
+    status, week_cost, week_plan = WEEKLY_MODEL.solve({**default_params, "max_days": MAX_DAYS_PER_FOOD})
+
+print("Status:", status)
+if week_plan is None:
+    print("No weekly plan for this profile.")
+else:
+    print(f"Weekly cost: ${week_cost:.2f} USD ({WEEKLY_MODEL.last_stats['daily_plans']} daily plans tried)")
+    table = plan_table(MATRIX, week_plan, WEEKLY_MODEL.meal_names)
+    for day, rows in table.groupby("Day"):
+        print(f"\nDay {day} (${rows['Cost ($)'].sum():.2f})")
+        for meal, food, amount in rows[["Meal", "Food", "Amount (g)"]].itertuples(index=False):
+            print(f"  {meal:10s} {food:30s} -> {amount:7.1f} g")
+
+# ---------------------------------------------------------------------
+# 7. Timing breakdown (DIET_METRICS=run.jsonl or metrics.prom)
+# ---------------------------------------------------------------------
+if METRICS.enabled:
+    print("\n=== Timing breakdown ===", file=sys.stderr)
+    print(METRICS.report(), file=sys.stderr)
+    METRICS.export(script="main.py")
@@ -0,0 +1,199 @@
+# Versioned nutrient matrix store shared by processes on one host
+#
+# publish() writes a matrix once as an immutable version directory
+# (<store>/<name>@<version>/, the NutrientMatrix.save() layout) and then
+# replaces the one-line pointer file <store>/<name>.current with
+# os.replace(), which is atomic: a reader sees the old or the new version,
+# never a half-written one. attach() memory-maps the current version
+# read-only, so every Streamlit process, batch worker and service worker
+# maps the same page-cache pages and memory per host does not grow with
+# the number of processes or sessions.
+#
+# A dataset refresh is another publish(); SharedMatrix notices the new
+# pointer on its next check and attaches the new version. The last
+# KEEP_VERSIONS versions stay on disk for readers that are mid-attach;
+# older ones are removed (mappings that are still open stay valid).
+#
+#   python matrix_store.py publish food_data_with_prices_with_category.csv
+#   python matrix_store.py list
+
+import argparse
+import errno
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from dataset import DATA_DIR, DEFAULT_FILENAME, file_fingerprint, resolve_data_path
+from nutrients import NutrientMatrix, load_matrix
+
+STORE_DIRNAME = ".store"  # inside the data folder, next to the load_matrix cache
+KEEP_VERSIONS = 2         # versions kept on disk, current included
+CHECK_INTERVAL = 1.0      # seconds between pointer checks in SharedMatrix
+
+
+def default_store_dir(data_dir=DATA_DIR):
+    return os.path.join(data_dir, STORE_DIRNAME)
+
+
+def _pointer_path(store_dir, name):
+    return os.path.join(store_dir, f"{name}.current")
+
+
+def _version_dir(store_dir, name, version):
+    return os.path.join(store_dir, f"{name}@{version}")
+
+
+def current_version(name, store_dir=None):
+    """Version the pointer names, or None when nothing is published yet."""
+    try:
+        with open(_pointer_path(store_dir or default_store_dir(), name), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def versions(name, store_dir=None):
+    """Published versions on disk, oldest first."""
+    store_dir = store_dir or default_store_dir()
+    if not os.path.isdir(store_dir):
+        return []
+    prefix = f"{name}@"
+    return sorted(entry[len(prefix):] for entry in os.listdir(store_dir) if entry.startswith(prefix))
+
+
+def version_meta(name, version, store_dir=None):
+    """meta.json of one version (names, labels and the publish() extras)."""
+    with open(os.path.join(_version_dir(store_dir or default_store_dir(), name, version), "meta.json"),
+              encoding="utf-8") as f:
+        return json.load(f)
+
+
+def publish(matrix, name, store_dir=None, **meta):
+    """
+    Write matrix as the next version of name and make it current; returns the version.
+
+    Versions are zero-padded sequence numbers, so they sort in publish order.
+    """
+    store_dir = store_dir or default_store_dir()
+    os.makedirs(store_dir, exist_ok=True)
+
+    # Write into a temp dir and rename, so the version is complete before it
+    # has a name; a concurrent publisher that took the number makes us retry.
+    # Any other failure removes the temp dir and propagates
+    tmp = tempfile.mkdtemp(dir=store_dir, prefix=".tmp-")
+    try:
+        os.chmod(tmp, 0o755)
+        while True:
+            existing = versions(name, store_dir)
+            version = f"{int(existing[-1]) + 1 if existing else 1:08d}"
+            matrix.save(tmp, name=name, version=version, published=time.time(), **meta)
+            try:
+                os.rename(tmp, _version_dir(store_dir, name, version))
+                break
+            except OSError as e:
+                if e.errno not in (errno.EEXIST, errno.ENOTEMPTY):
+                    raise
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+    fd, tmp_pointer = tempfile.mkstemp(dir=store_dir, prefix=".tmp-")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.chmod(tmp_pointer, 0o644)
+    os.replace(tmp_pointer, _pointer_path(store_dir, name))
+
+    for old in versions(name, store_dir)[:-KEEP_VERSIONS]:
+        shutil.rmtree(_version_dir(store_dir, name, old), ignore_errors=True)
+    return version
+
+
+def publish_dataset(filename=DEFAULT_FILENAME, data_dir=DATA_DIR, store_dir=None, name=None):
+    """
+    Publish a dataset file under its stem unless the current version already holds it.
+
+    Returns (name, version). The file is parsed through load_matrix()'s cache.
+    """
+    data_path = resolve_data_path(filename, data_dir)
+    name = name or os.path.splitext(os.path.basename(data_path))[0]
+    fingerprint = file_fingerprint(data_path)
+    version = current_version(name, store_dir)
+    if version is not None and version_meta(name, version, store_dir).get("fingerprint") == fingerprint:
+        return name, version
+    matrix = load_matrix(os.path.basename(data_path), os.path.dirname(data_path))
+    return name, publish(matrix, name, store_dir, source=os.path.basename(data_path),
+                         fingerprint=fingerprint)
+
+
+def attach(name, store_dir=None, version=None):
+    """Memory-mapped matrix of a version (default: the current one)."""
+    store_dir = store_dir or default_store_dir()
+    version = version or current_version(name, store_dir)
+    if version is None:
+        raise FileNotFoundError(f"Nothing published as {name} in {store_dir}")
+    return NutrientMatrix.load(_version_dir(store_dir, name, version))
+
+
+class SharedMatrix:
+    """
+    Handle on the current version of a published matrix.
+
+    matrix re-reads the pointer at most every check_interval seconds and
+    attaches a newly published version; refresh() checks right away.
+    """
+
+    def __init__(self, name, store_dir=None, check_interval=CHECK_INTERVAL):
+        self.name = name
+        self.store_dir = store_dir or default_store_dir()
+        self.check_interval = check_interval
+        self.version = None
+        self._matrix = None
+        self._checked = 0.0
+        self.refresh()
+
+    def refresh(self):
+        """Attach the current version if it changed; True when it did."""
+        self._checked = time.monotonic()
+        version = current_version(self.name, self.store_dir)
+        if version is None or version == self.version:
+            return False
+        self._matrix = attach(self.name, self.store_dir, version)
+        self.version = version
+        return True
+
+    @property
+    def matrix(self):
+        if time.monotonic() - self._checked >= self.check_interval:
+            self.refresh()
+        if self._matrix is None:
+            raise FileNotFoundError(f"Nothing published as {self.name} in {self.store_dir}")
+        return self._matrix
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish datasets to the shared matrix store.")
+    parser.add_argument("--store", help="store directory (default: Datasets/.store)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    publish_parser = commands.add_parser("publish", help="publish a dataset file (no-op if unchanged)")
+    publish_parser.add_argument("data", nargs="?", default=DEFAULT_FILENAME,
+                                help="dataset file in Datasets/ (default: %(default)s)")
+    commands.add_parser("list", help="published names and versions")
+    args = parser.parse_args()
+
+    store_dir = args.store or default_store_dir()
+    if args.command == "publish":
+        name, version = publish_dataset(args.data, store_dir=store_dir)
+        print(f"{name}: version {version} is current")
+    else:
+        names = sorted({entry.split("@")[0] for entry in os.listdir(store_dir) if "@" in entry}) \
+            if os.path.isdir(store_dir) else []
+        for name in names:
+            current = current_version(name, store_dir)
+            listed = ", ".join(f"{v}*" if v == current else v for v in versions(name, store_dir))
+            print(f"{name}: {listed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+# Lightweight phase timers and counters
+#
+#   metrics = Metrics(enabled=True)
+#   with metrics.phase("solve"):
+#       model.solve(params)
+#   metrics.count("solves")
+#
+# A disabled instance hands out one shared no-op context manager, so the
+# instrumented code paths cost a method call and nothing else. Collected
+# numbers export as JSON lines (append a record per run) or as a
+# Prometheus text file (e.g. for the node_exporter textfile collector).
+#
+# The CLIs read DIET_METRICS: unset disables collection; a path ending in
+# .prom writes Prometheus text, any other path appends JSON lines.
+
+import json
+import os
+import time
+from contextlib import nullcontext
+
+METRICS_ENV = "DIET_METRICS"
+
+_NOOP = nullcontext()
+
+
+class _Phase:
+    """Context manager adding its elapsed time to one phase."""
+
+    __slots__ = ("metrics", "name", "start")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Metrics:
+    """Accumulated seconds and call counts per phase, plus named counters."""
+
+    def __init__(self, enabled=False, path=None):
+        self.enabled = enabled
+        self.path = path
+        self.seconds = {}
+        self.calls = {}
+        self.counters = {}
+
+    @classmethod
+    def from_env(cls):
+        """Metrics enabled (with export path) when DIET_METRICS is set."""
+        path = os.environ.get(METRICS_ENV)
+        return cls(enabled=bool(path), path=path or None)
+
+    def phase(self, name):
+        """Context manager timing one phase (no-op when disabled)."""
+        if not self.enabled:
+            return _NOOP
+        return _Phase(self, name)
+
+    def record(self, name, seconds):
+        """Add an externally measured duration to a phase."""
+        if not self.enabled or seconds is None:
+            return
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def record_solve(self, stats):
+        """Split a model's last_stats into compile and solver time."""
+        if self.enabled and stats:
+            self.record("solve: compile", stats.get("compile_time"))
+            self.record("solve: solver", stats.get("solve_time"))
+            self.count("solves")
+
+    def count(self, name, value=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def reset(self):
+        self.seconds.clear()
+        self.calls.clear()
+        self.counters.clear()
+
+    def rows(self):
+        """(phase, seconds, calls) tuples in first-seen order."""
+        return [(name, seconds, self.calls[name]) for name, seconds in self.seconds.items()]
+
+    def to_record(self, **labels):
+        """JSON-serializable snapshot, with extra labels merged in."""
+        return {
+            **labels,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "seconds": dict(self.seconds),
+            "calls": dict(self.calls),
+            "counters": dict(self.counters),
+        }
+
+    def to_prometheus(self, prefix="diet", **labels):
+        """Prometheus text exposition format of the current numbers."""
+        base = "".join(f',{key}="{value}"' for key, value in labels.items())
+        lines = [f"# TYPE {prefix}_phase_seconds_total counter"]
+        lines += [f'{prefix}_phase_seconds_total{{phase="{name}"{base}}} {seconds:.6f}'
+                  for name, seconds in self.seconds.items()]
+        lines.append(f"# TYPE {prefix}_phase_calls_total counter")
+        lines += [f'{prefix}_phase_calls_total{{phase="{name}"{base}}} {calls}'
+                  for name, calls in self.calls.items()]
+        for name, value in self.counters.items():
+            metric = f"{prefix}_{name.replace(' ', '_')}_total"
+            label_set = f"{{{base.lstrip(',')}}}" if labels else ""
+            lines += [f"# TYPE {metric} counter", f"{metric}{label_set} {value}"]
+        return "\n".join(lines) + "\n"
+
+    def export(self, path=None, **labels):
+        """Write to path (default self.path): .prom replaces the file, others append a JSON line."""
+        path = path or self.path
+        if not self.enabled or not path:
+            return
+        if path.endswith(".prom"):
+            tmp = path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(self.to_prometheus(**labels))
+            os.replace(tmp, path)  # scrapers never see a half-written file
+        else:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(self.to_record(**labels)) + "\n")
+
+    def report(self):
+        """Plain-text breakdown for console output."""
+        lines = [f"{name:24s} {seconds * 1000:9.1f} ms  {calls:5d} calls"
+                 for name, seconds, calls in self.rows()]
+        lines += [f"{name:24s} {value:>9}" for name, value in self.counters.items()]
+        return "\n".join(lines)
@@ -0,0 +1,240 @@
+# Columnar nutrient storage
+#
+# One dense (nutrients x foods) per-gram matrix with a name -> row index,
+# built in a single vectorized pass over the dataset. Model constraints use
+# row blocks of it and all reported totals come from one matrix-vector product.
+
+import json
+import os
+import shutil
+import tempfile
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from dataset import (
+    CACHE_DIRNAME, DATA_DIR, DEFAULT_FILENAME, PER_100G_TO_PER_G, PRICE_COL,
+    file_fingerprint, load_dataset, nutrient_columns, resolve_data_path,
+)
+
+
+MATRIX_FORMAT = 2  # on-disk layout of save(); part of the cache entry name
+
+
+class CategoryIndex(NamedTuple):
+    """Factorized food categories: sorted labels, code per food, sparse one-hot."""
+    labels: list
+    codes: np.ndarray
+    onehot: sparse.csr_array  # (categories x foods), onehot[k, i] = 1 if food i is in category k
+
+
+class PackedStrings:
+    """
+    Read-only sequence of strings kept as one UTF-8 byte array plus offsets.
+
+    Both arrays can be memory-mapped, so a loaded matrix shares its food
+    names between processes instead of holding one Python string per food.
+    """
+
+    def __init__(self, data, offsets):
+        self.data = data        # uint8 array of the concatenated UTF-8 strings
+        self.offsets = offsets  # int64 array, string i is data[offsets[i]:offsets[i + 1]]
+
+    @classmethod
+    def pack(cls, strings):
+        encoded = [str(s).encode("utf-8") for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(e) for e in encoded], out=offsets[1:])
+        return cls(np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("food index out of range")
+        return self.data[self.offsets[i]:self.offsets[i + 1]].tobytes().decode("utf-8")
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+class NutrientMatrix:
+    """Per-gram nutrient matrix (rows = nutrients, columns = foods)."""
+
+    def __init__(self, values, names, food_names, cost, categories=None):
+        """
+        values     : (nutrients x foods) array, per gram
+        names      : nutrient (dataset column) name per row
+        food_names : food name per column (list or PackedStrings)
+        cost       : USD per gram per food
+        categories : optional category label per food (list or pd.Categorical)
+        """
+        self.values = values
+        self.names = list(names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.food_names = food_names if isinstance(food_names, PackedStrings) else list(food_names)
+        self.cost = cost
+        self.categories = categories
+        self.path = None  # directory the arrays are mapped from, if loaded
+        self.fingerprint = None  # content hash of the source dataset, if known
+        self._category_index = None
+
+    @classmethod
+    def from_dataframe(cls, df, columns=None):
+        """Build from a cleaned dataset (values per 100 g); missing columns become zero rows."""
+        columns = list(columns) if columns is not None else nutrient_columns(df)
+        values = df.reindex(columns=columns).fillna(0).to_numpy(dtype=float).T / PER_100G_TO_PER_G
+        cost = df[PRICE_COL].to_numpy(dtype=float)
+        categories = df["Category"].astype(str).tolist() if "Category" in df.columns else None
+        return cls(np.ascontiguousarray(values), columns, df["food"].astype(str).tolist(),
+                   cost, categories)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Load a matrix written by save(); arrays are memory-mapped by default.
+
+        Every process that maps the same directory shares one copy of the
+        values, prices, food names and category codes in the page cache.
+        """
+        mmap_mode = "r" if mmap else None
+
+        def array(name):
+            return np.load(os.path.join(path, name), mmap_mode=mmap_mode)
+
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        food_names = PackedStrings(array("food_names.npy"), array("food_offsets.npy"))
+        categories = None
+        if meta.get("category_labels") is not None:
+            categories = pd.Categorical.from_codes(array("category_codes.npy"), meta["category_labels"])
+        matrix = cls(array("values.npy"), meta["names"], food_names, array("cost.npy"), categories)
+        matrix.path = path
+        matrix.fingerprint = meta.get("fingerprint")
+        return matrix
+
+    def save(self, path, **extra_meta):
+        """Write the matrix as .npy arrays (names packed, categories as codes) plus a meta.json."""
+        os.makedirs(path, exist_ok=True)
+
+        def write(name, values):
+            np.save(os.path.join(path, name), np.ascontiguousarray(values))
+
+        write("values.npy", self.values)
+        write("cost.npy", self.cost)
+        food_names = (self.food_names if isinstance(self.food_names, PackedStrings)
+                      else PackedStrings.pack(self.food_names))
+        write("food_names.npy", food_names.data)
+        write("food_offsets.npy", food_names.offsets)
+        labels = None
+        if self.category_index is not None:
+            labels = self.category_index.labels
+            write("category_codes.npy", self.category_index.codes.astype(np.int32))
+        meta = {"format": MATRIX_FORMAT, "names": self.names, "category_labels": labels, **extra_meta}
+        with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+    def to_dataframe(self):
+        """Rebuild a cleaned dataset (values per 100 g) from the matrix."""
+        df = pd.DataFrame(np.asarray(self.values).T * PER_100G_TO_PER_G, columns=self.names)
+        df.insert(0, "food", list(self.food_names))
+        df[PRICE_COL] = np.asarray(self.cost)
+        if self.categories is not None:
+            df["Category"] = self.categories
+        return df
+
+    @property
+    def n_foods(self):
+        return self.values.shape[1]
+
+    @property
+    def category_index(self):
+        """CategoryIndex for the foods, computed once per matrix (None without categories)."""
+        if self._category_index is None and self.categories is not None:
+            if isinstance(self.categories, pd.Categorical):
+                codes, labels = self.categories.codes, self.categories.categories
+            else:
+                codes, labels = pd.factorize(pd.Series(self.categories), sort=True)
+            onehot = sparse.csr_array(
+                (np.ones(self.n_foods), (codes, np.arange(self.n_foods))),
+                shape=(len(labels), self.n_foods),
+            )
+            self._category_index = CategoryIndex(list(labels), codes, onehot)
+        return self._category_index
+
+    def take(self, indices):
+        """Matrix restricted to the foods at the given column indices."""
+        indices = np.asarray(indices)
+        categories = None
+        if isinstance(self.categories, pd.Categorical):
+            categories = self.categories[indices]
+        elif self.categories is not None:
+            categories = [self.categories[i] for i in indices]
+        return NutrientMatrix(np.ascontiguousarray(self.values[:, indices]), self.names,
+                              [self.food_names[i] for i in indices],
+                              np.asarray(self.cost)[indices], categories)
+
+    def row(self, name):
+        """Per-gram array for one nutrient (zeros if the dataset lacks it)."""
+        if name not in self.index:
+            return np.zeros(self.n_foods)
+        return self.values[self.index[name]]
+
+    def rows(self, names):
+        """Stacked per-gram rows for several nutrients, in the given order."""
+        return np.vstack([self.row(name) for name in names])
+
+    def selection(self, x, threshold=1e-3):
+        """Foods used in grams vector x as a Food / Amount (g) / Cost ($) table."""
+        selected = np.flatnonzero(x > threshold)
+        return pd.DataFrame({
+            "Food": [self.food_names[i] for i in selected],
+            "Amount (g)": x[selected].round(1),
+            "Cost ($)": (x[selected] * np.asarray(self.cost)[selected]).round(2),
+        })
+
+    def totals(self, x):
+        """Totals of every nutrient for grams vector x, as a name -> value dict."""
+        return dict(zip(self.names, (self.values @ x).tolist()))
+
+
+def load_matrix(filename=DEFAULT_FILENAME, data_dir=DATA_DIR, cache_dir=None):
+    """
+    NutrientMatrix for a dataset, served from a binary cache.
+
+    The source file is fingerprinted by content; the first load parses and
+    cleans it and writes <cache_dir>/<name>-<fingerprint>/ (.npy arrays plus
+    meta.json). Later loads memory-map that directory directly. Caches for
+    older versions of the same file are removed.
+    """
+    data_path = resolve_data_path(filename, data_dir)
+    cache_dir = cache_dir or os.path.join(data_dir, CACHE_DIRNAME)
+    stem = os.path.splitext(os.path.basename(data_path))[0]
+    fingerprint = file_fingerprint(data_path)
+    entry = os.path.join(cache_dir, f"{stem}-{fingerprint[:16]}-v{MATRIX_FORMAT}")
+
+    if os.path.exists(os.path.join(entry, "meta.json")):
+        return NutrientMatrix.load(entry)
+
+    matrix = NutrientMatrix.from_dataframe(load_dataset(os.path.basename(data_path),
+                                                        os.path.dirname(data_path)))
+    os.makedirs(cache_dir, exist_ok=True)
+    # Write into a temp dir and rename, so concurrent starts never see a partial cache
+    tmp = tempfile.mkdtemp(dir=cache_dir, prefix=".tmp-")
+    os.chmod(tmp, 0o755)
+    matrix.save(tmp, source=os.path.basename(data_path), fingerprint=fingerprint)
+    try:
+        os.rename(tmp, entry)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)  # another process won the race
+    for name in os.listdir(cache_dir):
+        if name.startswith(f"{stem}-") and name != os.path.basename(entry):
+            shutil.rmtree(os.path.join(cache_dir, name), ignore_errors=True)
+    return NutrientMatrix.load(entry)
@@ -0,0 +1,56 @@
+# Process-pool runner for batch and scenario solves
+#
+# The nutrient matrix is shipped to each worker once through the pool
+# initializer; every worker compiles its own DietModel and then only
+# receives chunks of params dicts. executor.map keeps the output order
+# identical to the input order. A matrix loaded from disk (load_matrix(),
+# matrix_store.attach()) is shipped as its directory instead, and the
+# workers memory-map the same files rather than each holding a copy.
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from diet_model import build_model
+from nutrients import NutrientMatrix
+
+# Chunks per worker; more chunks balance better, fewer cost less IPC
+CHUNKS_PER_WORKER = 4
+
+# Compiled model held by each worker process
+_worker_model = None
+
+
+def _init_worker(source, use_categories, backend):
+    """Pool initializer: compile the model once per worker."""
+    global _worker_model
+    matrix = NutrientMatrix.load(source) if isinstance(source, str) else source
+    _worker_model = build_model(matrix, use_categories, backend)
+
+
+def _solve_chunk(records):
+    return _worker_model.solve_many(records)
+
+
+def solve_profiles_parallel(matrix, records, workers=None, use_categories=False, backend="cvxpy"):
+    """
+    Solve a list of params dicts across worker processes.
+
+    Returns (statuses, costs, X) in the same order as records, like
+    DietModel.solve_many().
+    """
+    workers = workers or os.cpu_count() or 1
+    n_chunks = max(1, min(len(records), workers * CHUNKS_PER_WORKER))
+    bounds = np.linspace(0, len(records), n_chunks + 1).astype(int)
+    chunks = [records[lo:hi] for lo, hi in zip(bounds[:-1], bounds[1:])]
+
+    statuses, costs, X = [], [], []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(matrix.path or matrix, use_categories, backend)) as executor:
+        for chunk_statuses, chunk_costs, chunk_X in executor.map(_solve_chunk, chunks):
+            statuses.extend(chunk_statuses)
+            costs.append(chunk_costs)
+            X.append(chunk_X)
+    return statuses, np.concatenate(costs), np.vstack(X)
+
@@ -0,0 +1,130 @@
+# Dominated-food presolve
+#
+# Food j is dominated by food i when, for the constraints active in a
+# profile, i costs no more per gram, gives at least as much of every
+# ">=" nutrient and no more of any "<=" nutrient. Moving grams from j to i
+# then never breaks a bound or raises the cost, so j can be dropped before
+# the model is built without changing the optimum.
+#
+# Nutrients bounded on both sides (calories, carbs, fat in every preset)
+# must match exactly, so candidates are grouped by those values (and by
+# category for the MILP) and only compared within a group. The per-food
+# cap needs one more check: j is only dropped when its dominators cannot
+# all sit at the cap, i.e. k * max_per_food * value > upper bound for a
+# two-sided nutrient, with k the number of dominators.
+
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from bounds import NUTRIENT_BOUNDS
+
+PAIR_BLOCK = 500_000  # candidate pairs compared per vectorized block
+
+
+class PresolveResult(NamedTuple):
+    """Reduced matrix plus the original index of every kept food."""
+    matrix: object
+    kept: np.ndarray
+    n_removed: int
+
+    @property
+    def key(self):
+        """Hashable identity of the kept food set (for model caches)."""
+        return hash(self.kept.tobytes())
+
+    def expand(self, x):
+        """Grams vector over the original foods from one over the kept foods."""
+        full = np.zeros(self.n_removed + len(self.kept))
+        full[self.kept] = x
+        return full
+
+
+def active_rows(params):
+    """
+    (lower, upper, equal) nutrient row lists for a profile.
+
+    A ">=" bound counts when it is positive (missing keys are 0, as in
+    the model); nutrients with both an active lower and an upper bound go
+    to the equality list instead.
+    """
+    lower = {column for key, column, sense in NUTRIENT_BOUNDS
+             if sense == ">=" and float(params.get(key, 0)) > 0}
+    upper = {column for key, column, sense in NUTRIENT_BOUNDS
+             if sense == "<=" and np.isfinite(float(params.get(key, 0)))}
+    equal = sorted(lower & upper)
+    return sorted(lower - upper), sorted(upper - lower), equal
+
+
+def _upper_bounds(params, columns):
+    """Upper bound per column, from the "<=" entries of the params dict."""
+    bounds = {column: float(params.get(key, 0))
+              for key, column, sense in NUTRIENT_BOUNDS if sense == "<="}
+    return np.array([bounds[column] for column in columns])
+
+
+def _group_pairs(groups):
+    """All ordered (i, j) pairs, i != j, of foods sharing a group id."""
+    order = np.argsort(groups, kind="stable")
+    sorted_groups = groups[order]
+    starts = np.flatnonzero(np.r_[True, sorted_groups[1:] != sorted_groups[:-1]])
+    sizes = np.diff(np.r_[starts, len(groups)])
+    multi = sizes > 1
+    starts, sizes = starts[multi], sizes[multi]
+    if len(starts) == 0:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+
+    def ranges(first, lengths):
+        """Concatenated arange(first[k], first[k] + lengths[k]) over k."""
+        return np.repeat(first - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+
+    # left: every member repeated once per member of its group; right: the group members
+    member_pos = ranges(starts, sizes)
+    reps = np.repeat(sizes, sizes)
+    left = np.repeat(member_pos, reps)
+    right = ranges(np.repeat(starts, sizes), reps)
+    keep = left != right
+    return order[left[keep]], order[right[keep]]
+
+
+def dominated_foods(matrix, params, use_categories=False):
+    """Boolean mask of foods that can be dropped for this profile."""
+    n = matrix.n_foods
+    lower, upper, equal = active_rows(params)
+    cap = float(params.get("max_per_food", 0))
+    if not equal or cap <= 0:
+        return np.zeros(n, dtype=bool)  # no two-sided bound to rule out capped dominators
+
+    # Candidates must match on two-sided nutrients (and category for the MILP)
+    keys = pd.DataFrame(matrix.rows(equal).T)
+    if use_categories and matrix.category_index is not None:
+        keys["category"] = matrix.category_index.codes
+    groups = keys.groupby(list(keys.columns), sort=False).ngroup().to_numpy()
+    dominator, dominated = _group_pairs(groups)
+
+    cost = np.asarray(matrix.cost, dtype=float)
+    A_lower = matrix.rows(lower) if lower else np.zeros((0, n))
+    A_upper = matrix.rows(upper) if upper else np.zeros((0, n))
+    counts = np.zeros(n, dtype=np.intp)
+    for start in range(0, len(dominator), PAIR_BLOCK):
+        i = dominator[start:start + PAIR_BLOCK]
+        j = dominated[start:start + PAIR_BLOCK]
+        lo_i, lo_j = A_lower[:, i], A_lower[:, j]
+        up_i, up_j = A_upper[:, i], A_upper[:, j]
+        weak = (cost[i] <= cost[j]) & (lo_i >= lo_j).all(axis=0) & (up_i <= up_j).all(axis=0)
+        # Strictly better somewhere, or an exact tie broken by index
+        strict = (cost[i] < cost[j]) | (lo_i > lo_j).any(axis=0) | (up_i < up_j).any(axis=0) | (i < j)
+        counts += np.bincount(j[weak & strict], minlength=n)
+
+    values = matrix.rows(equal)
+    upper_bounds = _upper_bounds(params, equal)[:, None]
+    cannot_all_cap = (counts * cap * values > upper_bounds).any(axis=0)
+    return (counts > 0) & cannot_all_cap
+
+
+def presolve(matrix, params, use_categories=False):
+    """Drop dominated foods; returns a PresolveResult with the reduced matrix."""
+    removed = dominated_foods(matrix, params, use_categories)
+    kept = np.flatnonzero(~removed)
+    return PresolveResult(matrix.take(kept), kept, int(removed.sum()))
@@ -0,0 +1,183 @@
+# Opt-in profiling of slow calls
+#
+#   profiler = SlowCallProfiler.from_env()
+#   with profiler.profile("solve_diet", params, matrix.fingerprint):
+#       model.solve(params)
+#
+# While enabled, every profiled call runs under a profiler. Calls that take
+# at least threshold seconds leave three files in the output directory,
+# named <time>-<call>-<pid>-<n>:
+#
+#   .pstats     cProfile stats (python -m pstats, snakeviz), or
+#   .collapsed  sampled stacks, one "frame;frame;... count" line per stack
+#               (flamegraph.pl, speedscope), with DIET_PROFILE_FORMAT=collapsed
+#   .json       call name, seconds, the exact params, the dataset
+#               fingerprint and any extra labels, to replay the call offline
+#
+# The cvxpy compile, the solver call and pandas show up as separate
+# subtrees. Faster calls are discarded. A disabled instance hands out one
+# shared no-op context manager, like Metrics. One call per process is
+# profiled at a time (Python profilers are process-wide); calls that
+# overlap it run unprofiled.
+#
+# DIET_PROFILE names the output directory (unset disables profiling);
+# DIET_PROFILE_THRESHOLD sets the threshold in seconds.
+
+import cProfile
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import nullcontext
+
+PROFILE_ENV = "DIET_PROFILE"
+THRESHOLD_ENV = "DIET_PROFILE_THRESHOLD"
+FORMAT_ENV = "DIET_PROFILE_FORMAT"
+
+DEFAULT_THRESHOLD = 1.0   # seconds (measured with the profiler running)
+SAMPLE_INTERVAL = 0.001   # seconds between stack samples in "collapsed" mode
+FORMATS = ("pstats", "collapsed")
+
+_NOOP = nullcontext()
+_ACTIVE = threading.Lock()  # held by the one call being profiled
+_SEQUENCE = itertools.count(1)
+
+
+class _StackSampler:
+    """Samples one thread's Python stack on a background thread."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def dump(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class _Profiled:
+    """Context manager profiling one call and keeping the profile if it was slow."""
+
+    def __init__(self, profiler, name, params, fingerprint, labels):
+        self.profiler = profiler
+        self.name = name
+        self.params = params
+        self.fingerprint = fingerprint
+        self.labels = labels
+        self.collector = None
+        self.start = None
+
+    def __enter__(self):
+        if not _ACTIVE.acquire(blocking=False):
+            return self  # another call is being profiled
+        if self.profiler.fmt == "collapsed":
+            self.collector = _StackSampler(threading.get_ident(), self.profiler.interval)
+            self.collector.start()
+        else:
+            self.collector = cProfile.Profile()
+            self.collector.enable()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.collector is None:
+            return False
+        seconds = time.perf_counter() - self.start
+        try:
+            if isinstance(self.collector, _StackSampler):
+                self.collector.stop()
+            else:
+                self.collector.disable()
+            if seconds >= self.profiler.threshold:
+                self.profiler.dump(self, seconds, exc_type)
+        finally:
+            _ACTIVE.release()
+        return False
+
+
+class SlowCallProfiler:
+    """Profiles calls and writes out those slower than threshold seconds."""
+
+    def __init__(self, directory=None, threshold=DEFAULT_THRESHOLD, fmt="pstats",
+                 interval=SAMPLE_INTERVAL):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown profile format: {fmt} (use one of {', '.join(FORMATS)})")
+        self.directory = directory
+        self.enabled = bool(directory)
+        self.threshold = threshold
+        self.fmt = fmt
+        self.interval = interval
+        self.written = []  # .json paths of the profiles kept by this instance
+
+    @classmethod
+    def from_env(cls):
+        """Profiler enabled (with output directory) when DIET_PROFILE is set."""
+        return cls(os.environ.get(PROFILE_ENV) or None,
+                   float(os.environ.get(THRESHOLD_ENV) or DEFAULT_THRESHOLD),
+                   os.environ.get(FORMAT_ENV) or "pstats")
+
+    def profile(self, name, params=None, fingerprint=None, **labels):
+        """Context manager profiling one call (no-op when disabled)."""
+        if not self.enabled:
+            return _NOOP
+        return _Profiled(self, name, params, fingerprint, labels)
+
+    def dump(self, call, seconds, exc_type=None):
+        """Write the profile of a slow call and its replay record; returns the record path."""
+        os.makedirs(self.directory, exist_ok=True)
+        stem = os.path.join(self.directory, f"{time.strftime('%Y%m%dT%H%M%S')}-{call.name}"
+                                            f"-{os.getpid()}-{next(_SEQUENCE)}")
+        if isinstance(call.collector, _StackSampler):
+            profile_path = stem + ".collapsed"
+            call.collector.dump(profile_path)
+        else:
+            profile_path = stem + ".pstats"
+            call.collector.dump_stats(profile_path)
+        record = {
+            "call": call.name,
+            "seconds": round(seconds, 6),
+            "threshold": self.threshold,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "profile": os.path.basename(profile_path),
+            "format": self.fmt,
+            "params": call.params,
+            "fingerprint": call.fingerprint,
+            "labels": call.labels,
+            "error": exc_type.__name__ if exc_type is not None else None,
+        }
+        with open(stem + ".json", "w", encoding="utf-8") as f:
+            json.dump(record, f, indent=2, default=_jsonable)
+        self.written.append(stem + ".json")
+        return stem + ".json"
+
+
+def _jsonable(value):
+    """json.dump fallback for numpy scalars and arrays in params."""
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    return str(value)
@@ -0,0 +1,389 @@
+# Local HTTP/JSON optimization service
+#
+#   python service.py --port 8000 --workers 2
+#
+#   POST /optimize  {"params": {"cal_min": 2000, ...}}     -> one result
+#   POST /optimize  {"profiles": [{...}, {...}]}            -> {"results": [...]}
+#   GET  /health
+#
+# Profiles use the params keys of app.py (cal_min, prot_min, ...) or the
+# solve_diet() names of batch.py (C_min, P_min, ...); every nutrient bound
+# is required, max_per_food defaults to batch.py's value and min_categories
+# > 0 switches to the category MILP (400 if the dataset has no categories).
+# A result has status, cost, the foods with grams and cost, and the
+# nutrient totals.
+#
+# Every profile is one item on a bounded asyncio queue; when the queue
+# cannot take a request's profiles the request gets 503 with Retry-After
+# (backpressure) instead of waiting. A request with more profiles than the
+# whole queue holds gets 413, since retrying cannot help. A batcher takes up to max_batch items
+# (waiting batch_wait for more after the first) and sends them as one task
+# to a process pool; each worker compiles its models once. At most one batch
+# per worker is in flight, so a busy pool stops the batcher and the queue
+# fills up.
+#
+# start() publishes the dataset to the matrix store (matrix_store.py) and
+# the workers memory-map the published version, so they share one copy of
+# the arrays. Publishing a new version (python matrix_store.py publish)
+# swaps it in: each worker checks the pointer before a batch and recompiles
+# its models on the new matrix.
+#
+# handle() is the whole request path without sockets; ServiceClient calls
+# it directly, so the service can be exercised in-process with no network:
+#
+#   async with OptimizeService(workers=1) as service:
+#       status, body = await service.client().post("/optimize", {"params": params})
+
+import argparse
+import asyncio
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+from batch import DEFAULT_MAX_PER_FOOD
+from dataset import DEFAULT_FILENAME
+from diet_model import NUTRIENT_BOUNDS, PROFILE_FIELDS, build_model
+from matrix_store import SharedMatrix, current_version, publish_dataset
+from solvers import DEFAULT_TIME_LIMIT, SolverPortfolio
+
+DEFAULT_QUEUE = 256        # profiles waiting for a worker before requests get 503
+DEFAULT_BATCH = 16         # profiles per worker task
+DEFAULT_BATCH_WAIT = 0.005 # seconds to wait for more profiles after the first
+MAX_BODY = 1 << 20         # request bodies above this many bytes get 413
+RETRY_AFTER = 1            # seconds, sent with 503
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+PARAM_KEYS = [key for key, _, _ in NUTRIENT_BOUNDS]
+
+
+class ServiceBusy(Exception):
+    """The queue has no room for the request's profiles."""
+
+
+def parse_profile(profile):
+    """Params dict from one JSON profile; ValueError names missing or non-numeric keys."""
+    if not isinstance(profile, dict):
+        raise ValueError("a profile must be a JSON object")
+    params = {PROFILE_FIELDS.get(key, key): value for key, value in profile.items()}
+    missing = [key for key in PARAM_KEYS if key not in params]
+    if missing:
+        raise ValueError(f"missing bounds: {', '.join(missing)}")
+    params.setdefault("max_per_food", DEFAULT_MAX_PER_FOOD)
+    try:
+        return {key: float(params[key]) for key in PARAM_KEYS + ["max_per_food", "min_categories"]
+                if key in params}
+    except (TypeError, ValueError):
+        raise ValueError("bounds must be numbers") from None
+
+
+def parse_request(payload):
+    """(list of params dicts, single) from a request body."""
+    if not isinstance(payload, dict):
+        raise ValueError("body must be a JSON object")
+    if "params" in payload:
+        return [parse_profile(payload["params"])], True
+    profiles = payload.get("profiles")
+    if not isinstance(profiles, list) or not profiles:
+        raise ValueError('body needs "params" or a non-empty "profiles" list')
+    return [parse_profile(profile) for profile in profiles], False
+
+
+# Published matrix and compiled models held by each worker process
+_worker_shared = None
+_worker_models = {}
+_worker_setup = None
+
+
+def _init_worker(name, store_dir, backend, time_limit):
+    """Pool initializer: attach the published matrix once per worker."""
+    global _worker_shared, _worker_setup
+    _worker_shared = SharedMatrix(name, store_dir)
+    _worker_setup = (backend, time_limit)
+
+
+def _worker_matrix():
+    """Current published matrix; a new version drops the models compiled on the old one."""
+    version = _worker_shared.version
+    matrix = _worker_shared.matrix
+    if _worker_shared.version != version:
+        _worker_models.clear()
+    return matrix
+
+
+def _worker_model(matrix, use_categories):
+    """Compiled model for the LP or the category MILP, built on first use."""
+    if use_categories not in _worker_models:
+        backend, time_limit = _worker_setup
+        if backend == "cvxpy":
+            _worker_models[use_categories] = SolverPortfolio(matrix, use_categories,
+                                                             time_limit=time_limit)
+        else:
+            _worker_models[use_categories] = build_model(matrix, use_categories, backend)
+    return _worker_models[use_categories]
+
+
+def _warm_worker():
+    """Compile the LP ahead of the first request; (foods, has categories)."""
+    matrix = _worker_matrix()
+    _worker_model(matrix, False)
+    return matrix.n_foods, matrix.categories is not None
+
+
+def _result(matrix, status, cost, x):
+    """JSON-ready result of one solve."""
+    if x is None:
+        return {"status": status, "cost": None, "foods": [], "totals": {}}
+    selection = matrix.selection(x)
+    return {
+        "status": status,
+        "cost": float(cost),
+        "foods": [{"food": food, "grams": float(grams), "cost": float(food_cost)}
+                  for food, grams, food_cost in selection.itertuples(index=False)],
+        "totals": {name: round(value, 6) for name, value in matrix.totals(x).items()},
+    }
+
+
+def _solve_batch(records):
+    matrix = _worker_matrix()
+    results = []
+    for params in records:
+        use_categories = params.get("min_categories", 0) > 0
+        if use_categories and matrix.categories is None:
+            results.append({"status": "Error: min_categories needs a dataset with categories",
+                            "cost": None, "foods": [], "totals": {}})
+            continue
+        try:
+            status, cost, x = _worker_model(matrix, use_categories).solve(params)
+            results.append(_result(matrix, status, cost, x))
+        except Exception as e:
+            results.append({"status": f"Error: {e}", "cost": None, "foods": [], "totals": {}})
+    return results
+
+
+class OptimizeService:
+    """Queue, batcher and worker pool behind the HTTP front end."""
+
+    def __init__(self, filename=DEFAULT_FILENAME, workers=1, backend="cvxpy",
+                 time_limit=DEFAULT_TIME_LIMIT, max_queue=DEFAULT_QUEUE, max_batch=DEFAULT_BATCH,
+                 batch_wait=DEFAULT_BATCH_WAIT, store_dir=None):
+        self.filename = filename
+        self.store_dir = store_dir
+        self.name = None
+        self.workers = workers
+        self.backend = backend
+        self.time_limit = time_limit
+        self.max_queue = max_queue
+        self.max_batch = max_batch
+        self.batch_wait = batch_wait
+        self.n_foods = None
+        self.has_categories = None
+        self.served = 0
+        self._queue = None
+        self._pool = None
+        self._batcher = None
+        self._slots = None
+
+    async def start(self):
+        """Publish the dataset, start the worker pool (models compiled up front) and the batcher."""
+        loop = asyncio.get_running_loop()
+        self.name, _ = publish_dataset(self.filename, store_dir=self.store_dir)
+        self._queue = asyncio.Queue(self.max_queue)
+        self._slots = asyncio.Semaphore(self.workers)
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                         initargs=(self.name, self.store_dir, self.backend, self.time_limit))
+        warmed = await asyncio.gather(*[loop.run_in_executor(self._pool, _warm_worker)
+                                        for _ in range(self.workers)])
+        self.n_foods, self.has_categories = warmed[0]
+        self._batcher = asyncio.create_task(self._run_batches())
+        return self
+
+    async def stop(self):
+        """Stop the batcher, fail queued profiles and shut the pool down."""
+        if self._batcher is not None:
+            self._batcher.cancel()
+            await asyncio.gather(self._batcher, return_exceptions=True)
+            self._batcher = None
+        while self._queue is not None and not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(ServiceBusy("service stopped"))
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    async def submit(self, records):
+        """Queue params dicts and wait for their results; ServiceBusy if they do not fit."""
+        free = self._queue.maxsize - self._queue.qsize()
+        if free < len(records):
+            raise ServiceBusy(f"queue has room for {free} profiles, request has {len(records)}")
+        loop = asyncio.get_running_loop()
+        futures = [loop.create_future() for _ in records]
+        for params, future in zip(records, futures):
+            self._queue.put_nowait((params, future))
+        return await asyncio.gather(*futures)
+
+    async def _next_batch(self):
+        """Up to max_batch queued items, waiting at most batch_wait after the first."""
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.batch_wait
+        while len(batch) < self.max_batch:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run_batches(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._slots.acquire()
+            batch = await self._next_batch()
+            task = loop.run_in_executor(self._pool, _solve_batch, [params for params, _ in batch])
+            task.add_done_callback(lambda done, batch=batch: self._deliver(batch, done))
+
+    def _deliver(self, batch, done):
+        self._slots.release()
+        for i, (_, future) in enumerate(batch):
+            if future.done():
+                continue
+            if done.cancelled():
+                future.cancel()
+            elif done.exception() is not None:
+                future.set_exception(done.exception())
+            else:
+                future.set_result(done.result()[i])
+        self.served += len(batch)
+
+    async def handle(self, method, path, body=b""):
+        """(HTTP status, JSON-ready payload) for one request."""
+        if path == "/health":
+            if method != "GET":
+                return 405, {"error": "use GET"}
+            return 200, {"status": "ok", "workers": self.workers, "foods": self.n_foods,
+                         "version": current_version(self.name, self.store_dir),
+                         "queued": self._queue.qsize(), "served": self.served}
+        if path != "/optimize":
+            return 404, {"error": f"no route {path}"}
+        if method != "POST":
+            return 405, {"error": "use POST"}
+        try:
+            records, single = parse_request(json.loads(body or b"{}"))
+        except json.JSONDecodeError as e:
+            return 400, {"error": f"invalid JSON: {e}"}
+        except ValueError as e:
+            return 400, {"error": str(e)}
+        if len(records) > self.max_queue:
+            return 413, {"error": f"{len(records)} profiles, the queue holds {self.max_queue}"}
+        if not self.has_categories and any(params.get("min_categories", 0) > 0 for params in records):
+            return 400, {"error": "min_categories needs a dataset with categories"}
+        try:
+            results = await self.submit(records)
+        except ServiceBusy as e:
+            return 503, {"error": str(e)}
+        except Exception as e:
+            return 500, {"error": str(e)}
+        return 200, results[0] if single else {"results": results}
+
+    def client(self):
+        return ServiceClient(self)
+
+    async def serve_connection(self, reader, writer):
+        """HTTP/1.1 on one connection (keep-alive), answering through handle()."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0))
+                if length > MAX_BODY:
+                    status, payload = 413, {"error": f"body over {MAX_BODY} bytes"}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b""
+                    status, payload = await self.handle(method, target.split("?", 1)[0], body)
+                    keep_alive = headers.get("connection", "").lower() != "close"
+                data = json.dumps(payload).encode()
+                head = [f"HTTP/1.1 {status} {REASONS[status]}", "Content-Type: application/json",
+                        f"Content-Length: {len(data)}",
+                        f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+                if status == 503:
+                    head.append(f"Retry-After: {RETRY_AFTER}")
+                writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass  # malformed request or client gone
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8000):
+        """Start and serve until cancelled."""
+        async with self:
+            server = await asyncio.start_server(self.serve_connection, host, port)
+            print(f"Serving {self.n_foods} foods on http://{host}:{port} with {self.workers} worker(s)")
+            async with server:
+                await server.serve_forever()
+
+
+class ServiceClient:
+    """In-process client: requests go straight to handle(), no sockets."""
+
+    def __init__(self, service):
+        self.service = service
+
+    async def get(self, path):
+        return await self.service.handle("GET", path)
+
+    async def post(self, path, payload):
+        return await self.service.handle("POST", path, json.dumps(payload).encode())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve diet optimizations over HTTP/JSON.")
+    parser.add_argument("--host", default="127.0.0.1", help="bind address (default: %(default)s)")
+    parser.add_argument("--port", type=int, default=8000, help="port (default: %(default)s)")
+    parser.add_argument("--data", default=DEFAULT_FILENAME,
+                        help="dataset file in Datasets/ (default: %(default)s)")
+    parser.add_argument("--backend", choices=["cvxpy", "highs"], default="cvxpy",
+                        help="solver backend (default: %(default)s)")
+    parser.add_argument("-j", "--workers", type=int, default=1,
+                        help="worker processes (default: %(default)s)")
+    parser.add_argument("--queue", type=int, default=DEFAULT_QUEUE,
+                        help="profiles queued before requests get 503 (default: %(default)s)")
+    parser.add_argument("--batch", type=int, default=DEFAULT_BATCH,
+                        help="profiles per worker task (default: %(default)s)")
+    args = parser.parse_args()
+
+    service = OptimizeService(args.data, args.workers, args.backend,
+                              max_queue=args.queue, max_batch=args.batch)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# Bounded LRU cache of optimize_diet results
+#
+# Keys combine a fingerprint of the active food set with the rounded params
+# dict and the solve options that change the result (backend, ...), so
+# toggling back to a preset profile on the same data is a lookup instead
+# of a solve. One instance is shared across Streamlit sessions,
+# hence the lock.
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+DEFAULT_MAXSIZE = 256
+PARAM_DIGITS = 3  # params are rounded to this many decimals in the key
+
+
+def frame_fingerprint(df: pd.DataFrame) -> str:
+    """Content hash of a DataFrame (values and column names, not the index)."""
+    digest = hashlib.sha256()
+    digest.update("\x1f".join(map(str, df.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def solution_key(fingerprint, params, digits=PARAM_DIGITS, **options):
+    """
+    Cache key for (food set fingerprint, normalized params, solve options).
+
+    options are the settings that change the result (backend, ...); they
+    must be JSON-serializable.
+    """
+    normalized = {key: round(float(value), digits) for key, value in params.items()}
+    payload = json.dumps([fingerprint, normalized, options], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class SolutionCache:
+    """Thread-safe LRU cache with hit/miss counters and size-based eviction."""
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Stored value for key (marked most recently used), or None."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        """Store value, evicting least recently used entries beyond maxsize."""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """Counters for display / logging."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "size": len(self._entries), "maxsize": self.maxsize}
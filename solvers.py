@@ -0,0 +1,199 @@
+# Solver portfolio
+#
+# Picks solvers by problem class (plain LP vs the category MILP), applies a
+# wall-clock limit and a MIP gap to every solve, and can race the two best
+# installed solvers, keeping the first optimal answer. Each solve records
+# which solver produced the plan, its time and iterations, and which
+# solvers raised an error before it (stats["failed"]).
+#
+# Racers are processes, one per solver, each with its own compiled model:
+# a solver call cannot be interrupted from another thread, but a process
+# can be terminated. The loser of a race is killed and replaced by a fresh
+# process that compiles its model while the winner's plan is shown, so the
+# next race does not wait for the abandoned solve.
+
+import multiprocessing
+import threading
+from multiprocessing.connection import wait
+
+import cvxpy as cp
+
+from bounds import DEFAULT_MIP_GAP, DEFAULT_TIME_LIMIT  # re-exported for existing imports
+from diet_model import OPTIMAL_STATUSES, BaseDietModel, DietModel
+from nutrients import NutrientMatrix
+
+# Preferred solvers per problem class, best first; filtered by what is installed
+PORTFOLIO = {
+    "LP": [cp.HIGHS, cp.CLARABEL, cp.GLPK, cp.ECOS, cp.SCIPY],
+    "MILP": [cp.HIGHS, cp.SCIP, cp.GLPK_MI, cp.SCIPY, cp.ECOS_BB],
+}
+
+
+def limit_options(solver, time_limit, mip_gap, problem_class="LP"):
+    """cvxpy solve() keyword options that apply the limits for one solver."""
+    if solver == cp.HIGHS:
+        options = {"time_limit": time_limit, "mip_rel_gap": mip_gap}
+        if problem_class == "MILP":
+            # HiGHS MIP presolve does not check the time limit and grows
+            # quadratically with the food count (17 s+ at 20k foods vs 2 s off)
+            options["presolve"] = "off"
+        return options
+    if solver == cp.SCIPY:
+        options = {"time_limit": time_limit}
+        if problem_class == "MILP":
+            options["mip_rel_gap"] = mip_gap
+        return {"scipy_options": options}
+    if solver == cp.SCIP:
+        return {"scip_params": {"limits/time": time_limit, "limits/gap": mip_gap}}
+    if solver == cp.GLPK_MI:
+        return {"tm_lim": int(time_limit * 1000), "mip_gap": mip_gap}
+    if solver == cp.CLARABEL:
+        return {"time_limit": time_limit}
+    return {}  # no limit options known for this solver
+
+
+def _racer_main(conn, source, use_categories, solver, options):
+    """Racer process: compile the model once, then solve each (params, warm_start) from conn."""
+    matrix = NutrientMatrix.load(source) if isinstance(source, str) else source
+    model = DietModel(matrix, use_categories)
+    while True:
+        try:
+            params, warm_start = conn.recv()
+        except EOFError:
+            return
+        try:
+            result = model.solve_result(params, solvers=[solver], solver_options={solver: options},
+                                        warm_start=warm_start)
+            conn.send(("ok", result._replace(stats=dict(result.stats, requested=solver))))
+        except Exception as e:
+            conn.send(("error", str(e)))
+
+
+class _Racer:
+    """One solver of a race, running in its own process so a losing solve can be stopped."""
+
+    def __init__(self, source, use_categories, solver, options):
+        self.solver = solver
+        self._args = (source, use_categories, solver, options)
+        self._start()
+
+    def _start(self):
+        self.conn, child = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(target=_racer_main, args=(child, *self._args), daemon=True)
+        self._process.start()
+        child.close()
+
+    def submit(self, params, warm_start):
+        self.conn.send((params, warm_start))
+
+    def receive(self):
+        """("ok", SolveResult) or ("error", message)."""
+        try:
+            return self.conn.recv()
+        except EOFError:
+            return "error", "racer process exited"
+
+    def stop(self):
+        """Drop the solve in progress: kill the process unless it has already answered."""
+        if self.conn.poll():
+            self.receive()
+            return
+        self._process.terminate()
+        self._process.join()
+        self.conn.close()
+        self._start()
+
+
+class SolverPortfolio(BaseDietModel):
+    """
+    Drop-in replacement for a DietModel that chooses the solver itself.
+
+    race=True solves with the two best installed solvers at once, each in
+    its own racer process, and returns the first optimal result; the other
+    solve is stopped.
+    """
+
+    def __init__(self, matrix, use_categories=False, time_limit=DEFAULT_TIME_LIMIT,
+                 mip_gap=DEFAULT_MIP_GAP, race=False):
+        self.matrix = matrix
+        self.use_categories = use_categories and matrix.category_index is not None
+        self.problem_class = "MILP" if self.use_categories else "LP"
+        installed = set(cp.installed_solvers())
+        self.solvers = [s for s in PORTFOLIO[self.problem_class] if s in installed]
+        self.time_limit = time_limit
+        self.mip_gap = mip_gap
+        self.options = {s: limit_options(s, time_limit, mip_gap, self.problem_class)
+                        for s in self.solvers}
+        self.race = race and len(self.solvers) >= 2
+        self.n = matrix.n_foods
+        self.last_stats = None  # set after every solve; shared callers use solve_result()
+        self.last_sensitivity = None
+        # One compiled model per solver; racers hold their own in their processes
+        self._models = {}
+        self._models_lock = threading.Lock()
+        self._racers = []
+        self._race_lock = threading.Lock()
+        if self.race:
+            source = matrix.path or matrix  # a memory-mapped matrix is shipped as its path
+            self._racers = [_Racer(source, self.use_categories, solver, self.options[solver])
+                            for solver in self.solvers[:2]]
+
+    def _model(self, solver):
+        with self._models_lock:
+            if solver not in self._models:
+                self._models[solver] = DietModel(self.matrix, self.use_categories)
+            return self._models[solver]
+
+    def _solve_with(self, solvers, params, warm_start=False, session=None):
+        """Solve on the model of solvers[0], trying the others if it fails."""
+        model = self._model(solvers[0] if solvers else None)
+        result = model.solve_result(params, solvers=solvers, solver_options=self.options,
+                                    session=session, warm_start=warm_start)
+        return result._replace(stats=dict(result.stats, requested=solvers[0] if solvers else None))
+
+    def solve_result(self, params, solvers=None, warm_start=False, session=None):
+        """
+        Solve for one profile and return a SolveResult like DietModel.
+
+        solvers is ignored (the portfolio picks them); the statistics are
+        those of the winning solve, including the racing mode. A session
+        (diet_model.WarmStartSession) warm-starts from its own last solve;
+        racers run in their own processes and warm-start from theirs.
+        """
+        if self.race:
+            result = self._race(params, warm_start or session is not None)
+        else:
+            result = self._solve_with(self.solvers, params, warm_start, session)
+        result = result._replace(stats=dict(result.stats, problem_class=self.problem_class, raced=self.race))
+        self.last_stats, self.last_sensitivity = result.stats, result.sensitivity
+        return result
+
+    def _race(self, params, warm_start):
+        """Run the two best solvers concurrently; first optimal answer wins, the other is stopped."""
+        with self._race_lock:
+            pending = {}
+            for racer in self._racers:
+                racer.submit(params, warm_start)
+                pending[racer.conn] = racer
+            fallback, failed = None, {}
+            while pending:
+                for conn in wait(list(pending)):
+                    racer = pending.pop(conn)
+                    kind, result = racer.receive()
+                    if kind == "error":
+                        failed[racer.solver] = result
+                        continue
+                    if result.status in OPTIMAL_STATUSES:
+                        for loser in pending.values():
+                            loser.stop()
+                        return self._with_failures(result, failed)
+                    if fallback is None or (fallback.x is None and result.x is not None):
+                        fallback = result
+            if fallback is None:
+                raise RuntimeError("; ".join(f"{solver}: {error}" for solver, error in failed.items()))
+            return self._with_failures(fallback, failed)
+
+    @staticmethod
+    def _with_failures(result, failed):
+        """result with the racers that raised added to stats["failed"]."""
+        return result._replace(stats=dict(result.stats, failed={**failed, **result.stats["failed"]}))
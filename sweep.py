@@ -0,0 +1,82 @@
+# Parametric sweeps: cost as one or two bounds vary
+#
+# Every grid point is a re-solve of one compiled model with warm_start, so
+# a sweep costs about one warm solve per point. The result table has the
+# cost, the marginal cost per unit of the swept bound and the food basket
+# at every point; breakpoints are the points where the basket changes.
+#
+#   result = sweep(DietModel(matrix), params, {"prot_min": np.arange(60, 200, 5)})
+#   result.table[["prot_min", "cost", "marginal_cost"]]
+#   result.breakpoints
+
+from typing import NamedTuple
+
+import cvxpy as cp
+import numpy as np
+import pandas as pd
+
+SUPPORT_GRAMS = 1e-3  # foods above this many grams count as part of the basket
+
+
+class SweepResult(NamedTuple):
+    """Sweep output: one row per grid point, plus the basket-change rows."""
+    table: pd.DataFrame
+    breakpoints: pd.DataFrame
+
+
+def grid_points(axes):
+    """
+    Grid points as dicts, in serpentine order for two axes.
+
+    The second axis runs forwards and backwards on alternate values of the
+    first, so consecutive points differ in one bound and warm starts stay close.
+    """
+    keys = list(axes)
+    if len(keys) == 1:
+        return [{keys[0]: float(value)} for value in axes[keys[0]]]
+    if len(keys) != 2:
+        raise ValueError("sweep takes one or two bounds")
+    first, second = keys
+    points = []
+    for i, outer in enumerate(axes[first]):
+        inner_values = axes[second] if i % 2 == 0 else list(axes[second])[::-1]
+        points += [{first: float(outer), second: float(inner)} for inner in inner_values]
+    return points
+
+
+def sweep(model, params, axes, solvers=(cp.HIGHS,)):
+    """
+    Solve params with the bounds in axes (params key -> grid values) varied.
+
+    model is any compiled diet model (DietModel, SolverPortfolio, ...) and is
+    re-solved with warm_start=True at every point. Returns a SweepResult
+    whose table is sorted by the swept keys.
+    """
+    keys = list(axes)
+    rows = []
+    for point in grid_points(axes):
+        status, cost, x = model.solve({**params, **point}, solvers=list(solvers), warm_start=True)
+        basket = frozenset(np.flatnonzero(x > SUPPORT_GRAMS).tolist()) if x is not None else None
+        rows.append({
+            **point,
+            "status": status,
+            "cost": cost,
+            "n_foods": len(basket) if basket is not None else None,
+            "foods": sorted(model.matrix.food_names[i] for i in basket) if basket is not None else None,
+            "_basket": basket,
+        })
+    table = pd.DataFrame(rows).sort_values(keys, kind="stable").reset_index(drop=True)
+
+    # Marginal cost and basket changes along the last swept key (per line of a 2D grid)
+    along, lines = keys[-1], keys[:-1]
+    groups = table.groupby(lines, sort=False) if lines else [(None, table)]
+    marginal = pd.Series(np.nan, index=table.index)
+    changed = pd.Series(False, index=table.index)
+    for _, line in groups:
+        marginal[line.index] = line["cost"].diff() / line[along].diff()
+        baskets = line["_basket"].tolist()
+        changed[line.index[1:]] = [a != b for a, b in zip(baskets[:-1], baskets[1:])]
+    table["marginal_cost"] = marginal
+    table["basket_changed"] = changed
+    table = table.drop(columns="_basket")
+    return SweepResult(table, table[table["basket_changed"]].reset_index(drop=True))
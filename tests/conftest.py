@@ -0,0 +1,43 @@
+# Shared fixtures: the bundled datasets as NutrientMatrix objects and the
+# example profiles as params dicts. The scripts live at the repo root, so it
+# is put on sys.path for the test modules.
+
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bounds import PROFILE_FIELDS  # noqa: E402
+from nutrients import load_matrix  # noqa: E402
+
+PROFILES_CSV = os.path.join(ROOT, "Datasets", "example_profiles.csv")
+
+
+@pytest.fixture(scope="session")
+def matrix():
+    """Bundled dataset without categories."""
+    return load_matrix("food_data_with_prices.csv")
+
+
+@pytest.fixture(scope="session")
+def category_matrix():
+    """Bundled dataset with a Category column."""
+    return load_matrix("food_data_with_prices_with_category.csv")
+
+
+@pytest.fixture(scope="session")
+def profiles():
+    """Example profiles (Datasets/example_profiles.csv) as params dicts."""
+    table = pd.read_csv(PROFILES_CSV).drop(columns="name")
+    return [{PROFILE_FIELDS[column]: float(value) for column, value in row.items()}
+            for _, row in table.iterrows()]
+
+
+@pytest.fixture
+def params(profiles):
+    """A fresh copy of the default profile."""
+    return dict(profiles[0])
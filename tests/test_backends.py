@@ -0,0 +1,103 @@
+# The cvxpy model, the direct HiGHS backend and the solver portfolio must
+# find plans of the same cost for the same profile.
+
+import cvxpy as cp
+import numpy as np
+import pytest
+
+from bounds import OPTIMAL_STATUSES
+from diet_model import DietModel, WarmStartSession
+from highs_backend import HighsDietModel
+from solvers import SolverPortfolio
+
+COST_TOL = 1e-6
+
+
+def backends(matrix, use_categories):
+    return {
+        "cvxpy": DietModel(matrix, use_categories),
+        "highs": HighsDietModel(matrix, use_categories),
+        "portfolio": SolverPortfolio(matrix, use_categories),
+    }
+
+
+def assert_same_cost(results):
+    costs = {name: result.cost for name, result in results.items()}
+    reference = costs["cvxpy"]
+    for name, cost in costs.items():
+        assert cost == pytest.approx(reference, rel=COST_TOL, abs=COST_TOL), costs
+
+
+def test_lp_backends_agree(matrix, profiles):
+    models = backends(matrix, False)
+    for params in profiles:
+        results = {name: model.solve_result(params) for name, model in models.items()}
+        assert all(result.status in OPTIMAL_STATUSES for result in results.values())
+        assert_same_cost(results)
+
+
+def test_category_milp_backends_agree(category_matrix, profiles):
+    models = backends(category_matrix, True)
+    for params in profiles:
+        params = dict(params, min_categories=3)
+        results = {name: model.solve_result(params) for name, model in models.items()}
+        assert all(result.status in OPTIMAL_STATUSES for result in results.values())
+        assert_same_cost(results)
+
+
+def test_plans_meet_the_bounds(matrix, params):
+    for model in backends(matrix, False).values():
+        result = model.solve_result(params)
+        assert np.all(result.x >= -1e-7)
+        assert np.all(result.x <= params["max_per_food"] + 1e-6)
+        assert float(np.asarray(matrix.cost) @ result.x) == pytest.approx(result.cost, rel=1e-6)
+
+
+def test_race_matches_single_solver(matrix, params):
+    raced = SolverPortfolio(matrix, race=True)
+    if not raced.race:
+        pytest.skip("racing needs two installed solvers")
+    result = raced.solve_result(params)
+    assert result.stats["raced"]
+    assert result.cost == pytest.approx(DietModel(matrix).solve_result(params).cost, rel=COST_TOL)
+    # The next race still works after the loser was stopped
+    assert raced.solve_result(dict(params, prot_min=params["prot_min"] + 10)).status in OPTIMAL_STATUSES
+
+
+def test_infeasible_profile(matrix, params):
+    params = dict(params, cal_min=10000, cal_max=10001)
+    for model in backends(matrix, False).values():
+        result = model.solve_result(params)
+        assert result.status == "infeasible"
+        assert result.x is None and result.cost is None
+
+
+def test_missing_upper_limit_is_unbounded(matrix, params):
+    without = {key: value for key, value in params.items() if key != "carb_max"}
+    loose = dict(params, carb_max=1e9)
+    for model in backends(matrix, False).values():
+        result = model.solve_result(without)
+        assert result.status in OPTIMAL_STATUSES
+        assert result.cost == pytest.approx(model.solve_result(loose).cost, rel=COST_TOL)
+        assert "carb_max" not in result.sensitivity.binding
+
+
+def test_failed_solver_is_recorded(matrix, params):
+    result = DietModel(matrix).solve_result(params, solvers=["NOT_A_SOLVER", cp.HIGHS])
+    assert result.stats["solver"] == cp.HIGHS
+    assert "NOT_A_SOLVER" in result.stats["failed"]
+
+
+def test_warm_start_session(matrix, profiles):
+    model, session = DietModel(matrix), WarmStartSession()
+    first = model.solve_result(profiles[0], solvers=[cp.HIGHS], session=session)
+    assert not session.last_warm
+    for params in profiles[1:]:
+        warm = model.solve_result(params, solvers=[cp.HIGHS], session=session)
+        assert session.last_warm
+        cold = DietModel(matrix).solve_result(params, solvers=[cp.HIGHS])
+        assert warm.cost == pytest.approx(cold.cost, rel=COST_TOL)
+    # Another model starts the session over, cold
+    DietModel(matrix).solve_result(profiles[0], solvers=[cp.HIGHS], session=session)
+    assert not session.last_warm
+    assert first.status in OPTIMAL_STATUSES
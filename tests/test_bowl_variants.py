@@ -0,0 +1,35 @@
+# Bowl generation: parallel parts must find the same bowls as one process.
+
+import pytest
+
+from bowl_variants import BowlVariantModel, generate_bowls, generate_bowls_parallel
+from bowls import BOWL_PRESETS
+
+COUNT = 8
+
+
+@pytest.mark.parametrize("objective", sorted(BOWL_PRESETS))
+def test_parallel_matches_sequential(matrix, objective):
+    params = BOWL_PRESETS[objective]
+    sequential = generate_bowls(BowlVariantModel(matrix, objective), params, COUNT)
+    parallel = generate_bowls_parallel(matrix, params, COUNT, objective, workers=2)
+    assert len(sequential) == len(parallel) == COUNT
+    assert [bowl.objective for bowl in parallel] == pytest.approx([bowl.objective for bowl in sequential],
+                                                                  rel=1e-6)
+
+
+def test_bowls_are_distinct_and_ordered(matrix):
+    bowls = generate_bowls(BowlVariantModel(matrix, "cost"), BOWL_PRESETS["cost"], COUNT)
+    assert len({bowl.ingredients for bowl in bowls}) == COUNT
+    objectives = [bowl.objective for bowl in bowls]
+    assert objectives == sorted(objectives)
+
+
+def test_floor_resets_when_params_change(matrix):
+    params = BOWL_PRESETS["cost"]
+    model = BowlVariantModel(matrix, "cost")
+    bowls = generate_bowls(model, params, 3)
+    looser = dict(params, cal_min=params["cal_min"] / 2, prot_min=params["prot_min"] / 2,
+                  grams_min=params["grams_min"] / 2)
+    # Cheaper bowls exist under the looser params; the old floor must not keep them out
+    assert model.next_bowl(looser).objective < bowls[-1].objective
@@ -0,0 +1,92 @@
+# Publishing, attaching and rolling over versions in the matrix store.
+
+import errno
+import os
+
+import numpy as np
+import pytest
+
+import matrix_store
+from matrix_store import (
+    KEEP_VERSIONS, SharedMatrix, attach, current_version, publish, publish_dataset, versions,
+)
+
+
+def scaled(matrix, factor):
+    """Copy of matrix with prices scaled (a stand-in for a refreshed dataset)."""
+    copy = matrix.take(np.arange(matrix.n_foods))
+    copy.cost = np.asarray(matrix.cost) * factor
+    return copy
+
+
+def test_publish_and_attach(matrix, tmp_path):
+    store = str(tmp_path)
+    assert current_version("foods", store) is None
+    version = publish(matrix, "foods", store, source="test")
+    assert current_version("foods", store) == version
+    attached = attach("foods", store)
+    assert isinstance(attached.values, np.memmap)
+    np.testing.assert_array_equal(attached.values, matrix.values)
+    np.testing.assert_array_equal(attached.cost, matrix.cost)
+    assert list(attached.food_names) == list(matrix.food_names)
+    assert attached.names == matrix.names
+
+
+def test_rollover_keeps_the_newest_versions(matrix, tmp_path):
+    store = str(tmp_path)
+    published = [publish(scaled(matrix, 1 + i), "foods", store) for i in range(KEEP_VERSIONS + 2)]
+    assert published == sorted(published)
+    assert versions("foods", store) == published[-KEEP_VERSIONS:]
+    assert current_version("foods", store) == published[-1]
+    np.testing.assert_allclose(attach("foods", store).cost, np.asarray(matrix.cost) * (KEEP_VERSIONS + 2))
+    assert not [entry for entry in os.listdir(store) if entry.startswith(".tmp-")]
+
+
+def test_shared_matrix_follows_the_pointer(matrix, tmp_path):
+    store = str(tmp_path)
+    publish(matrix, "foods", store)
+    shared = SharedMatrix("foods", store, check_interval=3600)
+    first = shared.version
+    assert not shared.refresh()
+    publish(scaled(matrix, 2), "foods", store)
+    assert shared.matrix.cost[0] == matrix.cost[0]  # not re-checked within the interval
+    assert shared.refresh()
+    assert shared.version != first
+    np.testing.assert_allclose(shared.matrix.cost, np.asarray(matrix.cost) * 2)
+
+
+def test_publish_dataset_is_a_noop_when_unchanged(tmp_path):
+    store = str(tmp_path)
+    name, version = publish_dataset("food_data_with_prices.csv", store_dir=store)
+    assert publish_dataset("food_data_with_prices.csv", store_dir=store) == (name, version)
+    assert versions(name, store) == [version]
+
+
+def test_publish_retries_when_the_version_is_taken(matrix, tmp_path, monkeypatch):
+    store = str(tmp_path)
+    rename, taken = os.rename, []
+
+    def racing_rename(src, dst):
+        if not taken:  # another publisher claims the number first
+            taken.append(dst)
+            os.makedirs(dst)
+            open(os.path.join(dst, "meta.json"), "w").close()
+            raise OSError(errno.ENOTEMPTY, "taken", dst)
+        return rename(src, dst)
+
+    monkeypatch.setattr(matrix_store.os, "rename", racing_rename)
+    version = publish(matrix, "foods", store)
+    assert os.path.basename(taken[0]) != f"foods@{version}"
+    assert current_version("foods", store) == version
+
+
+def test_publish_raises_other_errors_and_cleans_up(matrix, tmp_path, monkeypatch):
+    store = str(tmp_path)
+
+    def failing_rename(src, dst):
+        raise PermissionError(errno.EACCES, "denied", dst)
+
+    monkeypatch.setattr(matrix_store.os, "rename", failing_rename)
+    with pytest.raises(PermissionError):
+        publish(matrix, "foods", store)
+    assert os.listdir(store) == []
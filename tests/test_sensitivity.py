@@ -0,0 +1,64 @@
+# Shadow prices must match finite differences of the optimal cost. The LP
+# cost is piecewise linear in each bound, so at a degenerate point the dual
+# only has to lie between the one-sided differences.
+
+import numpy as np
+import pytest
+
+from bounds import NUTRIENT_BOUNDS
+from diet_model import DietModel
+from highs_backend import HighsDietModel
+
+SENSES = {key: sense for key, _, sense in NUTRIENT_BOUNDS}
+SENSES["max_per_food"] = "<="
+STEP = 1e-3   # relative bound change for the differences
+TOL = 1e-6
+
+
+def tightened(params, key, amount):
+    """params with one bound tightened by amount (negative: loosened)."""
+    step = amount if SENSES[key] == ">=" else -amount
+    return dict(params, **{key: params[key] + step})
+
+
+@pytest.mark.parametrize("model_class", [DietModel, HighsDietModel])
+def test_shadow_prices_match_finite_differences(matrix, profiles, model_class):
+    model = model_class(matrix)
+    for params in profiles:
+        result = model.solve_result(params)
+        prices = result.sensitivity.shadow_prices
+        assert set(prices) == set(SENSES)
+        for key, price in prices.items():
+            delta = STEP * max(1.0, abs(params[key]))
+            tighter = model.solve_result(tightened(params, key, delta)).cost
+            looser = model.solve_result(tightened(params, key, -delta)).cost
+            slopes = sorted([(tighter - result.cost) / delta, (result.cost - looser) / delta])
+            slack = TOL * max(1.0, abs(price)) + 1e-9
+            assert slopes[0] - slack <= price <= slopes[1] + slack, (key, price, slopes)
+
+
+def test_non_binding_bounds_have_zero_price(matrix, params):
+    result = DietModel(matrix).solve_result(params)
+    for key, price in result.sensitivity.shadow_prices.items():
+        if key not in result.sensitivity.binding:
+            assert price == pytest.approx(0.0, abs=1e-7), key
+
+
+def test_backends_report_the_same_duals(matrix, params):
+    cvxpy_result = DietModel(matrix).solve_result(params)
+    highs_result = HighsDietModel(matrix).solve_result(params)
+    assert set(cvxpy_result.sensitivity.binding) == set(highs_result.sensitivity.binding)
+    for key, price in cvxpy_result.sensitivity.shadow_prices.items():
+        assert highs_result.sensitivity.shadow_prices[key] == pytest.approx(price, rel=1e-4, abs=1e-7), key
+
+
+def test_unused_foods_have_nonnegative_reduced_costs(matrix, params):
+    result = DietModel(matrix).solve_result(params)
+    unused = result.x <= 1e-6
+    assert np.all(result.sensitivity.reduced_costs[unused] >= -1e-7)
+
+
+def test_category_milp_has_no_duals(category_matrix, params):
+    result = DietModel(category_matrix, True).solve_result(dict(params, min_categories=3))
+    assert result.sensitivity.shadow_prices is None
+    assert result.sensitivity.binding
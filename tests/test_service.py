@@ -0,0 +1,76 @@
+# Status codes of the optimization service, driven in-process through
+# ServiceClient (no sockets). Each test runs its own service on a private
+# matrix store.
+
+import asyncio
+
+from service import OptimizeService
+
+
+def run_service(tmp_path, check, filename="food_data_with_prices.csv", **options):
+    """Start a one-worker service, await check(service, client) and stop it."""
+    async def main():
+        async with OptimizeService(filename, workers=1, store_dir=str(tmp_path), **options) as service:
+            return await check(service, service.client())
+    return asyncio.run(main())
+
+
+def test_optimize_and_health(tmp_path, params):
+    async def check(service, client):
+        status, body = await client.post("/optimize", {"params": params})
+        assert status == 200
+        assert body["status"] == "optimal" and body["cost"] > 0 and body["foods"]
+        status, body = await client.post("/optimize", {"profiles": [params, params]})
+        assert status == 200 and len(body["results"]) == 2
+        status, body = await client.get("/health")
+        assert status == 200 and body["served"] == 3
+    run_service(tmp_path, check)
+
+
+def test_bad_requests_get_400(tmp_path, params):
+    async def check(service, client):
+        missing = {key: value for key, value in params.items() if key != "cal_min"}
+        assert (await client.post("/optimize", {"params": missing}))[0] == 400
+        assert (await client.post("/optimize", {"params": dict(params, cal_max="lots")}))[0] == 400
+        assert (await client.post("/optimize", {"profiles": []}))[0] == 400
+        assert (await service.handle("POST", "/optimize", b"{not json"))[0] == 400
+        assert (await client.get("/nowhere"))[0] == 404
+        assert (await client.get("/optimize"))[0] == 405
+    run_service(tmp_path, check)
+
+
+def test_min_categories_without_categories_gets_400(tmp_path, params):
+    async def check(service, client):
+        status, body = await client.post("/optimize", {"params": dict(params, min_categories=3)})
+        assert status == 400 and "categories" in body["error"]
+    run_service(tmp_path, check)
+
+
+def test_min_categories_with_categories_solves(tmp_path, params):
+    async def check(service, client):
+        status, body = await client.post("/optimize", {"params": dict(params, min_categories=3)})
+        assert status == 200 and body["status"] == "optimal"
+    run_service(tmp_path, check, "food_data_with_prices_with_category.csv")
+
+
+def test_more_profiles_than_the_queue_gets_413(tmp_path, params):
+    async def check(service, client):
+        status, body = await client.post("/optimize", {"profiles": [params] * 3})
+        assert status == 413
+        assert (await client.post("/optimize", {"profiles": [params] * 2}))[0] == 200
+    run_service(tmp_path, check, max_queue=2)
+
+
+def test_full_queue_gets_503(tmp_path, params):
+    async def check(service, client):
+        # With the batcher stopped nothing leaves the queue
+        service._batcher.cancel()
+        waiting = asyncio.ensure_future(client.post("/optimize", {"profiles": [params] * 2}))
+        while service._queue.qsize() < 2:
+            await asyncio.sleep(0)
+        status, body = await client.post("/optimize", {"params": params})
+        assert status == 503 and "room" in body["error"]
+        # stop() fails the queued profiles, which the waiting request reports as 503
+        await service.stop()
+        assert (await waiting)[0] == 503
+    run_service(tmp_path, check, max_queue=2)
@@ -0,0 +1,34 @@
+# Solution cache keys and LRU behaviour.
+
+from solution_cache import SolutionCache, solution_key
+
+
+def test_key_ignores_order_and_tiny_rounding(params):
+    reordered = dict(reversed(list(params.items())))
+    nudged = dict(params, cal_min=params["cal_min"] + 1e-6)
+    assert solution_key("fp", params) == solution_key("fp", reordered) == solution_key("fp", nudged)
+
+
+def test_key_changes_with_data_params_and_options(params):
+    key = solution_key("fp", params, backend="cvxpy", time_limit=10.0, race=False, presolve=True)
+    variants = [
+        solution_key("other", params, backend="cvxpy", time_limit=10.0, race=False, presolve=True),
+        solution_key("fp", dict(params, cal_min=params["cal_min"] + 1), backend="cvxpy",
+                     time_limit=10.0, race=False, presolve=True),
+        solution_key("fp", params, backend="highs", time_limit=10.0, race=False, presolve=True),
+        solution_key("fp", params, backend="cvxpy", time_limit=5.0, race=False, presolve=True),
+        solution_key("fp", params, backend="cvxpy", time_limit=10.0, race=True, presolve=True),
+        solution_key("fp", params, backend="cvxpy", time_limit=10.0, race=False, presolve=False),
+    ]
+    assert len({key, *variants}) == len(variants) + 1
+
+
+def test_lru_eviction_and_counters():
+    cache = SolutionCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "b" is now least recently used
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    assert cache.stats() == {"hits": 2, "misses": 1, "size": 2, "maxsize": 2}
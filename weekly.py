@@ -0,0 +1,368 @@
+# Weekly meal plans
+#
+# One model over days x meals x foods: x[d, m, f] is the grams of food f in
+# meal m of day d, stacked day-major into one vector. Every daily bound of
+# DietModel applies to each day through block-diagonal sparse matrices
+# (kron(I_days, [A A ... A]) sums a day's meals), meal splits bound each
+# meal's share of that day's calories, and the variety rule (no food on
+# more than max_days days) adds one binary per (day, food) pair.
+#
+# Solving that block MILP directly is slow (72 s for a week of the bundled
+# foods): the days are interchangeable, so branch and bound explores every
+# permutation of the same plan. solve() uses the structure instead:
+#   - meal shares never restrict which foods a day uses (any daily basket
+#     can be divided over meals in proportion), so days are planned per
+#     food and split into meals afterwards by a small LP;
+#   - max_days >= days: the week is the best day repeated (one day LP);
+#   - otherwise column generation over daily plans: a master LP picks how
+#     many days use each plan, subject to the food-day limits, and a one-day
+#     pricing problem finds a cheaper plan under the master's per-food duals
+#     (a charge for every day a food is used). Reweighted LPs propose plans
+#     first; the one-day MILP runs only when they find nothing. The master
+#     is then solved with integer day counts over the plans found.
+# The best Lagrangian bound is in the result's stats; the search stops once the
+# integer plan is within DEFAULT_MIP_GAP of it, or at the time limit
+# (status "user_limit"). exact=True solves the full block MILP instead.
+#
+#   model = WeeklyPlanModel(matrix, days=7, meals=DEFAULT_MEALS)
+#   status, cost, X = model.solve({**params, "max_days": 3})   # X: days x meals x foods
+#   plan_table(matrix, X, model.meal_names)
+
+import threading
+import time
+
+import cvxpy as cp
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.optimize import Bounds, LinearConstraint, linprog, milp
+
+from diet_model import DIVERSITY_MIN_GRAMS, NUTRIENT_BOUNDS, OPTIMAL_STATUSES, DietModel, SolveResult
+from solvers import DEFAULT_MIP_GAP, DEFAULT_TIME_LIMIT
+
+DAYS = 7
+# meal name -> (min, max) share of the day's calories
+DEFAULT_MEALS = {
+    "Breakfast": (0.20, 0.30),
+    "Lunch":     (0.30, 0.40),
+    "Dinner":    (0.30, 0.45),
+}
+ONE_MEAL = {"Day": (0.0, 1.0)}
+
+PLAN_GRAMS = 1e-3         # foods below this many grams count as not eaten
+PRICING_TOL = 1e-7        # smallest reduced cost ($) that adds a daily plan
+REWEIGHT_ROUNDS = 4       # reweighted LPs tried per pricing round before the MILP
+INFEASIBLE_COST = 1e4     # $ per day for the master's "no plan" fallback column
+EXCLUDE_CHARGE = 1.0      # $ per gram that keeps used-up foods out of greedy seed days
+
+
+class WeeklyPlanModel(DietModel):
+    """
+    Multi-day plan compiled once per dataset.
+
+    Daily bounds, max_per_food (per food per day) and min_categories (per
+    day) mean the same as in DietModel; params key max_days caps the days
+    any one food appears on (missing or >= days: no variety rule).
+    solve() returns (status, weekly cost, X) with X shaped days x meals x foods.
+
+    charge adds a per-food charge Parameter to the objective (one-day
+    models used by solve): "per_gram" for every gram eaten, "per_use" for
+    every day the food is eaten (one binary per food).
+    """
+
+    def __init__(self, matrix, days=DAYS, meals=None, use_categories=False, charge=None):
+        meals = dict(meals or ONE_MEAL)
+        if sum(low for low, _ in meals.values()) > 1 or sum(high for _, high in meals.values()) < 1:
+            raise ValueError("Meal shares must allow the whole day's calories to be split")
+        self.matrix = matrix
+        self.days = days
+        self.meals = meals
+        self.meal_names = list(meals)
+        self.n_meals = len(meals)
+        self.n = matrix.n_foods
+        self.use_categories = use_categories
+        self.cost = np.tile(np.asarray(matrix.cost, dtype=float), days * self.n_meals)
+        self.x = cp.Variable(days * self.n_meals * self.n, nonneg=True)
+
+        # Day totals: (days * foods) grams per food per day, one block per day
+        day_sum = sparse.kron(sparse.eye(days), sparse.hstack([sparse.eye(self.n)] * self.n_meals)).tocsr()
+        grams_per_day = day_sum @ self.x
+
+        self.lower_keys = [key for key, _, sense in NUTRIENT_BOUNDS if sense == ">="]
+        self.upper_keys = [key for key, _, sense in NUTRIENT_BOUNDS if sense == "<="]
+        A_lower = matrix.rows([column for _, column, sense in NUTRIENT_BOUNDS if sense == ">="])
+        A_upper = matrix.rows([column for _, column, sense in NUTRIENT_BOUNDS if sense == "<="])
+        self.lower = cp.Parameter(len(self.lower_keys), name="lower")
+        self.upper = cp.Parameter(len(self.upper_keys), name="upper")
+        self.max_per_food = cp.Parameter(nonneg=True, name="max_per_food")
+        per_day = sparse.eye(days)
+
+        constraints = [
+            grams_per_day <= self.max_per_food,
+            sparse.kron(per_day, sparse.csr_array(A_lower)) @ grams_per_day >= cp.hstack([self.lower] * days),
+            sparse.kron(per_day, sparse.csr_array(A_upper)) @ grams_per_day <= cp.hstack([self.upper] * days),
+        ]
+        objective = self.cost @ self.x
+
+        # Meal splits: calories of meal m between share_min and share_max of the day's calories
+        if self.n_meals > 1:
+            calories = sparse.csr_array(matrix.row("Caloric Value")[None, :])
+            meal_calories = sparse.kron(sparse.eye(days * self.n_meals), calories).tocsr() @ self.x
+            day_calories = sparse.kron(per_day, calories).tocsr() @ grams_per_day
+            repeat_per_meal = sparse.kron(per_day, sparse.csr_array(np.ones((self.n_meals, 1))))
+            share_min = np.tile([low for low, _ in meals.values()], days)
+            share_max = np.tile([high for _, high in meals.values()], days)
+            constraints += [
+                meal_calories >= cp.multiply(share_min, repeat_per_meal @ day_calories),
+                meal_calories <= cp.multiply(share_max, repeat_per_meal @ day_calories),
+            ]
+
+        # Variety rule: z[d, f] = 1 when food f is eaten on day d
+        self.max_days = None
+        self.charge = None
+        if charge is not None:
+            self.charge = cp.Parameter(self.n, nonneg=True, name="charge")
+        if days > 1 or charge == "per_use":
+            z = cp.Variable(days * self.n, boolean=True)
+            constraints.append(grams_per_day <= self.max_per_food * z)
+            if days > 1:
+                self.max_days = cp.Parameter(nonneg=True, name="max_days")
+                constraints.append(sparse.kron(np.ones((1, days)), sparse.eye(self.n)) @ z <= self.max_days)
+            if charge == "per_use":
+                objective += cp.hstack([self.charge] * days) @ z
+        if charge == "per_gram":
+            objective += cp.hstack([self.charge] * days) @ grams_per_day
+
+        # Category diversity per day, as in DietModel
+        self.n_categories = 0
+        self.min_categories = None
+        if use_categories and matrix.category_index is not None:
+            onehot = matrix.category_index.onehot
+            self.n_categories = onehot.shape[0]
+            self.min_categories = cp.Parameter(nonneg=True, name="min_categories")
+            y = cp.Variable(days * self.n_categories, boolean=True)
+            category_grams = sparse.kron(per_day, onehot) @ grams_per_day
+            constraints += [
+                category_grams <= self.max_per_food * y,
+                category_grams >= DIVERSITY_MIN_GRAMS * y,
+                sparse.kron(per_day, np.ones((1, self.n_categories))) @ y >= self.min_categories,
+            ]
+
+        self.problem = cp.Problem(cp.Minimize(objective), constraints)
+        self.last_stats = None
+        self.last_sensitivity = None
+        self._day_models = {}
+        self._lock = threading.Lock()
+
+    def set_params(self, params):
+        super().set_params(params)
+        if self.max_days is not None:
+            self.max_days.value = min(float(params.get("max_days", self.days)), self.days)
+        if self.charge is not None and self.charge.value is None:
+            self.charge.value = np.zeros(self.n)
+
+    def _sensitivity(self, params, x):
+        return None  # duals are per day and meal; not mapped to daily params
+
+    def day_plan(self, params, charge=None, per_use=False, **solve_kwargs):
+        """
+        (status, cost, grams, objective) of one day planned per food.
+
+        cost leaves out the charge; objective includes it (for per_use
+        MILPs, HiGHS's dual bound on it when the solve stops at its gap).
+        """
+        kind = None if charge is None else "per_use" if per_use else "per_gram"
+        with self._lock:  # the week model may be shared between threads
+            model = self._day_models.get(kind)
+            if model is None:
+                model = self._day_models[kind] = WeeklyPlanModel(self.matrix, 1, None, self.use_categories, kind)
+        with model._lock:
+            model.set_params(params)
+            if charge is not None:
+                model.charge.value = np.asarray(charge, dtype=float)
+            model.problem.solve(**solve_kwargs)
+            status = model.problem.status
+            if status not in OPTIMAL_STATUSES or model.x.value is None:
+                return status, None, None, None
+            grams = np.array(model.x.value)
+            objective = model.problem.value
+            if per_use:
+                info = model.problem.solver_stats.extra_stats
+                objective = min(objective, getattr(info, "mip_dual_bound", objective))
+            return status, float(np.asarray(self.matrix.cost) @ grams), grams, objective
+
+    def solve_result(self, params, solvers=None, solver_options=None, exact=False,
+                     time_limit=DEFAULT_TIME_LIMIT, mip_gap=DEFAULT_MIP_GAP, **solve_kwargs):
+        """
+        Solve the week; returns a SolveResult whose x is X, days x meals x
+        foods (solve() returns (status, cost, X)).
+
+        exact=True solves the full block MILP (slow with a variety rule);
+        otherwise see the module comment. The stats give the number of
+        daily plans generated, the lower bound and the relative gap.
+        """
+        if exact or self.days == 1:
+            result = super().solve_result(params, solvers, solver_options, **solve_kwargs)
+            if result.x is None:
+                return result
+            return result._replace(x=result.x.reshape(self.days, self.n_meals, self.n))
+
+        start = time.perf_counter()
+        solver = (solvers or [cp.HIGHS])[0]
+        options = {**solve_kwargs, **(solver_options or {}).get(solver, {}), "solver": solver}
+        max_days = int(min(float(params.get("max_days", self.days)), self.days))
+        status, cost, grams, _ = self.day_plan(params, **options)
+        if grams is None or max_days >= self.days:
+            # No variety rule to satisfy: the best day, every day
+            stats = self._stats(solver, status, start, daily_plans=int(grams is not None),
+                                lower_bound=cost and cost * self.days, gap=0.0)
+            if grams is None:
+                return self._result(status, None, None, stats)
+            return self._result(status, cost * self.days,
+                                np.repeat(self.split_meals(grams)[None], self.days, axis=0), stats)
+
+        plans, counts, cost, stats = self._generate_columns(params, grams, max_days, options,
+                                                            start + time_limit, mip_gap)
+        if plans is None:
+            # Infeasible only when pricing proved no daily plan can complete the week
+            status = "infeasible" if stats["proven"] else "user_limit"
+        else:
+            status = "optimal" if stats["gap"] <= mip_gap else "user_limit"
+        stats = self._stats(solver, status, start, **stats)
+        if plans is None:
+            return self._result(status, None, None, stats)
+        X = np.stack([self.split_meals(plans[i]) for i in np.repeat(np.arange(len(plans)), counts)])
+        return self._result(status, cost, X, stats)
+
+    def _result(self, status, cost, X, stats):
+        """SolveResult of a week search, also left in last_stats for single-threaded callers."""
+        self.last_stats, self.last_sensitivity = stats, None
+        return SolveResult(status, cost, X, stats, None)
+
+    def _stats(self, solver, status, start, **extra):
+        """last_stats entry in DietModel's layout plus the week search numbers."""
+        return {"solver": solver, "status": status, "solve_time": None, "compile_time": None,
+                "wall_time": time.perf_counter() - start, "iterations": None, **extra}
+
+    def _seed_plans(self, params, grams, max_days, options):
+        """Greedy week: the cheapest day until a food is used up, then the cheapest without it."""
+        plans, used = [grams], (grams > PLAN_GRAMS).astype(int)
+        for _ in range(self.days - 1):
+            exhausted = used >= max_days
+            if not (exhausted & (plans[-1] > PLAN_GRAMS)).any():
+                used += plans[-1] > PLAN_GRAMS
+                continue
+            _, _, grams, _ = self.day_plan(params, charge=EXCLUDE_CHARGE * exhausted, **options)
+            if grams is None or (exhausted & (grams > PLAN_GRAMS)).any():
+                break
+            plans.append(grams)
+            used += grams > PLAN_GRAMS
+        return plans
+
+    def _price(self, params, charge, options, deadline):
+        """
+        Candidate daily plans for per-use charges, cheapest first: reweighted
+        LPs (charge spread over the grams a food was last used at), then the
+        MILP. Yields (grams, lower bound on the pricing objective or None).
+        """
+        cap = float(params.get("max_per_food", 0))
+        scale = np.full(self.n, max(cap, 1.0))
+        for round_ in range(REWEIGHT_ROUNDS):
+            _, _, grams, objective = self.day_plan(params, charge=charge / scale, **options)
+            if grams is None:
+                return
+            # The first LP (charge / cap per gram) is the MILP's relaxation: a valid bound
+            yield grams, objective if round_ == 0 else None
+            scale = np.maximum(np.minimum(scale, grams), 1.0)
+        remaining = deadline - time.perf_counter()
+        if remaining > 0:
+            _, _, grams, objective = self.day_plan(params, charge=charge, per_use=True,
+                                                   **{**options, "time_limit": remaining})
+            if grams is not None:
+                yield grams, objective
+
+    def _generate_columns(self, params, grams, max_days, options, deadline, mip_gap):
+        """Column generation over daily plans; (plans, day counts, cost, stats)."""
+        plans = self._seed_plans(params, grams, max_days, options)
+        cost = np.asarray(self.matrix.cost)
+        lower_bound, best, proven = -np.inf, None, False
+        while True:
+            usage = np.column_stack([plan > PLAN_GRAMS for plan in plans]).astype(float)
+            costs = np.array([cost @ plan for plan in plans])
+
+            # Integer day counts over the plans so far (the incumbent)
+            res = milp(costs, constraints=[LinearConstraint(usage, 0, max_days),
+                                           LinearConstraint(np.ones((1, len(plans))), self.days, self.days)],
+                       integrality=np.ones(len(plans)), bounds=Bounds(0, self.days))
+            if res.status == 0 and (best is None or res.fun < best[2] - PRICING_TOL):
+                best = (list(plans), np.round(res.x).astype(int), float(res.fun))
+            if best is not None and best[2] - lower_bound <= mip_gap * best[2]:
+                break
+            if time.perf_counter() > deadline:
+                break
+
+            # Master LP: day counts sum to the week, each food on at most max_days days;
+            # the last column is a costly "no plan" day that keeps the master feasible
+            res = linprog(np.r_[costs, INFEASIBLE_COST], A_ub=np.column_stack([usage, np.zeros(self.n)]),
+                          b_ub=np.full(self.n, max_days), A_eq=np.ones((1, len(plans) + 1)),
+                          b_eq=[self.days], bounds=(0, None), method="highs")
+            day_dual, food_duals = res.eqlin.marginals[0], res.ineqlin.marginals
+            charge = np.maximum(-food_duals, 0.0)
+            found, exhausted = False, False
+            for grams, bound in self._price(params, charge, options, deadline):
+                if bound is not None:
+                    # Lagrangian bound: every day costs at least the priced objective
+                    lower_bound = max(lower_bound, res.fun + self.days * min(0.0, bound - day_dual))
+                used = grams > PLAN_GRAMS
+                if cost @ grams + charge @ used - day_dual < -PRICING_TOL:
+                    plans.append(grams)
+                    found = True
+                    break
+                exhausted = bound is not None and bound - day_dual >= -PRICING_TOL
+            if not found:
+                if exhausted:
+                    lower_bound = max(lower_bound, res.fun)  # no improving plan: the LP bound is proven
+                    proven = True
+                break
+
+        stats = {"daily_plans": len(plans), "proven": proven,
+                 "lower_bound": lower_bound if np.isfinite(lower_bound) else None}
+        if best is None:
+            return None, None, None, {**stats, "gap": np.inf}
+        gap = (best[2] - lower_bound) / best[2] if np.isfinite(lower_bound) else np.inf
+        return best[0], best[1], best[2], {**stats, "gap": max(gap, 0.0)}
+
+    def split_meals(self, grams):
+        """meals x foods grams: a day's grams divided over the meals within their calorie shares."""
+        if self.n_meals == 1:
+            return grams[None]
+        used = np.flatnonzero(grams > PLAN_GRAMS)
+        calories = self.matrix.row("Caloric Value")[used]
+        day_calories = calories @ grams[used]
+        meal_calories = np.kron(np.eye(self.n_meals), calories[None, :])
+        share_min = np.array([low for low, _ in self.meals.values()])
+        share_max = np.array([high for _, high in self.meals.values()])
+        # A vertex solution keeps most foods whole within one meal
+        res = linprog(
+            np.zeros(self.n_meals * len(used)),
+            A_ub=np.vstack([-meal_calories, meal_calories]),
+            b_ub=np.r_[-share_min * day_calories, share_max * day_calories],
+            A_eq=np.kron(np.ones((1, self.n_meals)), np.eye(len(used))), b_eq=grams[used],
+            bounds=(0, None), method="highs",
+        )
+        split = np.zeros((self.n_meals, self.n))
+        split[:, used] = res.x.reshape(self.n_meals, len(used))
+        return split
+
+
+def plan_table(matrix, X, meal_names, threshold=PLAN_GRAMS):
+    """Day / Meal / Food / Amount (g) / Cost ($) rows for a days x meals x foods plan."""
+    day, meal, food = np.nonzero(X > threshold)
+    grams = X[day, meal, food]
+    return pd.DataFrame({
+        "Day": day + 1,
+        "Meal": [meal_names[m] for m in meal],
+        "Food": [matrix.food_names[f] for f in food],
+        "Amount (g)": grams.round(1),
+        "Cost ($)": (grams * np.asarray(matrix.cost)[food]).round(2),
+    })